@@ -13,37 +13,110 @@
 # limitations under the License.
 
 import os
+import copy
 import json
+import hashlib
 import time
+import uuid
+import random
+import logging
+import asyncio
+import functools
+import threading
 import urllib3
+from contextlib import contextmanager, closing
+from email.utils import parsedate_to_datetime
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit, urlencode
 from dotenv import load_dotenv
+from cbam_notifications import NotificationStore, NotificationReceiver
+from cbam_metrics import RequestMetrics, MetricsListener
+from cbam_plans import LifecyclePlan, PlanRunner
+from cbam_inventory import InventoryMirror
+from cbam_json_stream import iterate_json_array
+from cbam_templates import BodyTemplateCache
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
 
 class CBAMLibrary:
 
     ROBOT_LIBRARY_SCOPE = "GLOBAL"
     wait_until_timeout = 300
+    # Maximum number of VNF IDs in a single list request filter, keeps the URL length reasonable
+    filter_batch_size = 50
+    polling_options = {"initial_interval": 0.5, "backoff_factor": 2, "jitter": 0.1}
+    failed_operation_states = ("FAILED_TEMP", "FAILED", "ROLLED_BACK")
+    # Keywords that can be scheduled with Schedule Operation, they return the id of the started operation occurrence
+    schedulable_operations = ("execute_custom_operation_on_vnf", "instantiate_vnf", "modify_vnf", "terminate_vnf")
+    # List responses are parsed element by element from the response stream when enabled
+    stream_list_responses = False
+    stream_chunk_size = 64 * 1024
+
+    def __init__(self):
+        # Statistics of the latest waits, for tuning the polling options
+        self.poll_statistics = deque(maxlen=1000)
+        self.notifications = None
+        self.notification_receiver = None
+        self.vnf_name_index = VnfNameIndex(ttl=60)
+        self.onboarding_cache = None
+        self.operation_scheduler = OperationScheduler(self)
+        self.inventory = None
+        self.inventory_database = None
+        self.body_templates = BodyTemplateCache()
+        # Metrics are kept over reconnections, the listener summarizes them per suite
+        self.metrics = RequestMetrics()
+        self.metrics_listener = MetricsListener(self.metrics)
+        self.ROBOT_LIBRARY_LISTENER = self.metrics_listener
 
-    def connect_to_cbam(self, host=None, client_id=None, client_secret=None, catalog_version="SOL005", **kwargs):
+    def connect_to_cbam(self, host=None, client_id=None, client_secret=None, catalog_version="SOL005", notification_callback_uri=None, onboarding_cache=None, **kwargs):
         load_dotenv()
         host = host or os.getenv("HOST")
         client_id = client_id or os.getenv("CLIENT_ID")
         client_secret = client_secret or os.getenv("CLIENT_SECRET")
-        self.connection = Connection(host, client_id, client_secret, **kwargs)
+        previous = getattr(self, "connection", None)
+        self.connection = Connection(host, client_id, client_secret, metrics=self.metrics, **kwargs)
+        if previous is not None:
+            # Otherwise the replaced connection keeps refreshing its token in the background
+            previous.close()
         self.catalog = Catalog(self.connection)._get_version(catalog_version)
+        self.attribute_filters_supported = True
+        self.vnf_name_index.clear()
+        if onboarding_cache is not None:
+            self.set_onboarding_cache(onboarding_cache)
+        if notification_callback_uri is not None:
+            self.start_notification_receiver(notification_callback_uri)
 
     def create_vnf(self, vnfd_id, name, description=None):
-        payload = {
-            "vnfdId": vnfd_id,
-            "vnfInstanceName": name
-        }
-        if description is not None:
-            payload["vnfInstanceDescription"] = description
-        response = self.connection.post("/vnflcm/v1/vnf_instances", json=payload)
-        return response.json()
+        self.vnf_name_index.invalidate(name=name)
+        response = self.connection.post("/vnflcm/v1/vnf_instances", json=self._vnf_creation_payload(vnfd_id, name, description))
+        vnf = response.json()
+        self._mirror_vnf(vnf)
+        return vnf
+
+    def create_vnfs(self, vnfd_id, names, description=None, concurrency=10):
+        async def create(engine, name):
+            return await engine.create_vnf(vnfd_id, name, description)
+        return self._run_batch(create, names, concurrency)
 
     def delete_vnf(self, vnf_id):
+        self.vnf_name_index.invalidate(vnf_id=vnf_id)
         self.connection.delete(f"/vnflcm/v1/vnf_instances/{vnf_id}")
+        self._mirror_vnf(None, deleted_id=vnf_id)
+
+    def delete_vnfs(self, vnf_ids, concurrency=10):
+        async def delete(engine, vnf_id):
+            await engine.delete_vnf(vnf_id)
+        self._run_batch(delete, vnf_ids, concurrency)
 
     def delete_vnfd(self, vnfd_id):
         self.connection.delete(f"{self.catalog.endpoint}/{vnfd_id}")
@@ -51,129 +124,1184 @@ class CBAMLibrary:
     def disable_insecure_request_warning(self):
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    def execute_custom_operation_on_vnf(self, vnf_id, custom_operation, body={}):
-        self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/custom/{custom_operation}", data=self._parse_json_body(body))
+    def execute_custom_operation_on_vnf(self, vnf_id, custom_operation, body={}, **variables):
+        self.vnf_name_index.invalidate(vnf_id=vnf_id)
+        response = self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/custom/{custom_operation}", data=self._parse_json_body(body, vnf_id=vnf_id, **variables))
+        return _operation_occurrence_id(response)
+
+    def get_handle_result(self, handle, timeout=None):
+        timeout = self._wait_until_timeout(timeout)
+        future = self.operation_scheduler.future(handle)
+        done, _ = wait([future], timeout)
+        if not done:
+            raise Exception(f"{handle} did not complete in {timeout} seconds")
+        self.operation_scheduler.forget(handle)
+        # Raises the exception of the background operation in the calling keyword
+        return future.result()
+
+    def get_host_statistics(self):
+        return self.connection.hosts.statistics()
+
+    def get_inventory_vnfs_using_package(self, package_id):
+        packages = self._inventory().find("packages", {"id": package_id})
+        # Catalog v18 packages are identified by the VNFD ID
+        vnfd_id = packages[0].get("vnfdId", package_id) if packages else package_id
+        return self._inventory().find("vnfs", {"vnfdId": vnfd_id})
+
+    def get_request_metrics(self, format="json", path=None):
+        if format.lower() == "json":
+            metrics = self.metrics.to_json()
+        elif format.lower() == "prometheus":
+            metrics = self.metrics.to_prometheus()
+        else:
+            raise ValueError(f"Unknown metrics format '{format}', use json or prometheus")
+        if path:
+            # Write and rename, so textfile collectors never read a partial file
+            with open(f"{path}.tmp", "w") as metrics_file:
+                metrics_file.write(metrics)
+            os.replace(f"{path}.tmp", path)
+        return metrics
+
+    def get_response_cache_statistics(self):
+        cache = self.connection.response_cache
+        if cache is None:
+            return {}
+        return cache.statistics()
+
+    def get_received_notifications(self, resource_id=None):
+        if self.notifications is None:
+            return []
+        return self.notifications.get(resource_id)
+
+    def get_operation(self, operation_id):
+        response = self.connection.get(f"/vnflcm/v1/vnf_lcm_op_occs/{operation_id}")
+        return response.json()
+
+    def get_poll_statistics(self):
+        return list(self.poll_statistics)
 
     def get_vnf(self, vnf_id):
         response = self.connection.get(f"/vnflcm/v1/vnf_instances/{vnf_id}")
         return response.json()
 
     def get_vnf_by_name(self, vnf_name):
-        vnfs = self.get_vnfs()
-        for vnf in vnfs:
-            if vnf["vnfInstanceName"] == vnf_name:
-                return vnf
-        raise ValueError(f"No VNF with name '{vnf_name}' was found.")
+        vnf = self.vnf_name_index.get(vnf_name)
+        if vnf is None:
+            vnf = self._find_vnf_by_name(vnf_name)
+            self.vnf_name_index.add(vnf)
+        return copy.deepcopy(vnf)
 
-    def get_vnfs(self):
-        response = self.connection.get("/vnflcm/v1/vnf_instances")
-        return response.json()
+    def get_vnfs(self, fields=None, exclude_default=False):
+        return list(self._iterate("/vnflcm/v1/vnf_instances", self._projection_params(fields, exclude_default)))
+
+    def get_vnfs_with_attributes(self, *attributes, attribute_filter=None):
+        params = self._projection_params(attributes, True)
+        if attribute_filter is not None:
+            params["filter"] = attribute_filter
+        try:
+            return list(self._iterate("/vnflcm/v1/vnf_instances", params, attributes))
+        except requests.HTTPError as error:
+            if error.response.status_code != 400 or attribute_filter is not None:
+                raise
+        # Server does not support attribute selectors, select the attributes on client side
+        return list(self._iterate("/vnflcm/v1/vnf_instances", attributes=attributes))
 
     def get_vnfd(self, vnfd_id):
         response = self.connection.get(f"{self.catalog.endpoint}/{vnfd_id}")
         return response.json()
 
-    def get_vnfds(self):
-        response = self.connection.get(self.catalog.endpoint)
-        return response.json()
+    def get_vnfds(self, fields=None, exclude_default=False):
+        return list(self._iterate(self.catalog.endpoint, self._projection_params(fields, exclude_default)))
 
-    def instantiate_vnf(self, vnf_id, instantiation_json):
-        self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/instantiate", data=self._parse_json_body(instantiation_json))
+    def instantiate_vnf(self, vnf_id, instantiation_json, **variables):
+        self.vnf_name_index.invalidate(vnf_id=vnf_id)
+        response = self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/instantiate", data=self._parse_json_body(instantiation_json, vnf_id=vnf_id, **variables))
+        return _operation_occurrence_id(response)
 
-    def modify_vnf(self, vnf_id, modifications):
-        return self.connection.patch(f"/vnflcm/v1/vnf_instances/{vnf_id}", data=self._parse_json_body(modifications))
+    def instantiate_vnfs(self, vnf_ids, instantiation_json, wait_for_completion=True, timeout=None, interval=5, concurrency=10, **variables):
+        timeout = self._wait_until_timeout(timeout)
+        async def instantiate(engine, vnf_id):
+            operation_id = await engine.instantiate_vnf(vnf_id, instantiation_json, **variables)
+            if _to_bool(wait_for_completion):
+                await engine.wait_until_operation_or_state(operation_id, vnf_id, "INSTANTIATED", timeout, float(interval))
+            return operation_id
+        return self._run_batch(instantiate, vnf_ids, concurrency)
 
-    def onboard_vnfd(self, vnfd):
-        return self.catalog.onboard_vnfd(vnfd)
+    def modify_vnf(self, vnf_id, modifications, **variables):
+        self.vnf_name_index.invalidate(vnf_id=vnf_id)
+        return self.connection.patch(f"/vnflcm/v1/vnf_instances/{vnf_id}", data=self._parse_json_body(modifications, vnf_id=vnf_id, **variables))
+
+    def run_lifecycle_plan(self, plan, parallelism=10, timeout=None):
+        plan = LifecyclePlan.load(plan)
+        tasks = plan.tasks(self, timeout)
+        report = PlanRunner(int(parallelism)).run(tasks)
+        logger.info(f"Lifecycle plan finished in {report.duration:.1f} seconds:\n{report}")
+        failed = [f"{task.name}: {task.error}" for task in report.failed]
+        if failed:
+            raise Exception(f"{len(failed)}/{len(tasks)} plan tasks failed or were skipped:\n" + "\n".join(failed))
+        return {**report.to_dict(), "vnfs": {name: tasks[f"create {name}"].result for name in plan.vnfs}}
+
+    def schedule_operation(self, vnf_id, operation, *args, **kwargs):
+        name = operation.lower().replace(" ", "_")
+        if name not in self.schedulable_operations:
+            raise ValueError(f"Operation '{operation}' cannot be scheduled, use one of: " + ", ".join(self.schedulable_operations))
+        keyword = getattr(self, name)
+
+        def start():
+            result = keyword(vnf_id, *args, **kwargs)
+            # Modify VNF returns the response, the operation occurrence is in its Location header
+            return _operation_occurrence_id(result) if isinstance(result, requests.Response) else result
+        return self.operation_scheduler.submit(vnf_id, start)
+
+    def onboard_vnfd(self, vnfd, part_size=None, max_attempts=3):
+        if self.onboarding_cache is None:
+            return self.catalog.onboard_vnfd(vnfd, part_size, int(max_attempts))
+        digest = self._package_digest(vnfd)
+        key = f"package {self.connection.host}{self.catalog.endpoint} {digest}"
+        with self.onboarding_cache.locked():
+            package_id = self.onboarding_cache.read(key)
+        package = self._onboarded_package(package_id) if package_id is not None else None
+        if package is not None:
+            logger.info(f"Package {vnfd} with SHA-256 {digest} is already onboarded as {package_id}")
+            return package
+        package = self.catalog.onboard_vnfd(vnfd, part_size, int(max_attempts))
+        with self.onboarding_cache.locked():
+            self.onboarding_cache.write(key, package["id"])
+        return package
 
     def set_connection_options(self, **options):
-        self.connection.global_kwargs = options
+        self.connection.set_options(**options)
+
+    def set_operation_scheduler_options(self, workers=10, interval=5):
+        self.operation_scheduler.set_options(int(workers), float(interval))
+
+    def set_vnf_name_index_ttl(self, ttl):
+        self.vnf_name_index.ttl = float(ttl)
+        self.vnf_name_index.clear()
+
+    def query_inventory(self, sql, *parameters):
+        return self._inventory().query(sql, parameters)
+
+    def query_inventory_operations(self, **criteria):
+        return self._inventory().find("operations", criteria)
+
+    def query_inventory_packages(self, **criteria):
+        return self._inventory().find("packages", criteria)
+
+    def query_inventory_vnfs(self, **criteria):
+        return self._inventory().find("vnfs", criteria)
+
+    def reset_request_metrics(self):
+        self.metrics.reset()
+
+    def set_list_streaming(self, enabled=True, chunk_size=64 * 1024):
+        self.stream_list_responses = _to_bool(enabled)
+        self.stream_chunk_size = int(chunk_size)
+
+    def set_metrics_file(self, path):
+        self.metrics_listener.path = path or None
+
+    def set_onboarding_cache(self, path):
+        self.onboarding_cache = FileCache(path) if path else None
+
+    def set_polling_options(self, initial_interval=0.5, backoff_factor=2, jitter=0.1):
+        self.polling_options = {"initial_interval": float(initial_interval), "backoff_factor": float(backoff_factor), "jitter": float(jitter)}
 
     def set_wait_until_timeout(self, timeout):
-        self.timeout = int(timeout)
+        self.wait_until_timeout = int(timeout)
+
+    def start_notification_receiver(self, callback_uri, port=None, address="0.0.0.0"):
+        if self.notification_receiver is not None:
+            self.stop_notification_receiver()
+        callback = urlsplit(callback_uri)
+        port = port if port is not None else callback.port or (443 if callback.scheme == "https" else 80)
+        self.notifications = NotificationStore()
+        self.notification_receiver = NotificationReceiver(self.notifications, address, port)
+        self.notification_receiver.start()
+        subscription = {
+            "filter": {"notificationTypes": ["VnfLcmOperationOccurrenceNotification"]},
+            "callbackUri": callback_uri
+        }
+        try:
+            self.subscription_id = self.connection.post("/vnflcm/v1/subscriptions", json=subscription).json()["id"]
+        except Exception:
+            self.notification_receiver.stop()
+            self.notification_receiver = None
+            raise
+
+    def stop_notification_receiver(self):
+        if self.notification_receiver is None:
+            return
+        try:
+            self.connection.delete(f"/vnflcm/v1/subscriptions/{self.subscription_id}")
+        except requests.HTTPError as error:
+            if error.response.status_code != 404:
+                raise
+        finally:
+            self.notification_receiver.stop()
+            self.notification_receiver = None
+
+    def start_execute_custom_operation_on_vnf(self, vnf_id, custom_operation, body={}, **variables):
+        return self.schedule_operation(vnf_id, "execute_custom_operation_on_vnf", custom_operation, body, **variables)
+
+    def start_instantiate_vnf(self, vnf_id, instantiation_json, **variables):
+        return self.schedule_operation(vnf_id, "instantiate_vnf", instantiation_json, **variables)
+
+    def start_onboard_vnfd(self, vnfd, part_size=None, max_attempts=3):
+        return self.operation_scheduler.run(functools.partial(self.onboard_vnfd, vnfd, part_size, max_attempts))
+
+    def start_terminate_vnf(self, vnf_id, termination_type="GRACEFUL", graceful_termination_timeout=None, **additional_params):
+        return self.schedule_operation(vnf_id, "terminate_vnf", termination_type, graceful_termination_timeout, **additional_params)
+
+    def sync_inventory(self, database=None, full=False):
+        if self.inventory is None or (database is not None and database != self.inventory_database):
+            if self.inventory is not None:
+                self.inventory.close()
+            self.inventory_database = database
+            self.inventory = InventoryMirror(database or ":memory:")
+        started = time.monotonic()
+        synced_until = self.inventory.synced_until
+        if _to_bool(full) or synced_until is None:
+            vnfs = list(self._iterate("/vnflcm/v1/vnf_instances"))
+            self.inventory.load(vnfs, list(self._iterate(self.catalog.endpoint)), list(self._iterate("/vnflcm/v1/vnf_lcm_op_occs")))
+            changed = len(vnfs)
+        else:
+            operations = self._operations_entered_since(synced_until)
+            vnf_ids = list(dict.fromkeys(operation["vnfInstanceId"] for operation in operations))
+            vnfs = self._list_by_ids("/vnflcm/v1/vnf_instances", vnf_ids) if vnf_ids else []
+            deleted = set(vnf_ids) - {vnf["id"] for vnf in vnfs}
+            self.inventory.update(vnfs, deleted, list(self._iterate(self.catalog.endpoint)), operations)
+            changed = len(vnf_ids)
+        return {**self.inventory.counts(), "changed_vnfs": changed, "duration": round(time.monotonic() - started, 3)}
+
+    def tear_down_vnfs(self, *vnfs, attribute_filter=None, delete_packages=True, termination_type="GRACEFUL", graceful_termination_timeout=None, timeout=None, interval=5, concurrency=10):
+        timeout = self._wait_until_timeout(timeout)
+        started = time.monotonic()
+        targets, missing = self._tear_down_targets(vnfs, attribute_filter)
+
+        async def tear_down(engine, vnf):
+            result = {"id": vnf["id"], "name": vnf.get("vnfInstanceName"), "status": "DELETED"}
+            item_started = step_started = time.monotonic()
+            try:
+                if vnf.get("instantiationState") == "INSTANTIATED":
+                    operation_id = await engine.terminate_vnf(vnf["id"], termination_type, graceful_termination_timeout)
+                    await engine.wait_until_operation_or_state(operation_id, vnf["id"], "NOT_INSTANTIATED", timeout, float(interval))
+                    result["terminate"] = round(time.monotonic() - step_started, 3)
+                    step_started = time.monotonic()
+                await engine.delete_vnf(vnf["id"])
+                result["delete"] = round(time.monotonic() - step_started, 3)
+            except requests.HTTPError as error:
+                # Deleted already, e.g. by an earlier teardown
+                if error.response.status_code != 404:
+                    result.update(status="FAILED", error=str(error))
+            except Exception as error:
+                result.update(status="FAILED", error=str(error))
+            result["duration"] = round(time.monotonic() - item_started, 3)
+            return result
+
+        results = [{"id": value, "name": None, "status": "NOT FOUND", "duration": 0} for value in missing]
+        if targets:
+            results += self._run_batch(tear_down, targets, concurrency)
+        packages = []
+        if _to_bool(delete_packages):
+            deleted = [vnf for vnf, result in zip(targets, results[len(missing):]) if result["status"] == "DELETED"]
+            packages = self._delete_unused_packages({vnf["vnfdId"] for vnf in deleted if vnf.get("vnfdId")})
+        report = {"duration": round(time.monotonic() - started, 3), "vnfs": results, "packages": packages}
+        logger.info(f"Tore down {len(targets)} VNFs and {len(packages)} packages in {report['duration']} seconds:\n"
+                    + "\n".join(f"{item['id']} {item['status']} {item['duration']}s {item.get('error') or ''}" for item in results + packages))
+        failed = [f"{item['id']}: {item['error']}" for item in results + packages if item["status"] == "FAILED"]
+        if failed:
+            raise Exception(f"Teardown of {len(failed)} VNFs or packages failed:\n" + "\n".join(failed))
+        return report
 
     def terminate_vnf(self, vnf_id, termination_type="GRACEFUL", graceful_termination_timeout=None, **additional_params):
+        payload = self._termination_payload(termination_type, graceful_termination_timeout, additional_params)
+        self.vnf_name_index.invalidate(vnf_id=vnf_id)
+        response = self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/terminate", json=payload)
+        return _operation_occurrence_id(response)
+
+    def terminate_vnfs(self, vnf_ids, termination_type="GRACEFUL", graceful_termination_timeout=None, wait_for_completion=True, timeout=None, interval=5, concurrency=10, **additional_params):
+        timeout = self._wait_until_timeout(timeout)
+        async def terminate(engine, vnf_id):
+            operation_id = await engine.terminate_vnf(vnf_id, termination_type, graceful_termination_timeout, **additional_params)
+            if _to_bool(wait_for_completion):
+                await engine.wait_until_operation_or_state(operation_id, vnf_id, "NOT_INSTANTIATED", timeout, float(interval))
+            return operation_id
+        return self._run_batch(terminate, vnf_ids, concurrency)
+
+    def wait_until_operation_completes(self, operation_id, timeout=None, interval=5):
+        timeout = self._wait_until_timeout(timeout)
+        schedule = self._poll_schedule(f"{operation_id} COMPLETED", timeout, interval, [operation_id])
+        for _ in schedule:
+            operation = self.get_operation(operation_id)
+            if operation["operationState"] == "COMPLETED" or operation["operationState"] in self.failed_operation_states:
+                schedule.finish(operation["operationState"] == "COMPLETED")
+                return self._completed_operation(operation)
+        schedule.finish(False)
+        raise Exception(f"Operation {operation_id} did not complete in {timeout} seconds, state is {operation['operationState']}")
+
+    def wait_until_operations_complete(self, operation_ids, timeout=None, interval=5):
+        timeout = self._wait_until_timeout(timeout)
+        pending = list(dict.fromkeys(operation_ids))
+        operations = {}
+        outcomes = {}
+        schedule = self._poll_schedule(f"{len(pending)} operations COMPLETED", timeout, interval, pending)
+        for _ in schedule:
+            for operation in self._list_by_ids("/vnflcm/v1/vnf_lcm_op_occs", pending):
+                operations[operation["id"]] = operation
+                state = operation["operationState"]
+                if state == "COMPLETED" or state in self.failed_operation_states:
+                    outcomes[operation["id"]] = {"operationState": state, "duration": round(schedule.elapsed(), 3)}
+            pending = [operation_id for operation_id in pending if operation_id not in outcomes]
+            if not pending:
+                break
+        failed = [f"{operation_id} ({self._operation_failure(operations[operation_id])})" for operation_id, outcome in outcomes.items() if outcome["operationState"] != "COMPLETED"]
+        schedule.finish(not pending and not failed)
+        if pending:
+            not_ready = ", ".join(f"{operation_id} ({operations[operation_id]['operationState'] if operation_id in operations else 'NOT FOUND'})" for operation_id in pending)
+            raise Exception(f"Operations did not complete in {timeout} seconds: {not_ready}")
+        if failed:
+            raise Exception(f"{len(failed)}/{len(outcomes)} operations failed: {', '.join(failed)}")
+        return outcomes
+
+    def wait_until_scheduled_operations_complete(self, handles=None, timeout=None):
+        handles = self.operation_scheduler.handles() if handles is None else list(handles)
+        return self._join_handles(handles, timeout)
+
+    def wait_for_handles(self, *handles, timeout=None):
+        handles = [handle for item in handles for handle in (item if isinstance(item, (list, tuple)) else [item])]
+        return self._join_handles(handles, timeout)
+
+    def wait_until_vnf_is_instantiated(self, vnf_id, timeout=None, interval=5):
+        timeout = self._wait_until_timeout(timeout)
+        self._poll_vnf_instantiation_status(vnf_id, "INSTANTIATED", timeout, interval)
+
+    def wait_until_vnf_is_terminated(self, vnf_id, timeout=None, interval=5):
+        timeout = self._wait_until_timeout(timeout)
+        self._poll_vnf_instantiation_status(vnf_id, "NOT_INSTANTIATED", timeout, interval)
+
+    def wait_until_vnfs_are_instantiated(self, vnf_ids, timeout=None, interval=5):
+        timeout = self._wait_until_timeout(timeout)
+        return self._poll_vnfs_instantiation_status(vnf_ids, "INSTANTIATED", timeout, float(interval))
+
+    def wait_until_vnfs_are_terminated(self, vnf_ids, timeout=None, interval=5):
+        timeout = self._wait_until_timeout(timeout)
+        return self._poll_vnfs_instantiation_status(vnf_ids, "NOT_INSTANTIATED", timeout, float(interval))
+
+    def _find_vnf_by_name(self, vnf_name):
+        vnfs = None
+        if self.attribute_filters_supported:
+            try:
+                vnfs = list(self._iterate("/vnflcm/v1/vnf_instances", {"filter": f"(eq,vnfInstanceName,{_filter_value(vnf_name)})"}))
+            except requests.HTTPError as error:
+                if error.response.status_code != 400:
+                    raise
+                self.attribute_filters_supported = False
+        if vnfs is None:
+            # Pages are fetched lazily, so the search stops at the page containing the VNF, or at the VNF itself
+            # when list responses are streamed
+            vnfs = self._iterate("/vnflcm/v1/vnf_instances")
+        for vnf in vnfs:
+            if vnf["vnfInstanceName"] == vnf_name:
+                return vnf
+        raise ValueError(f"No VNF with name '{vnf_name}' was found.")
+
+    def _package_digest(self, vnfd):
+        '''Returns SHA-256 digest of the package. Digests are cached by path, size and modification time, so an
+        unchanged package file is read only once.'''
+        stat = os.stat(vnfd)
+        key = f"file {os.path.abspath(vnfd)} {stat.st_size} {stat.st_mtime_ns}"
+        with self.onboarding_cache.locked():
+            digest = self.onboarding_cache.read(key)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in UploadStream(vnfd):
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+            with self.onboarding_cache.locked():
+                self.onboarding_cache.write(key, digest)
+        return digest
+
+    def _onboarded_package(self, package_id):
+        '''Returns the package from the catalog if it still exists and has been onboarded.'''
+        try:
+            package = self.get_vnfd(package_id)
+        except requests.HTTPError as error:
+            if error.response.status_code != 404:
+                raise
+            return None
+        # Catalog v18 packages do not have an onboarding state, they are onboarded when they exist
+        return package if package.get("onboardingState", "ONBOARDED") == "ONBOARDED" else None
+
+    def _join_handles(self, handles, timeout):
+        '''Waits until the operations of the handles have finished and returns their results. Fails with all failures
+        if any of them failed.'''
+        timeout = self._wait_until_timeout(timeout)
+        futures = [self.operation_scheduler.future(handle) for handle in handles]
+        _, not_done = wait(futures, timeout)
+        if not_done:
+            pending = [handle for handle, future in zip(handles, futures) if future in not_done]
+            raise Exception(f"{len(pending)}/{len(futures)} operations did not complete in {timeout} seconds: {', '.join(pending)}")
+        failed = [f"{handle}: {future.exception()}" for handle, future in zip(handles, futures) if future.exception() is not None]
+        for handle in handles:
+            self.operation_scheduler.forget(handle)
+        if failed:
+            raise Exception(f"{len(failed)}/{len(futures)} operations failed:\n" + "\n".join(failed))
+        return [future.result() for future in futures]
+
+    def _inventory(self):
+        if self.inventory is None:
+            raise Exception("Inventory has not been synced, use Sync Inventory first.")
+        return self.inventory
+
+    def _mirror_vnf(self, vnf, deleted_id=None):
+        '''Applies a VNF created or deleted by the library to the inventory mirror. Creations and deletions have no
+        operation occurrences, so the incremental sync would not notice them.'''
+        if self.inventory is None:
+            return
+        if vnf is not None:
+            self.inventory.put_vnf(vnf)
+        else:
+            self.inventory.remove_vnf(deleted_id)
+
+    def _operations_entered_since(self, since):
+        '''Returns the operation occurrences that have entered their current state at or after since. Filtered on
+        server side when possible, the filter includes the same second, so no change is missed.'''
+        path = "/vnflcm/v1/vnf_lcm_op_occs"
+        if not since:
+            return list(self._iterate(path))
+        try:
+            return list(self._iterate(path, {"filter": f"(gte,stateEnteredTime,{since})"}))
+        except requests.HTTPError as error:
+            if error.response.status_code != 400:
+                raise
+        return [operation for operation in self._iterate(path) if (operation.get("stateEnteredTime") or "") >= since]
+
+    def _tear_down_targets(self, vnfs, attribute_filter):
+        '''Returns the VNFs matching given IDs, names or attribute filter, and the IDs or names that did not match
+        any VNF.'''
+        values = list(dict.fromkeys(value for item in vnfs for value in (item if isinstance(item, (list, tuple)) else [item])))
+        path = "/vnflcm/v1/vnf_instances"
+        found = {vnf["id"]: vnf for vnf in self._list_by_ids(path, values)} if values else {}
+        names = [value for value in values if value not in found]
+        if names:
+            found.update((vnf["id"], vnf) for vnf in self._list_by_attribute(path, "vnfInstanceName", names))
+        if attribute_filter is not None:
+            found.update((vnf["id"], vnf) for vnf in self._iterate(path, {"filter": attribute_filter}))
+        matched = {value for vnf in found.values() for value in (vnf["id"], vnf.get("vnfInstanceName"))}
+        return list(found.values()), [value for value in values if value not in matched]
+
+    def _delete_unused_packages(self, vnfd_ids):
+        '''Deletes the packages of given VNFDs that no VNF uses anymore. Returns the results per package.'''
+        if not vnfd_ids:
+            return []
+        used = {vnf.get("vnfdId") for vnf in self._iterate("/vnflcm/v1/vnf_instances")}
+        # VNFD ID and package ID are the same in catalog v18, SOL005 packages tell the VNFD ID separately
+        packages = [package for package in self._iterate(self.catalog.endpoint)
+                    if package.get("vnfdId", package["id"]) in vnfd_ids - used]
+        results = []
+        for package in packages:
+            result = {"id": package["id"], "name": package.get("vnfdId"), "status": "DELETED"}
+            started = time.monotonic()
+            try:
+                self.delete_vnfd(package["id"])
+            except requests.HTTPError as error:
+                if error.response.status_code != 404:
+                    result.update(status="FAILED", error=str(error))
+            result["duration"] = round(time.monotonic() - started, 3)
+            results.append(result)
+        return results
+
+    def _vnf_creation_payload(self, vnfd_id, name, description):
+        payload = {
+            "vnfdId": vnfd_id,
+            "vnfInstanceName": name
+        }
+        if description is not None:
+            payload["vnfInstanceDescription"] = description
+        return payload
+
+    def _termination_payload(self, termination_type, graceful_termination_timeout, additional_params):
         payload = {
             "terminationType": termination_type,
             "additionalParams": additional_params
         }
         if graceful_termination_timeout is not None:
             payload["gracefulTerminationTimeout"] = int(graceful_termination_timeout)
-        self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/terminate", json=payload)
+        return payload
 
-    def wait_until_vnf_is_instantiated(self, vnf_id, timeout=None, interval=5):
-        timeout = self.timeout if timeout is None else int(timeout)
-        self._poll_vnf_instantiation_status(vnf_id, "INSTANTIATED", timeout, interval)
+    def _completed_operation(self, operation):
+        '''Returns a completed operation occurrence, fails if the operation has failed or was rolled back.'''
+        if operation["operationState"] != "COMPLETED":
+            raise Exception(f"Operation {operation['id']} {self._operation_failure(operation)}")
+        return operation
 
-    def wait_until_vnf_is_terminated(self, vnf_id, timeout=None, interval=5):
-        timeout = self.timeout if timeout is None else int(timeout)
-        self._poll_vnf_instantiation_status(vnf_id, "NOT_INSTANTIATED", timeout, interval)
+    def _operation_failure(self, operation):
+        error = operation.get("error") or {}
+        detail = error.get("detail") or error.get("title")
+        return f"{operation['operationState']}: {detail}" if detail else operation["operationState"]
+
+    def _wait_until_timeout(self, timeout):
+        return self.wait_until_timeout if timeout is None else int(timeout)
+
+    def _run_batch(self, operation, items, concurrency):
+        '''Runs the async operation for every item concurrently, at most concurrency operations at a time.
+        Fails after all operations have finished if any of them failed.'''
+        items = list(items)
+        async def run_all():
+            engine = AsyncCBAM(self, int(concurrency))
+            try:
+                return await asyncio.gather(*(operation(engine, item) for item in items), return_exceptions=True)
+            finally:
+                engine.close()
+        results = asyncio.run(run_all())
+        failures = [f"{item}: {result}" for item, result in zip(items, results) if isinstance(result, Exception)]
+        if failures:
+            raise Exception(f"{len(failures)}/{len(items)} operations failed:\n" + "\n".join(failures))
+        return results
 
-    def _parse_json_body(self, body):
+    def _parse_json_body(self, body, **variables):
+        '''Returns the request body as bytes with the {{name}} placeholders of JSON files and strings replaced by the
+        variables. Files and strings with placeholders are compiled into templates once, see BodyTemplateCache, others
+        are sent as they are.'''
         # Body can be a dict, a json string, a string pointing to a json file or a list of lines of json string
         # Multiline variables created with BuiltIns Set Variable are created as lists, turn them into a string
         if isinstance(body, list):
             body = "\n".join(body)
+        if isinstance(body, bytes):
+            return body
         if isinstance(body, str):
             # JSON file
             if body.endswith(".json"):
-                return open(body, "rb")
+                return self.body_templates.file(body).render(variables)
             # JSON string
-            return body
+            return self.body_templates.text(body).render(variables)
         # Dict
-        return json.dumps(body)
+        return json.dumps(body).encode()
 
     def _poll_vnf_instantiation_status(self, vnf_id, status, timeout, interval):
-        '''Polls VNF instantiation status on interval, blocks execution until status is correct or timeout is reached.'''
-        index = 0
-        while index * interval < timeout:
+        '''Polls VNF instantiation status with backoff, blocks execution until status is correct or timeout is reached.'''
+        schedule = self._poll_schedule(f"{vnf_id} {status}", timeout, interval, [vnf_id])
+        for _ in schedule:
             current_status = self.get_vnf(vnf_id)['instantiationState']
             if current_status == status:
+                schedule.finish(True)
                 return
-            time.sleep(interval)
-            index += 1
+        schedule.finish(False)
         raise Exception(f"VNF instantiation status did not change to {status} in {timeout} seconds")
 
+    def _poll_package_onboarding(self, package_id, timeout, interval):
+        '''Polls the package until CBAM has processed its content and returns the package with the ID of its VNFD.
+        SOL005 onboarding continues in the background after the upload has been accepted.'''
+        schedule = self._poll_schedule(f"{package_id} ONBOARDED", timeout, interval)
+        for _ in schedule:
+            package = self.get_vnfd(package_id)
+            # Catalog v18 packages do not have an onboarding state, they are onboarded when they exist
+            state = package.get("onboardingState", "ONBOARDED")
+            if state == "ERROR":
+                schedule.finish(False)
+                raise Exception(f"Onboarding package {package_id} failed: {package.get('onboardingFailureDetails', {}).get('detail', 'no details')}")
+            if state == "ONBOARDED":
+                schedule.finish(True)
+                if not package.get("vnfdId"):
+                    raise Exception(f"Package {package_id} was onboarded without a vnfdId")
+                return package
+        schedule.finish(False)
+        raise Exception(f"Package {package_id} was not onboarded in {timeout} seconds, state is {state}")
+
+    def _poll_vnfs_instantiation_status(self, vnf_ids, status, timeout, interval):
+        '''Polls instantiation status of multiple VNFs with one list request per interval. VNFs reaching the status
+        are dropped from the polled set. Returns the final state and wait duration of each VNF.'''
+        pending = list(dict.fromkeys(vnf_ids))
+        states = {}
+        outcomes = {}
+        schedule = self._poll_schedule(f"{len(pending)} VNFs {status}", timeout, interval, pending)
+        for _ in schedule:
+            for vnf in self._list_by_ids("/vnflcm/v1/vnf_instances", pending):
+                states[vnf["id"]] = vnf["instantiationState"]
+                if vnf["instantiationState"] == status:
+                    outcomes[vnf["id"]] = {"instantiationState": status, "duration": round(schedule.elapsed(), 3)}
+            pending = [vnf_id for vnf_id in pending if vnf_id not in outcomes]
+            if not pending:
+                schedule.finish(True)
+                return outcomes
+        schedule.finish(False)
+        not_ready = ", ".join(f"{vnf_id} ({states.get(vnf_id, 'NOT FOUND')})" for vnf_id in pending)
+        raise Exception(f"VNF instantiation status did not change to {status} in {timeout} seconds: {not_ready}")
+
+    def _poll_schedule(self, description, timeout, interval, notification_keys=()):
+        '''Creates a poll schedule. When the notification receiver is running, sleeps between the polls end early
+        when a notification about any of the notification keys arrives.'''
+        waiter = self.notifications.waiter(notification_keys) if self.notification_receiver is not None and notification_keys else None
+        return PollSchedule(description, timeout, float(interval), statistics=self.poll_statistics, waiter=waiter, **self.polling_options)
+
+    def _list_by_ids(self, path, ids):
+        return self._list_by_attribute(path, "id", ids)
+
+    def _list_by_attribute(self, path, attribute, values):
+        '''Fetches resources with any of the given values of an attribute with list requests, filtered on server side
+        when the server supports attribute filters.'''
+        if self.attribute_filters_supported:
+            try:
+                resources = []
+                for index in range(0, len(values), self.filter_batch_size):
+                    batch = ",".join(_filter_value(value) for value in values[index:index + self.filter_batch_size])
+                    resources += self._iterate(path, {"filter": f"(in,{attribute},{batch})"})
+                return resources
+            except requests.HTTPError as error:
+                if error.response.status_code != 400:
+                    raise
+                self.attribute_filters_supported = False
+        wanted = set(values)
+        return [resource for resource in self._iterate(path) if resource.get(attribute) in wanted]
+
+    def _iterate(self, path, params=None, attributes=None):
+        '''Yields the items of a list resource, following the SOL013 paging links lazily page by page. When list
+        responses are streamed, the items are parsed one at a time and the rest of the response is not read if the
+        caller stops iterating. Only the given attributes of the items are kept, if any.'''
+        select = functools.partial(_select_attributes, attributes=attributes) if attributes else None
+        while True:
+            if self.stream_list_responses:
+                response = self.connection.get(path, params=params, stream=True)
+                with closing(response):
+                    yield from iterate_json_array(response.iter_content(self.stream_chunk_size), select)
+            else:
+                response = self.connection.get(path, params=params)
+                yield from map(select, response.json()) if select else response.json()
+            next_page = response.links.get("next", {}).get("url")
+            if next_page is None:
+                return
+            # Next page link contains the original query parameters and the paging marker
+            url = urlsplit(next_page)
+            path = f"{url.path}?{url.query}" if url.query else url.path
+            params = None
+
+    def _projection_params(self, fields, exclude_default):
+        params = {}
+        if fields:
+            params["fields"] = fields if isinstance(fields, str) else ",".join(fields)
+        if _to_bool(exclude_default):
+            params["exclude_default"] = ""
+        return params
+
+
+class VnfNameIndex:
+    '''Keeps VNFs found by name for ttl seconds, so repeated lookups of the same name do not need API calls.
+    Entries are invalidated when the library changes the VNF.'''
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None or time.monotonic() >= entry[0]:
+                return None
+            return entry[1]
+
+    def add(self, vnf):
+        if self.ttl > 0:
+            with self.lock:
+                self.entries[vnf["vnfInstanceName"]] = (time.monotonic() + self.ttl, vnf)
+
+    def invalidate(self, vnf_id=None, name=None):
+        with self.lock:
+            self.entries = {key: entry for key, entry in self.entries.items() if key != name and entry[1]["id"] != vnf_id}
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+
+class OperationScheduler:
+    '''Runs LCM operations so that operations on the same VNF run one at a time in FIFO order, while operations on
+    different VNFs run concurrently. Operations are started by a shared worker pool and the next operation on a VNF
+    is started only after the previous operation occurrence has finished. Running operation occurrences are polled
+    together with list requests from a single monitor thread.'''
+
+    def __init__(self, library, workers=10, interval=5):
+        self.library = library
+        self.condition = threading.Condition()
+        self.queues = {}
+        # Running operation occurrences by id: (vnf id, future, deadline)
+        self.running = {}
+        self.futures = {}
+        self.sequence = 0
+        self.executor = None
+        self.monitor = None
+        self.set_options(workers, interval)
+
+    def set_options(self, workers, interval):
+        with self.condition:
+            self.workers = workers
+            self.interval = interval
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+    def submit(self, vnf_id, start):
+        '''Queues an operation on the VNF. start is called to start the operation and returns the id of the operation
+        occurrence, or None if there is nothing to wait for. Returns a handle for the operation.'''
+        future = Future()
+        with self.condition:
+            handle = self._register(future)
+            queue = self.queues.setdefault(vnf_id, deque())
+            queue.append((start, future))
+            if len(queue) == 1:
+                self._start_next(vnf_id)
+        return handle
+
+    def run(self, function):
+        '''Runs a function that does not operate on a single VNF, e.g. onboarding, on the worker pool. Returns a handle
+        for it.'''
+        future = Future()
+        with self.condition:
+            handle = self._register(future)
+            self._executor().submit(self._run, function, future)
+        return handle
+
+    def handles(self):
+        with self.condition:
+            return list(self.futures)
+
+    def future(self, handle):
+        with self.condition:
+            if handle not in self.futures:
+                raise ValueError(f"Unknown scheduled operation '{handle}'")
+            return self.futures[handle]
+
+    def forget(self, handle):
+        with self.condition:
+            self.futures.pop(handle, None)
+
+    def _register(self, future):
+        self.sequence += 1
+        handle = f"handle-{self.sequence}"
+        self.futures[handle] = future
+        return handle
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def _run(self, function, future):
+        try:
+            future.set_result(function())
+        except Exception as error:
+            future.set_exception(error)
+
+    def _start_next(self, vnf_id):
+        start, future = self.queues[vnf_id][0]
+        self._executor().submit(self._start, vnf_id, start, future)
+
+    def _start(self, vnf_id, start, future):
+        try:
+            operation_id = start()
+        except Exception as error:
+            self._finish(vnf_id, future, exception=error)
+            return
+        if operation_id is None:
+            self._finish(vnf_id, future)
+            return
+        with self.condition:
+            self.running[operation_id] = (vnf_id, future, time.monotonic() + self.library._wait_until_timeout(None))
+            if self.monitor is None:
+                self.monitor = threading.Thread(target=self._monitor, daemon=True)
+                self.monitor.start()
+            self.condition.notify_all()
+
+    def _finish(self, vnf_id, future, result=None, exception=None):
+        with self.condition:
+            queue = self.queues[vnf_id]
+            queue.popleft()
+            if queue:
+                self._start_next(vnf_id)
+            else:
+                del self.queues[vnf_id]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _monitor(self):
+        try:
+            self._poll_running()
+        except Exception as error:
+            logger.warning(f"Monitoring scheduled operations failed: {error}")
+            # Fail the running operations rather than leave their handles pending, the next operation that starts
+            # starts a new monitor
+            with self.condition:
+                failed = list(self.running.items())
+                self.running.clear()
+                self.monitor = None
+            for operation_id, (vnf_id, future, _) in failed:
+                self._finish(vnf_id, future, exception=Exception(f"Monitoring operation {operation_id} failed: {error}"))
+        finally:
+            with self.condition:
+                if self.monitor is threading.current_thread():
+                    self.monitor = None
+
+    def _poll_running(self):
+        delay = self.library.polling_options["initial_interval"]
+        while True:
+            with self.condition:
+                if not self.running:
+                    self.monitor = None
+                    return
+                operation_ids = list(self.running)
+            waiter = self._waiter(operation_ids)
+            try:
+                operations = self.library._list_by_ids("/vnflcm/v1/vnf_lcm_op_occs", operation_ids)
+                finished = {operation["id"]: operation for operation in operations
+                            if operation["operationState"] == "COMPLETED" or operation["operationState"] in self.library.failed_operation_states}
+            except Exception as error:
+                # E.g. a non-JSON body or an occurrence without operationState, the next poll may succeed
+                logger.info(f"Polling scheduled operations failed, retrying: {error}")
+                finished = {}
+            with self.condition:
+                now = time.monotonic()
+                expired = [operation_id for operation_id, (_, _, deadline) in self.running.items() if operation_id not in finished and now >= deadline]
+                done = [(operation_id, self.running.pop(operation_id)) for operation_id in list(finished) + expired]
+            for operation_id, (vnf_id, future, _) in done:
+                if operation_id in finished:
+                    try:
+                        self._finish(vnf_id, future, self.library._completed_operation(finished[operation_id]))
+                    except Exception as error:
+                        self._finish(vnf_id, future, exception=error)
+                else:
+                    self._finish(vnf_id, future, exception=Exception(f"Operation {operation_id} did not complete in {self.library._wait_until_timeout(None)} seconds"))
+            # Poll quickly while operations keep finishing, back off while they are running
+            delay = self.library.polling_options["initial_interval"] if done else min(self.interval, delay * self.library.polling_options["backoff_factor"])
+            if waiter is not None:
+                waiter.sleep(delay)
+            else:
+                time.sleep(delay)
+
+    def _waiter(self, operation_ids):
+        '''Returns a notification waiter marked before the poll, so the sleep after the poll ends early when a
+        notification about any of the running operations arrives. Returns None if the receiver is not running.'''
+        if self.library.notification_receiver is None:
+            return None
+        waiter = self.library.notifications.waiter(operation_ids)
+        waiter.mark()
+        return waiter
+
+
+class PollSchedule:
+    '''Schedules polling against a monotonic deadline. The interval starts short and grows exponentially with jitter
+    up to max_interval, so fast operations are noticed quickly without polling CBAM at a constant rate during long
+    ones. Iterating the schedule, synchronously or with async for, sleeps between the polls and stops once the
+    deadline has passed. The last poll is made at the deadline. Synchronous sleeps are done with the waiter, if
+    given, which can wake up early when a notification arrives.'''
+
+    def __init__(self, description, timeout, max_interval, initial_interval=0.5, backoff_factor=2, jitter=0.1, statistics=None, waiter=None):
+        self.description = description
+        self.timeout = timeout
+        self.max_interval = max_interval
+        self.interval = min(initial_interval, max_interval)
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.statistics = statistics
+        self.waiter = waiter
+        self.polls = 0
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+
+    def __iter__(self):
+        while True:
+            self.polls += 1
+            if self.waiter is not None:
+                # Notifications arriving during the poll end the following sleep
+                self.waiter.mark()
+            yield self.polls
+            delay = self.next_delay()
+            if delay is None:
+                return
+            if self.waiter is not None:
+                self.waiter.sleep(delay)
+            else:
+                time.sleep(delay)
+
+    async def __aiter__(self):
+        while True:
+            self.polls += 1
+            yield self.polls
+            delay = self.next_delay()
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    def next_delay(self):
+        '''Returns the time to wait before the next poll or None if the deadline has passed.'''
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+        return min(delay, remaining)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def finish(self, succeeded):
+        if self.statistics is not None:
+            self.statistics.append({
+                "wait": self.description,
+                "succeeded": succeeded,
+                "polls": self.polls,
+                "duration": round(self.elapsed(), 3)
+            })
+
 
 class Connection:
-    def __init__(self, host, client_id, client_secret, **kwargs):
-        self.host = host
+    def __init__(self, host, client_id, client_secret, token_cache=None, metrics=None, **kwargs):
+        # Host can be a list or a comma separated string of the nodes of one CBAM, which share the realm and tokens
+        hosts = [name.strip() for name in (host.split(",") if isinstance(host, str) else host)]
+        self.host = ",".join(hosts)
+        # Host may include the scheme, e.g. when connecting to a plain http test server
+        self.hosts = HostPool([name if "://" in name else f"https://{name}" for name in hosts])
         self.client_id = client_id
         self.client_secret = client_secret
+        self.session = None
+        self.token_lock = threading.Lock()
+        self.token_cache = FileCache(token_cache) if token_cache else None
+        self.refresh_timer = None
+        self.metrics = metrics or RequestMetrics()
+        self.access_token = None
+        self.refresh_token = None
+        self.closed = False
+        self.set_options(**kwargs)
+        self.refresh_access_token()
+
+    def set_options(self, pool_connections=10, pool_maxsize=10, max_retries=0, retry_backoff_factor=0, keep_alive=True, token_refresh_margin=30, response_cache_size=32 * 1024 * 1024, max_in_flight=None, throttle_retries=5, throttle_backoff=1, max_host_failures=3, host_ejection_time=30, **kwargs):
+        '''Sets requests kwargs used for every request and recreates the pooled session with the given pool options.'''
         self.global_kwargs = kwargs
-        self.request_token()
-        self.refresh_token_used = False
+        self.token_refresh_margin = float(token_refresh_margin)
+        self.response_cache = ResponseCache(int(response_cache_size)) if int(response_cache_size) > 0 else None
+        # The connections are pooled per host
+        self.limiter = AdaptiveLimiter(int(max_in_flight or int(pool_maxsize) * len(self.hosts)))
+        self.hosts.max_failures = int(max_host_failures)
+        self.hosts.ejection_time = float(host_ejection_time)
+        self.throttle_retries = int(throttle_retries)
+        self.throttle_backoff = float(throttle_backoff)
+        if self.session is not None:
+            self.session.close()
+        self.session = self._create_session(int(pool_connections), int(pool_maxsize), int(max_retries), float(retry_backoff_factor), _to_bool(keep_alive))
+
+    def _create_session(self, pool_connections, pool_maxsize, max_retries, retry_backoff_factor, keep_alive):
+        session = requests.Session()
+        retries = Retry(total=max_retries, backoff_factor=retry_backoff_factor)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
 
     def request_token(self, grant_type="client_credentials", options={}):
-        default = {
-            "grant_type": grant_type,
-            "client_id": self.client_id,
-            "client_secret": self.client_secret
-        }
-        response = requests.post(f"https://{self.host}/auth/realms/cbam/protocol/openid-connect/token", data={**default, **options}, **self.global_kwargs)
+        response = self._post_token_request(grant_type, options)
         if response.status_code != 200:
             raise Exception("Token request failed: " + response.text)
-        self.access_token = response.json()["access_token"]
-        self.refresh_token = response.json()["refresh_token"]
+        self._store_tokens(response.json(), time.time())
 
-    def refresh_access_token(self):
-        self.request_token(grant_type="refresh_token", options={"refresh_token": self.refresh_token})
-        self.refresh_token_used = True
+    def refresh_access_token(self, expired_token=None):
+        '''Refreshes the access token. Concurrent callers share a single refresh: callers that were waiting for the lock
+        see that the token they used has already been replaced and return without requesting a new one.'''
+        with self.token_lock:
+            if expired_token is not None and expired_token != self.access_token:
+                return
+            if self.token_cache is None:
+                self._renew_tokens()
+                return
+            key = f"{self.host} {self.client_id}"
+            with self.token_cache.locked():
+                # Another process sharing the cache may have renewed the token already
+                cached = self.token_cache.read(key)
+                if cached is not None and cached["access_token"] != expired_token and self._cached_tokens_valid(cached):
+                    self._store_tokens(cached, cached["issued_at"])
+                    return
+                self._renew_tokens()
+                self.token_cache.write(key, {**self.tokens, "issued_at": self.tokens_issued_at})
+
+    def _renew_tokens(self):
+        self.metrics.increment("token_refreshes")
+        if self.refresh_token is not None and not self._expired(self.refresh_token_expires, 0):
+            response = self._post_token_request("refresh_token", {"refresh_token": self.refresh_token})
+            if response.status_code == 200:
+                self._store_tokens(response.json(), time.time())
+                return
+        # Refresh token has expired or was rejected, log in again with client credentials
+        self.request_token()
 
     def request(self, method, path, **kwargs):
-        url = f"https://{self.host}{path}"
-        auth_header = {"Authorization": f"Bearer {self.access_token}"}
-        kwargs["headers"] = {**auth_header, **kwargs["headers"]} if "headers" in kwargs else auth_header
-        response = getattr(requests, method)(url, **kwargs, **self.global_kwargs)
-        if response.status_code == 401 and not self.refresh_token_used:
-            self.refresh_access_token()
-            # Remove previous, expired auth header
-            kwargs["headers"].pop("Authorization")
-            return self.request(method, path, **kwargs)
+        cache = self.response_cache
+        if cache is not None and method == "get" and not kwargs.get("stream"):
+            return self._conditional_get(cache, path, **kwargs)
+        try:
+            return self._authorized_request(method, path, **kwargs)
+        finally:
+            if cache is not None and method != "get":
+                cache.invalidate(path)
+
+    def _conditional_get(self, cache, path, params=None, headers={}, **kwargs):
+        '''Sends a GET request with the validators of a cached response, if any, and reuses the cached body when
+        the server responds 304 Not Modified.'''
+        key = f"{path}?{urlencode(params, doseq=True)}" if params else path
+        entry = cache.get(key)
+        if entry is not None:
+            headers = {**entry.validators(), **headers}
+        response = self._authorized_request("get", path, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            cache.hit()
+            return entry.response(response)
+        cache.store(key, path, response)
+        return response
+
+    def _authorized_request(self, method, path, **kwargs):
+        response, token = self._limited_send(method, path, **kwargs)
+        if response.status_code == 401:
+            self.refresh_access_token(expired_token=token)
+            self.metrics.increment("retries")
+            response, _ = self._limited_send(method, path, **kwargs)
         response.raise_for_status()
-        self.refresh_token_used = False
         return response
 
+    def _current_token(self):
+        '''Returns the access token, refreshed first if it expires within the refresh margin.'''
+        token = self.access_token
+        if self._expired(self.access_token_expires, self._refresh_margin()):
+            self.refresh_access_token(expired_token=token)
+            token = self.access_token
+        return token
+
+    def _limited_send(self, method, path, **kwargs):
+        '''Sends a request within the adaptive concurrency limit and returns the response and the access token it was
+        sent with. Requests throttled with 429 or 503 are retried after the Retry-After delay, or with exponential
+        backoff if the server does not give one.'''
+        for attempt in range(self.throttle_retries + 1):
+            with self.limiter.slot() as started:
+                # Read for every attempt, the token may have expired while waiting for the slot or backing off
+                token = self._current_token()
+                response = self._send(method, path, token, **kwargs)
+            if response.status_code not in (429, 503):
+                self.limiter.succeeded()
+                return response, token
+            retry_after = _retry_after(response)
+            self.limiter.throttled(started)
+            self.metrics.increment("throttled")
+            if attempt == self.throttle_retries or not _retryable(method, response.status_code, kwargs):
+                return response, token
+            delay = retry_after if retry_after is not None else self.throttle_backoff * 2 ** attempt * random.uniform(0.5, 1)
+            logger.info(f"{method.upper()} {path} was throttled with {response.status_code}, retrying in {delay:.1f} seconds")
+            response.close()
+            self.metrics.increment("retries")
+            time.sleep(delay)
+
+    def _send(self, method, path, token, headers={}, **kwargs):
+        headers = {"Authorization": f"Bearer {token}", **headers}
+        return self._balanced(method, path, functools.partial(self.session.request, method), headers=headers, **kwargs, **self.global_kwargs)
+
+    def _balanced(self, method, path, send, **kwargs):
+        '''Sends a request to the host chosen by the host pool. A request failing with a connection error is sent to
+        the next host if it is safe to repeat, until every host has been tried.'''
+        tried = []
+        while True:
+            with self.hosts.host(exclude=tried) as host:
+                try:
+                    response = self._measured(method, path, send, f"{host.base_url}{path}", **kwargs)
+                except requests.RequestException as error:
+                    self.hosts.failed(host)
+                    tried.append(host)
+                    if len(tried) == len(self.hosts) or not _failover_allowed(method, error, kwargs):
+                        raise
+                    logger.info(f"{method.upper()} {path} failed on {host.base_url}, sending it to another host: {error}")
+                    self.metrics.increment("failovers")
+                    continue
+            if response.status_code >= 500:
+                self.hosts.failed(host)
+            else:
+                self.hosts.succeeded(host)
+            return response
+
+    def _measured(self, method, path, send, *args, **kwargs):
+        '''Sends a request with the given function and records its metrics.'''
+        started = time.monotonic()
+        try:
+            response = send(*args, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(method, path, "error", time.monotonic() - started)
+            raise
+        # Streamed response bodies are not read here, their size is taken from the headers
+        received = int(response.headers.get("Content-Length", 0)) if kwargs.get("stream") else len(response.content)
+        self.metrics.record(method, path, response.status_code, time.monotonic() - started, _body_size(response.request.body), received)
+        retries = getattr(response.raw, "retries", None)
+        self.metrics.increment("retries", len(retries.history) if retries is not None else 0)
+        return response
+
+    def _post_token_request(self, grant_type, options):
+        default = {
+            "grant_type": grant_type,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        path = "/auth/realms/cbam/protocol/openid-connect/token"
+        return self._balanced("post", path, self.session.post, data={**default, **options}, **self.global_kwargs)
+
+    def _store_tokens(self, tokens, issued_at):
+        self.tokens = {key: value for key, value in tokens.items() if key != "issued_at"}
+        self.tokens_issued_at = issued_at
+        self.access_token = tokens["access_token"]
+        self.refresh_token = tokens.get("refresh_token")
+        # Keycloak uses 0 for tokens that do not expire, e.g. offline tokens
+        self.access_token_lifetime = tokens.get("expires_in") or None
+        self.access_token_expires = issued_at + self.access_token_lifetime if self.access_token_lifetime else None
+        self.refresh_token_expires = issued_at + tokens["refresh_expires_in"] if tokens.get("refresh_expires_in") else None
+        self._schedule_refresh()
+
+    def _cached_tokens_valid(self, cached):
+        if not cached.get("expires_in"):
+            return True
+        margin = min(self.token_refresh_margin, cached["expires_in"] / 2)
+        return not self._expired(cached["issued_at"] + cached["expires_in"], margin)
+
+    def close(self):
+        '''Stops the background token refresh and closes the pooled connections.'''
+        with self.token_lock:
+            self.closed = True
+            if self.refresh_timer is not None:
+                self.refresh_timer.cancel()
+                self.refresh_timer = None
+        self.session.close()
+
+    def _schedule_refresh(self):
+        if self.refresh_timer is not None:
+            self.refresh_timer.cancel()
+        if self.access_token_expires is None or self.closed:
+            return
+        delay = max(self.access_token_expires - self._refresh_margin() - time.time(), 0)
+        self.refresh_timer = threading.Timer(delay, self._refresh_in_background, args=(self.access_token,))
+        self.refresh_timer.daemon = True
+        self.refresh_timer.start()
+
+    def _refresh_in_background(self, expired_token):
+        if self.closed:
+            return
+        try:
+            self.refresh_access_token(expired_token=expired_token)
+        except Exception:
+            # Failed background refresh is retried by the next request
+            pass
+
+    def _refresh_margin(self):
+        # Short-lived tokens are refreshed halfway through their lifetime instead
+        return min(self.token_refresh_margin, self.access_token_lifetime / 2) if self.access_token_lifetime else 0
+
+    def _expired(self, expires, margin):
+        return expires is not None and time.time() >= expires - margin
+
     def get(self, path, **kwargs):
         return self.request("get", path, **kwargs)
 
@@ -190,23 +1318,500 @@ class Connection:
         return self.request("patch", path, **kwargs)
 
 
+class AsyncConnection:
+    '''Asyncio counterpart of Connection. Requests are run on the thread-safe Connection in an executor, so the
+    async engine shares the connection pool and tokens with the synchronous keywords. Must be created inside
+    a running event loop.'''
+
+    def __init__(self, connection, concurrency):
+        self.connection = connection
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def request(self, method, path, **kwargs):
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(self.connection.request, method, path, **kwargs))
+
+    async def get(self, path, **kwargs):
+        return await self.request("get", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("post", path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request("put", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("delete", path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.request("patch", path, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class AsyncCBAM:
+    '''Asyncio versions of the VNF lifecycle operations, used by the batch keywords.'''
+
+    def __init__(self, library, concurrency):
+        self.library = library
+        self.connection = AsyncConnection(library.connection, concurrency)
+
+    async def create_vnf(self, vnfd_id, name, description=None):
+        self.library.vnf_name_index.invalidate(name=name)
+        response = await self.connection.post("/vnflcm/v1/vnf_instances", json=self.library._vnf_creation_payload(vnfd_id, name, description))
+        vnf = response.json()
+        self.library._mirror_vnf(vnf)
+        return vnf
+
+    async def delete_vnf(self, vnf_id):
+        self.library.vnf_name_index.invalidate(vnf_id=vnf_id)
+        await self.connection.delete(f"/vnflcm/v1/vnf_instances/{vnf_id}")
+        self.library._mirror_vnf(None, deleted_id=vnf_id)
+
+    async def get_vnf(self, vnf_id):
+        response = await self.connection.get(f"/vnflcm/v1/vnf_instances/{vnf_id}")
+        return response.json()
+
+    async def get_operation(self, operation_id):
+        response = await self.connection.get(f"/vnflcm/v1/vnf_lcm_op_occs/{operation_id}")
+        return response.json()
+
+    async def instantiate_vnf(self, vnf_id, instantiation_json, **variables):
+        self.library.vnf_name_index.invalidate(vnf_id=vnf_id)
+        response = await self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/instantiate", data=self.library._parse_json_body(instantiation_json, vnf_id=vnf_id, **variables))
+        return _operation_occurrence_id(response)
+
+    async def terminate_vnf(self, vnf_id, termination_type="GRACEFUL", graceful_termination_timeout=None, **additional_params):
+        payload = self.library._termination_payload(termination_type, graceful_termination_timeout, additional_params)
+        self.library.vnf_name_index.invalidate(vnf_id=vnf_id)
+        response = await self.connection.post(f"/vnflcm/v1/vnf_instances/{vnf_id}/terminate", json=payload)
+        return _operation_occurrence_id(response)
+
+    async def wait_until_operation_completes(self, operation_id, timeout, interval=5):
+        schedule = self.library._poll_schedule(f"{operation_id} COMPLETED", timeout, interval)
+        async for _ in schedule:
+            operation = await self.get_operation(operation_id)
+            if operation["operationState"] == "COMPLETED" or operation["operationState"] in self.library.failed_operation_states:
+                schedule.finish(operation["operationState"] == "COMPLETED")
+                return self.library._completed_operation(operation)
+        schedule.finish(False)
+        raise Exception(f"Operation {operation_id} did not complete in {timeout} seconds, state is {operation['operationState']}")
+
+    async def wait_until_operation_or_state(self, operation_id, vnf_id, status, timeout, interval=5):
+        '''Waits on the operation occurrence when CBAM returned one, otherwise on the VNF instantiation state.'''
+        if operation_id is not None:
+            await self.wait_until_operation_completes(operation_id, timeout, interval)
+        else:
+            await self._poll_vnf_instantiation_status(vnf_id, status, timeout, interval)
+
+    async def wait_until_vnf_is_instantiated(self, vnf_id, timeout, interval=5):
+        await self._poll_vnf_instantiation_status(vnf_id, "INSTANTIATED", timeout, interval)
+
+    async def wait_until_vnf_is_terminated(self, vnf_id, timeout, interval=5):
+        await self._poll_vnf_instantiation_status(vnf_id, "NOT_INSTANTIATED", timeout, interval)
+
+    async def _poll_vnf_instantiation_status(self, vnf_id, status, timeout, interval):
+        schedule = self.library._poll_schedule(f"{vnf_id} {status}", timeout, interval)
+        async for _ in schedule:
+            current_status = (await self.get_vnf(vnf_id))['instantiationState']
+            if current_status == status:
+                schedule.finish(True)
+                return
+        schedule.finish(False)
+        raise Exception(f"VNF instantiation status did not change to {status} in {timeout} seconds")
+
+    def close(self):
+        self.connection.close()
+
+
+class AdaptiveLimiter:
+    '''Limits the number of concurrent requests with additive increase and multiplicative decrease (AIMD). The limit
+    grows by about one request for every limit's worth of successful requests and is halved when the server throttles.
+    For cooldown seconds after a throttle the limit does not grow back to the level that was throttled, so it settles
+    just below the capacity of the server instead of overloading it again and again.'''
+
+    def __init__(self, max_limit, min_limit=1, decrease_factor=0.5, cooldown=30):
+        self.condition = threading.Condition()
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.last_decrease = 0
+        # Highest limit allowed until the cooldown of the last throttle has passed
+        self.ceiling = float(max_limit)
+        self.ceiling_until = 0
+
+    @contextmanager
+    def slot(self):
+        '''Waits until a request can be sent and yields the time it was started.'''
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        try:
+            yield time.monotonic()
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def succeeded(self):
+        with self.condition:
+            ceiling = self.ceiling if time.monotonic() < self.ceiling_until else self.max_limit
+            self.limit = max(self.limit, min(ceiling, self.limit + 1 / self.limit))
+            self.condition.notify_all()
+
+    def throttled(self, started):
+        with self.condition:
+            # Requests sent before the previous decrease were throttled by the same overload, decrease only once for them
+            if started >= self.last_decrease:
+                self.ceiling = max(self.min_limit, int(self.limit) - 1)
+                self.ceiling_until = time.monotonic() + self.cooldown
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self.last_decrease = time.monotonic()
+                logger.info(f"Server is throttling requests, limiting concurrent requests to {int(self.limit)}")
+
+
+class Host:
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.total_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0
+
+
+class HostPool:
+    '''Hosts of a connection. Each request goes to the available host with the fewest outstanding requests. A host
+    that fails max_failures times in a row, with connection errors or 5xx responses, is ejected for ejection_time
+    seconds, doubled for each further ejection without a success in between. If all hosts are ejected, the one
+    whose ejection ends first is used.'''
+
+    def __init__(self, base_urls, max_failures=3, ejection_time=30):
+        self.hosts = [Host(base_url) for base_url in base_urls]
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.hosts)
+
+    @contextmanager
+    def host(self, exclude=()):
+        with self.lock:
+            now = time.monotonic()
+            candidates = [host for host in self.hosts if host not in exclude]
+            available = [host for host in candidates if host.ejected_until <= now]
+            if not available:
+                available = [min(candidates, key=lambda host: host.ejected_until)]
+            # Ties go to the host with the fewest requests, so idle hosts take turns
+            host = min(available, key=lambda host: (host.outstanding, host.requests))
+            host.outstanding += 1
+            host.requests += 1
+        try:
+            yield host
+        finally:
+            with self.lock:
+                host.outstanding -= 1
+
+    def succeeded(self, host):
+        with self.lock:
+            host.failures = 0
+            host.ejections = 0
+
+    def failed(self, host):
+        with self.lock:
+            host.failures += 1
+            host.total_failures += 1
+            now = time.monotonic()
+            if host.failures >= self.max_failures and host.ejected_until <= now and len(self.hosts) > 1:
+                duration = min(self.ejection_time * 2 ** host.ejections, self.ejection_time * 10)
+                host.ejected_until = now + duration
+                host.ejections += 1
+                host.failures = 0
+                logger.warning(f"{host.base_url} failed {self.max_failures} times in a row, ejecting it for {duration:.0f} seconds")
+
+    def statistics(self):
+        with self.lock:
+            now = time.monotonic()
+            return [{
+                "host": host.base_url,
+                "available": host.ejected_until <= now,
+                "outstanding": host.outstanding,
+                "requests": host.requests,
+                "failures": host.total_failures,
+                "ejections": host.ejections,
+                "ejected_for": round(max(host.ejected_until - now, 0), 1)
+            } for host in self.hosts]
+
+
+class ResponseCache:
+    '''LRU cache of GET responses that have ETag or Last-Modified validators, bounded by the total size of the
+    cached bodies. Cached responses are always revalidated with a conditional request, so they are never stale.'''
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def store(self, key, path, response):
+        with self.lock:
+            self.misses += 1
+            self._remove(key)
+            entry = CachedResponse(path, response)
+            if response.status_code != 200 or not entry.validators() or len(entry.content) > self.max_size:
+                return
+            self.entries[key] = entry
+            self.size += len(entry.content)
+            while self.size > self.max_size:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, path):
+        '''Removes cached responses of the path, its sub-resources and the collections containing it.'''
+        path = path.split("?")[0].rstrip("/")
+        with self.lock:
+            for key, entry in list(self.entries.items()):
+                if entry.path.startswith(path) or path.startswith(entry.path):
+                    self._remove(key)
+
+    def statistics(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self.entries), "size": self.size}
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.content)
+
+
+class CachedResponse:
+
+    def __init__(self, path, response):
+        self.path = path.split("?")[0].rstrip("/")
+        self.content = response.content
+        self.headers = response.headers
+        self.encoding = response.encoding
+
+    def validators(self):
+        validators = {}
+        if "ETag" in self.headers:
+            validators["If-None-Match"] = self.headers["ETag"]
+        if "Last-Modified" in self.headers:
+            validators["If-Modified-Since"] = self.headers["Last-Modified"]
+        return validators
+
+    def response(self, not_modified):
+        '''Builds a response from the cached body for a 304 Not Modified response.'''
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response._content = self.content
+        response.headers = requests.structures.CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        return response
+
+
+class FileCache:
+    '''Cache shared between processes, e.g. pabot workers, through a JSON file guarded with a lock file.'''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    @contextmanager
+    def locked(self):
+        with open(self.lock_path, "a+") as lock_file:
+            _lock_file(lock_file)
+            try:
+                yield
+            finally:
+                _unlock_file(lock_file)
+
+    def read(self, key):
+        return self._read_all().get(key)
+
+    def write(self, key, value):
+        entries = self._read_all()
+        if value is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = value
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        # Cache may contain secrets, keep it readable only by the owner
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temp_path, self.path)
+
+    def _read_all(self):
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+
+def _lock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _operation_occurrence_id(response):
+    '''Returns the id of the operation occurrence from the Location header of a lifecycle operation response.'''
+    location = response.headers.get("Location")
+    return location.rstrip("/").rsplit("/", 1)[-1] if location else None
+
+
+def _filter_value(value):
+    '''Quotes a value for an SOL013 attribute filter if it contains characters with a special meaning.'''
+    if any(character in value for character in ",()'"):
+        return "'" + value.replace("'", "''") + "'"
+    return value
+
+
+def _select_attributes(resource, attributes):
+    '''Picks given attributes from a resource. Nested attributes are given as paths, e.g. instantiatedVnfInfo/vnfState.'''
+    selected = {}
+    for attribute in attributes:
+        value = resource
+        for key in attribute.split("/"):
+            value = value.get(key) if isinstance(value, dict) else None
+        selected[attribute] = value
+    return selected
+
+
+def _retry_after(response):
+    '''Returns the Retry-After delay of a response in seconds, or None if the response does not have a valid one.'''
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(method, status_code, kwargs):
+    '''Tells if a throttled request can be sent again. 429 means the request was not processed, but after 503 only
+    idempotent requests are safe to repeat. File objects as bodies have been read already.'''
+    if hasattr(kwargs.get("data"), "read"):
+        return False
+    return status_code == 429 or method in ("get", "head", "options", "put", "delete")
+
+
+def _failover_allowed(method, error, kwargs):
+    '''Tells if a request that failed with a connection error can be sent to another host. Requests that never
+    reached the host can always be sent again, others only if they are idempotent. File objects as bodies have been
+    read already.'''
+    if hasattr(kwargs.get("data"), "read"):
+        return False
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    if isinstance(error, requests.ConnectTimeout) or isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError)):
+        return True
+    return method in ("get", "head", "options", "put", "delete") and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    # Bytes and the upload streams know their length, other iterables are not measured
+    return len(body) if hasattr(body, "__len__") else 0
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.lower() not in ("false", "no", "off", "0", "none", "")
+    return bool(value)
+
+
 class CatalogSOL005:
     endpoint = "/vnfpkgm/v1/vnf_packages"
 
     def __init__(self, connection):
         self.connection = connection
 
-    def onboard_vnfd(self, vnfd):
+    def onboard_vnfd(self, vnfd, part_size=None, max_attempts=3):
         response = self.create_vnf_package_resource()
-        self.upload_vnf_package_content(response['id'], vnfd)
+        self.upload_vnf_package_content(response['id'], vnfd, part_size, max_attempts)
         return response
 
     def create_vnf_package_resource(self):
         response = self.connection.post(self.endpoint)
         return response.json()
 
-    def upload_vnf_package_content(self, vnfPkgId, vnfd):
-        self.connection.put(self.endpoint + f"/{vnfPkgId}/package_content", headers = {'Content-Type': 'application/zip'}, data = open(vnfd, "rb"))
+    def upload_vnf_package_content(self, vnfPkgId, vnfd, part_size=None, max_attempts=3):
+        path = self.endpoint + f"/{vnfPkgId}/package_content"
+        progress = UploadProgress(vnfd, os.path.getsize(vnfd))
+        if part_size is None:
+            self.connection.put(path, headers = {'Content-Type': 'application/zip'}, data = UploadStream(vnfd, progress=progress))
+        else:
+            self._upload_in_parts(path, vnfd, int(part_size), max_attempts, progress)
+
+    def _upload_in_parts(self, path, vnfd, part_size, max_attempts, progress):
+        '''Uploads the package in parts with Content-Range headers. A part failing because of a dropped connection is
+        sent again, so the upload resumes from the last acknowledged part instead of starting over. Falls back to
+        uploading the whole package at once if the endpoint does not accept partial uploads.'''
+        offset = 0
+        while offset < progress.total:
+            length = min(part_size, progress.total - offset)
+            headers = {'Content-Type': 'application/zip', 'Content-Range': f"bytes {offset}-{offset + length - 1}/{progress.total}"}
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    self.connection.put(path, headers=headers, data=UploadStream(vnfd, offset, length, progress))
+                    break
+                except requests.ConnectionError:
+                    if attempt == max_attempts:
+                        raise
+                    logger.info(f"Connection lost while uploading {vnfd}, resuming from byte {offset}")
+                except requests.HTTPError as error:
+                    if offset == 0 and error.response.status_code in (400, 411, 416, 501):
+                        self.connection.put(path, headers={'Content-Type': 'application/zip'}, data=UploadStream(vnfd, progress=progress))
+                        return
+                    raise
+            offset += length
 
 class Catalog18:
     endpoint = "/api/catalog/adapter/vnfpackages"
@@ -214,10 +1819,86 @@ class Catalog18:
     def __init__(self, connection):
         self.connection = connection
 
-    def onboard_vnfd(self, vnfd):
-        response = self.connection.post(self.endpoint, files={"content": open(vnfd, "rb")})
+    def onboard_vnfd(self, vnfd, part_size=None, max_attempts=3):
+        if part_size is not None:
+            raise ValueError("Catalog version 'v18' does not support uploading packages in parts.")
+        body = MultipartUploadStream("content", vnfd, UploadProgress(vnfd, os.path.getsize(vnfd)))
+        response = self.connection.post(self.endpoint, headers={"Content-Type": body.content_type}, data=body)
         return response.json()
 
+class UploadStream:
+    '''Streams a file, or a part of it, as a request body in chunks so memory use stays bounded regardless of the
+    file size. The stream can be iterated again, e.g. when the request is re-sent after a token refresh. The file is
+    open only while the stream is iterated.'''
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path, offset=0, length=None, progress=None):
+        self.path = path
+        self.offset = offset
+        self.length = os.path.getsize(path) - offset if length is None else length
+        self.progress = progress
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        if self.progress is not None:
+            self.progress.rewind(self.offset)
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    raise IOError(f"File {self.path} was truncated during upload")
+                remaining -= len(chunk)
+                if self.progress is not None:
+                    self.progress.update(len(chunk))
+                yield chunk
+
+
+class MultipartUploadStream:
+    '''Streams a file as a multipart/form-data request body without building the body in memory.'''
+
+    def __init__(self, field, path, progress=None):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self.head = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{os.path.basename(path)}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        self.tail = f"\r\n--{boundary}--\r\n".encode()
+        self.file = UploadStream(path, progress=progress)
+
+    def __len__(self):
+        return len(self.head) + len(self.file) + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        yield from self.file
+        yield self.tail
+
+
+class UploadProgress:
+    '''Logs the progress of a file upload at every 10 percent.'''
+
+    def __init__(self, name, total):
+        self.name = name
+        self.total = total
+        self.sent = 0
+        self.logged = 0
+
+    def update(self, sent):
+        self.sent += sent
+        percent = self.sent * 100 // self.total if self.total else 100
+        if percent >= self.logged + 10 or self.sent == self.total:
+            self.logged = percent - percent % 10
+            logger.info(f"Uploaded {self.sent}/{self.total} bytes ({percent}%) of {self.name}")
+
+    def rewind(self, offset):
+        self.sent = offset
+        self.logged = offset * 100 // self.total if self.total else 0
+        self.logged -= self.logged % 10
+
+
 class Catalog:
 
     def __init__(self, connection):
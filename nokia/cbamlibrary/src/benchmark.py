@@ -0,0 +1,256 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''Benchmark driving concurrent VNF lifecycles through CBAMLibrary.
+
+Every lifecycle creates, instantiates, terminates and deletes a VNF. The benchmark reports the throughput, latency
+percentiles of the lifecycles and their steps and the number of API calls per endpoint. Without --host the
+benchmark starts a local mock CBAM:
+
+    python benchmark.py --vnfs 200 --concurrency 20 --json results.json
+
+With --payloads the benchmark measures building the instantiation request bodies of a bulk instantiation from a JSON
+template instead, without CBAM:
+
+    python benchmark.py --payloads 1000 --template path/to/instantiation.json
+
+With --requests the benchmark measures the requests per second of Get VNF calls with pooled keep-alive connections
+against opening a new connection for every request:
+
+    python benchmark.py --requests 2000 --concurrency 4 --latency 0
+'''
+
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+STEPS = ("create", "instantiate", "terminate", "delete")
+# Instantiation template used by the payload benchmark when no template is given
+TEMPLATE = {
+    "flavourId": "{{flavour}}",
+    "instantiationLevelId": "default",
+    "extVirtualLinks": [{
+        "id": f"ext-{index}",
+        "resourceId": f"network-{index}",
+        "extCps": [{"cpdId": f"cp-{index}-{cp}", "cpConfig": [{"cpProtocolData": [{"layerProtocol": "IP_OVER_ETHERNET"}]}]} for cp in range(4)]
+    } for index in range(8)],
+    "additionalParams": {
+        "hostname": "{{site}}-{{vnf_id}}",
+        "replicas": "{{replicas}}",
+        "parameters": {f"parameter{index}": f"value{index}" for index in range(200)}
+    }
+}
+
+
+def run(library, vnfs, concurrency, interval, vnfd_id="benchmark-vnfd"):
+    '''Runs the lifecycles and returns the results as a dictionary.'''
+    library.reset_request_metrics()
+
+    def lifecycle(index):
+        durations = {}
+        started = time.monotonic()
+        vnf = library.create_vnf(vnfd_id, f"benchmark-{index}")
+        durations["create"] = time.monotonic() - started
+        step_started = time.monotonic()
+        operation_id = library.instantiate_vnf(vnf["id"], {"flavourId": "default"})
+        library.wait_until_operation_completes(operation_id, interval=interval)
+        durations["instantiate"] = time.monotonic() - step_started
+        step_started = time.monotonic()
+        operation_id = library.terminate_vnf(vnf["id"])
+        library.wait_until_operation_completes(operation_id, interval=interval)
+        durations["terminate"] = time.monotonic() - step_started
+        step_started = time.monotonic()
+        library.delete_vnf(vnf["id"])
+        durations["delete"] = time.monotonic() - step_started
+        durations["lifecycle"] = time.monotonic() - started
+        return durations
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lifecycle, range(vnfs)))
+    duration = time.monotonic() - started
+    metrics = json.loads(library.get_request_metrics())
+    return {
+        "vnfs": vnfs,
+        "concurrency": concurrency,
+        "duration": round(duration, 3),
+        "throughput": round(vnfs / duration, 3),
+        "latency": {step: percentiles([result[step] for result in results]) for step in ("lifecycle",) + STEPS},
+        "requests": metrics["requests"],
+        "requests_per_vnf": round(metrics["requests"] / vnfs, 2),
+        "api_calls": {f"{endpoint['method']} {endpoint['endpoint']}": endpoint["count"] for endpoint in metrics["endpoints"]},
+        "hosts": {host["host"]: host["requests"] for host in library.get_host_statistics()}
+    }
+
+
+def run_payloads(library, template, count):
+    '''Builds count instantiation bodies from the template with per-VNF variables, first the way bodies were built
+    before templates (reading, parsing and encoding the file for each VNF) and then with the cached templates.'''
+    variables = [{"vnf_id": f"CBAM-{index:08d}", "flavour": "large", "site": "hel", "replicas": index % 5 + 1} for index in range(count)]
+
+    def uncached(values):
+        with open(template, "rb") as template_file:
+            body = template_file.read().decode()
+        for name, value in values.items():
+            body = body.replace(f'"{{{{{name}}}}}"', json.dumps(value)).replace(f"{{{{{name}}}}}", str(value))
+        return json.dumps(json.loads(body)).encode()
+
+    def compiled(values):
+        return library._parse_json_body(template, **values)
+
+    results = {"payloads": count, "template_bytes": os.path.getsize(template)}
+    for name, build in (("uncached", uncached), ("template", compiled)):
+        started = time.perf_counter()
+        for values in variables:
+            build(values)
+        duration = time.perf_counter() - started
+        results[name] = {"duration": round(duration, 4), "per_payload_us": round(duration / count * 1e6, 1)}
+    results["speedup"] = round(results["uncached"]["duration"] / results["template"]["duration"], 1)
+    return results
+
+
+def run_requests(hosts, client_id, client_secret, count, concurrency):
+    '''Makes count Get VNF requests, concurrency at a time, first opening a new connection for every request as the
+    library did before connection pooling and then reusing the pooled keep-alive connections.'''
+    results = {"requests": count, "concurrency": concurrency}
+    for name, keep_alive in (("unpooled", False), ("pooled", True)):
+        library = CBAMLibrary()
+        # Cached responses would skip the connection handling that is measured
+        library.connect_to_cbam(hosts, client_id, client_secret, pool_maxsize=concurrency, keep_alive=keep_alive, response_cache_size=0)
+        vnf = library.create_vnf("benchmark-vnfd", f"benchmark-requests-{name}")
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(lambda _: library.get_vnf(vnf["id"]), range(count)))
+            duration = time.perf_counter() - started
+        finally:
+            library.delete_vnf(vnf["id"])
+            library.connection.close()
+        results[name] = {"duration": round(duration, 3), "requests_per_second": round(count / duration, 1)}
+    results["speedup"] = round(results["pooled"]["requests_per_second"] / results["unpooled"]["requests_per_second"], 2)
+    return results
+
+
+def requests_report(results):
+    return "\n".join([
+        f"{results['requests']} Get VNF requests with concurrency {results['concurrency']}",
+        f"{'Unpooled':<10}{results['unpooled']['duration']:>10} s{results['unpooled']['requests_per_second']:>10} requests/s",
+        f"{'Pooled':<10}{results['pooled']['duration']:>10} s{results['pooled']['requests_per_second']:>10} requests/s",
+        f"Speedup: {results['speedup']}x"
+    ])
+
+
+def payload_report(results):
+    return "\n".join([
+        f"{results['payloads']} instantiation bodies from a {results['template_bytes']} byte template",
+        f"{'Uncached':<10}{results['uncached']['duration']:>10} s{results['uncached']['per_payload_us']:>10} us/body",
+        f"{'Template':<10}{results['template']['duration']:>10} s{results['template']['per_payload_us']:>10} us/body",
+        f"Speedup: {results['speedup']}x"
+    ])
+
+
+def percentiles(values):
+    '''Returns the 50th, 95th and 99th percentiles of the values with the nearest-rank method.'''
+    values = sorted(values)
+
+    def percentile(percent):
+        return round(values[max(0, math.ceil(percent / 100 * len(values)) - 1)], 4)
+
+    return {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99), "max": round(values[-1], 4)}
+
+
+def report(results):
+    lines = [
+        f"{results['vnfs']} VNF lifecycles with concurrency {results['concurrency']} in {results['duration']} s",
+        f"Throughput: {results['throughput']} lifecycles/s",
+        "",
+        f"{'Latency (s)':<14}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    ]
+    for step, latency in results["latency"].items():
+        lines.append(f"{step:<14}{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{latency['max']:>10}")
+    lines += ["", f"API calls: {results['requests']} ({results['requests_per_vnf']} per VNF)"]
+    for endpoint, count in sorted(results["api_calls"].items(), key=lambda item: -item[1]):
+        lines.append(f"{count:>8}  {endpoint}")
+    if len(results["hosts"]) > 1:
+        lines += ["", "Requests per host:"] + [f"{count:>8}  {host}" for host, count in results["hosts"].items()]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent VNF lifecycles through CBAMLibrary")
+    parser.add_argument("--vnfs", type=int, default=50, help="number of VNF lifecycles")
+    parser.add_argument("--concurrency", type=int, default=10, help="number of lifecycles run at the same time")
+    parser.add_argument("--interval", type=float, default=5, help="maximum polling interval of the waits in seconds")
+    parser.add_argument("--host", help="CBAM host or comma separated hosts, a local mock CBAM is started if not given")
+    parser.add_argument("--client-id", default="benchmark")
+    parser.add_argument("--client-secret", default="benchmark")
+    parser.add_argument("--latency", type=float, default=0.005, help="response delay of the mock CBAM in seconds")
+    parser.add_argument("--processing-delay", type=float, default=1, help="operation duration of the mock CBAM in seconds")
+    parser.add_argument("--token-lifetime", type=float, default=300, help="access token lifetime of the mock CBAM in seconds")
+    parser.add_argument("--nodes", type=int, default=1, help="number of mock CBAM nodes the requests are balanced to")
+    parser.add_argument("--node-capacity", type=int, default=0, help="requests a mock CBAM node processes at a time, 0 for no limit")
+    parser.add_argument("--json", help="file where the results are written as JSON, for tracking them over time")
+    parser.add_argument("--payloads", type=int, help="measure building this many instantiation bodies instead")
+    parser.add_argument("--requests", type=int, help="measure requests per second with and without pooled connections instead")
+    parser.add_argument("--template", help="instantiation template of the payload benchmark, a generated one if not given")
+    args = parser.parse_args()
+    if args.payloads:
+        main_payloads(args)
+        return
+    mock = None
+    if args.host is None:
+        mock = MockCBAM(latency=args.latency, processing_delay=args.processing_delay, token_lifetime=args.token_lifetime,
+                        nodes=args.nodes, node_capacity=args.node_capacity).start()
+    hosts = args.host or mock.urls
+    try:
+        if args.requests:
+            results = run_requests(hosts, args.client_id, args.client_secret, args.requests, args.concurrency)
+        else:
+            library = CBAMLibrary()
+            library.connect_to_cbam(hosts, args.client_id, args.client_secret, pool_maxsize=args.concurrency)
+            results = run(library, args.vnfs, args.concurrency, args.interval)
+    finally:
+        if mock is not None:
+            mock.stop()
+    print(requests_report(results) if args.requests else report(results))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+def main_payloads(args):
+    template = args.template
+    if template is None:
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as template_file:
+            json.dump(TEMPLATE, template_file, indent=2)
+        template = template_file.name
+    try:
+        results = run_payloads(CBAMLibrary(), template, args.payloads)
+    finally:
+        if args.template is None:
+            os.remove(template)
+    print(payload_report(results))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vnfs (
+    id TEXT PRIMARY KEY,
+    vnfInstanceName TEXT,
+    vnfdId TEXT,
+    instantiationState TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vnfs_name ON vnfs (vnfInstanceName);
+CREATE INDEX IF NOT EXISTS vnfs_vnfd ON vnfs (vnfdId);
+CREATE INDEX IF NOT EXISTS vnfs_state ON vnfs (instantiationState);
+CREATE TABLE IF NOT EXISTS packages (
+    id TEXT PRIMARY KEY,
+    vnfdId TEXT,
+    onboardingState TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS packages_vnfd ON packages (vnfdId);
+CREATE TABLE IF NOT EXISTS operations (
+    id TEXT PRIMARY KEY,
+    vnfInstanceId TEXT,
+    operation TEXT,
+    operationState TEXT,
+    stateEnteredTime TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS operations_vnf ON operations (vnfInstanceId);
+CREATE INDEX IF NOT EXISTS operations_state ON operations (operationState);
+CREATE INDEX IF NOT EXISTS operations_entered ON operations (stateEnteredTime);
+CREATE TABLE IF NOT EXISTS sync (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Indexed columns of the tables, other attributes are queried from the JSON documents
+COLUMNS = {
+    "vnfs": ("id", "vnfInstanceName", "vnfdId", "instantiationState"),
+    "packages": ("id", "vnfdId", "onboardingState"),
+    "operations": ("id", "vnfInstanceId", "operation", "operationState", "stateEnteredTime")
+}
+
+
+class InventoryMirror:
+    '''Local SQLite copy of the VNF instances, VNF packages and LCM operation occurrences of CBAM. After the initial
+    load, only the VNFs with operation occurrences that have changed since the previous sync are fetched again.'''
+
+    def __init__(self, database=":memory:"):
+        self.lock = threading.Lock()
+        self.database = sqlite3.connect(database, check_same_thread=False)
+        self.database.row_factory = sqlite3.Row
+        with self.lock, self.database:
+            self.database.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.database.close()
+
+    @property
+    def synced_until(self):
+        '''The latest stateEnteredTime of the mirrored operation occurrences, None before the initial load.'''
+        with self.lock:
+            row = self.database.execute("SELECT value FROM sync WHERE key = 'synced_until'").fetchone()
+        return row["value"] if row else None
+
+    def load(self, vnfs, packages, operations):
+        '''Replaces the whole mirror with the given resources.'''
+        with self.lock, self.database:
+            for table in COLUMNS:
+                self.database.execute(f"DELETE FROM {table}")
+            self._put("vnfs", vnfs)
+            self._put("packages", packages)
+            self._put("operations", operations)
+            self._mark_synced()
+
+    def update(self, vnfs, deleted_vnf_ids, packages, operations):
+        '''Applies an incremental sync: changed VNFs and operation occurrences are replaced, VNFs that were not found
+        are removed and the packages are replaced with the given list.'''
+        with self.lock, self.database:
+            self._put("vnfs", vnfs)
+            self.database.executemany("DELETE FROM vnfs WHERE id = ?", [(vnf_id,) for vnf_id in deleted_vnf_ids])
+            self.database.execute("DELETE FROM packages")
+            self._put("packages", packages)
+            self._put("operations", operations)
+            self._mark_synced()
+
+    def put_vnf(self, vnf):
+        with self.lock, self.database:
+            self._put("vnfs", [vnf])
+
+    def remove_vnf(self, vnf_id):
+        with self.lock, self.database:
+            self.database.execute("DELETE FROM vnfs WHERE id = ?", (vnf_id,))
+
+    def find(self, table, criteria):
+        '''Returns the resources of the table matching all criteria. Criteria keys are attribute paths, e.g.
+        instantiationState or metadata/project, and values are compared as strings.'''
+        conditions, parameters = [], []
+        for attribute, value in criteria.items():
+            if attribute in COLUMNS[table]:
+                conditions.append(f'"{attribute}" = ?')
+            else:
+                conditions.append("CAST(json_extract(data, ?) AS TEXT) = ?")
+                parameters.append("$." + ".".join(f'"{key}"' for key in attribute.split("/")))
+            parameters.append(str(value))
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        with self.lock:
+            rows = self.database.execute(f"SELECT data FROM {table}{where} ORDER BY rowid", parameters).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def query(self, sql, parameters=()):
+        '''Runs a read-only SQL query and returns the rows as dictionaries.'''
+        with self.lock:
+            self.database.set_authorizer(_read_only)
+            try:
+                rows = self.database.execute(sql, parameters).fetchall()
+            finally:
+                self.database.set_authorizer(None)
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        with self.lock:
+            return {table: self.database.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in COLUMNS}
+
+    def _put(self, table, resources):
+        columns = COLUMNS[table]
+        names = ", ".join(f'"{column}"' for column in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        self.database.executemany(f"INSERT OR REPLACE INTO {table} ({names}, data) VALUES ({placeholders}, ?)",
+                                  [tuple(resource.get(column) for column in columns) + (json.dumps(resource),) for resource in resources])
+
+    def _mark_synced(self):
+        row = self.database.execute("SELECT MAX(stateEnteredTime) FROM operations").fetchone()
+        self.database.execute("INSERT OR REPLACE INTO sync (key, value) VALUES ('synced_until', ?)", (row[0] or "",))
+
+
+def _read_only(action, *args):
+    if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION):
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
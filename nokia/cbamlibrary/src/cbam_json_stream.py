@@ -0,0 +1,122 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import codecs
+import json
+import re
+
+# Characters that change the nesting depth or start a string outside strings, and that end or escape inside them
+STRUCTURE = re.compile(r'["{}\[\]]')
+STRING = re.compile(r'["\\]')
+SCALAR_END = re.compile(r'[,\]\s]')
+WHITESPACE = " \t\r\n"
+
+
+def iterate_json_array(chunks, transform=None):
+    '''Yields the elements of a JSON array one at a time from an iterable of byte chunks, e.g. a streamed response.
+    Only the element being parsed is kept in memory, so arrays of any size are parsed in bounded memory and reading
+    stops when the caller stops iterating. The scanner keeps its state between chunks, so every character is scanned
+    once however large an element is. transform is applied to each element before it is yielded, e.g. to pick the
+    needed attributes. The element is parsed whole before that, so transform limits what is kept between elements,
+    not the memory used while parsing one.'''
+    started = False
+    # Pieces of the element being scanned, None between elements
+    parts = None
+    depth = 0
+    in_string = False
+    escaped = False
+    scalar = False
+    for text in _decode(chunks):
+        position = 0
+        start = 0
+        while position < len(text):
+            if parts is None:
+                # Skip whitespace, the opening bracket and the commas between elements
+                character = text[position]
+                if character in WHITESPACE:
+                    position += 1
+                    continue
+                if not started:
+                    if character != "[":
+                        raise ValueError(f"Expected a JSON array, got '{character}'")
+                    started = True
+                    position += 1
+                    continue
+                if character == ",":
+                    position += 1
+                    continue
+                if character == "]":
+                    return
+                parts = []
+                start = position
+                depth = 0
+                in_string = escaped = False
+                scalar = character not in '{["'
+            end = None
+            if scalar:
+                match = SCALAR_END.search(text, position)
+                if match is not None:
+                    end = match.start()
+            else:
+                while True:
+                    if escaped:
+                        if position >= len(text):
+                            break
+                        # Skip the escaped character
+                        position += 1
+                        escaped = False
+                    match = (STRING if in_string else STRUCTURE).search(text, position)
+                    if match is None:
+                        break
+                    character = match.group()
+                    position = match.end()
+                    if in_string:
+                        if character == "\\":
+                            escaped = True
+                            continue
+                        in_string = False
+                        if depth == 0:
+                            end = position
+                            break
+                    elif character == '"':
+                        in_string = True
+                    elif character in "{[":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            end = position
+                            break
+            if end is None:
+                # The element continues in the next chunk
+                parts.append(text[start:])
+                break
+            parts.append(text[start:end])
+            element = json.loads("".join(parts))
+            parts = None
+            position = end
+            yield transform(element) if transform is not None else element
+    raise ValueError("Unexpected end of JSON array")
+
+
+def _decode(chunks):
+    '''Yields the text of UTF-8 encoded chunks, keeping characters split between chunks together.'''
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
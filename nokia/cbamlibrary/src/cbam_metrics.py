@@ -0,0 +1,201 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+
+# Collections whose next path segment is a resource ID, which is replaced with {id} in the endpoint templates
+ID_COLLECTIONS = ("vnf_instances", "vnf_lcm_op_occs", "vnf_packages", "vnfpackages", "subscriptions")
+
+
+def endpoint_template(path):
+    '''Returns the path without the query and with resource IDs replaced with {id}, e.g.
+    /vnflcm/v1/vnf_instances/{id}/instantiate.'''
+    segments = path.split("?")[0].split("/")
+    for index in range(1, len(segments)):
+        if segments[index - 1] in ID_COLLECTIONS and segments[index]:
+            segments[index] = "{id}"
+    return "/".join(segments)
+
+
+class EndpointMetrics:
+    '''Latency histogram, status codes and transferred bytes of one endpoint.'''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.duration = 0.0
+        self.max_duration = 0.0
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def add(self, status, duration, bytes_sent, bytes_received):
+        self.count += 1
+        self.duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        for index, bucket in enumerate(self.buckets):
+            if duration <= bucket:
+                self.bucket_counts[index] += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "duration": {
+                "sum": round(self.duration, 6),
+                "mean": round(self.duration / self.count, 6) if self.count else 0,
+                "max": round(self.max_duration, 6)
+            },
+            # Cumulative counts like in Prometheus histograms, the last bucket is all requests
+            "buckets": {**{str(bucket): count for bucket, count in zip(self.buckets, self.bucket_counts)}, "+Inf": self.count},
+            "statuses": dict(self.statuses),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received
+        }
+
+
+class RequestMetrics:
+    '''Thread-safe metrics of the HTTP requests made to CBAM and Keycloak, grouped by method and endpoint template.
+    Scopes collect the same metrics for a part of the run, e.g. a single suite.'''
+
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scopes = []
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.counters = {"retries": 0, "throttled": 0, "token_refreshes": 0, "failovers": 0}
+
+    def record(self, method, path, status, duration, bytes_sent=0, bytes_received=0):
+        key = (method.upper(), endpoint_template(path))
+        with self.lock:
+            for metrics in (self, *self.scopes):
+                if key not in metrics.endpoints:
+                    metrics.endpoints[key] = EndpointMetrics(self.buckets)
+                metrics.endpoints[key].add(str(status), duration, bytes_sent, bytes_received)
+
+    def increment(self, counter, amount=1):
+        if not amount:
+            return
+        with self.lock:
+            for metrics in (self, *self.scopes):
+                metrics.counters[counter] = metrics.counters.get(counter, 0) + amount
+
+    def start_scope(self):
+        scope = RequestMetrics()
+        with self.lock:
+            self.scopes.append(scope)
+        return scope
+
+    def end_scope(self, scope):
+        with self.lock:
+            self.scopes.remove(scope)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "requests": sum(endpoint.count for endpoint in self.endpoints.values()),
+                **self.counters,
+                "endpoints": [{"method": method, "endpoint": endpoint, **metrics.to_dict()}
+                              for (method, endpoint), metrics in sorted(self.endpoints.items(), key=lambda item: (item[0][1], item[0][0]))]
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        '''Returns the metrics in the Prometheus text exposition format, usable with the node exporter textfile
+        collector.'''
+        metrics = self.to_dict()
+        lines = [
+            "# HELP cbam_request_duration_seconds Duration of HTTP requests made by CBAMLibrary.",
+            "# TYPE cbam_request_duration_seconds histogram"
+        ]
+        for endpoint in metrics["endpoints"]:
+            labels = _labels(method=endpoint["method"], endpoint=endpoint["endpoint"])
+            for bucket, count in endpoint["buckets"].items():
+                lines.append(f'cbam_request_duration_seconds_bucket{{{labels},le="{bucket}"}} {count}')
+            lines.append(f"cbam_request_duration_seconds_sum{{{labels}}} {endpoint['duration']['sum']}")
+            lines.append(f"cbam_request_duration_seconds_count{{{labels}}} {endpoint['count']}")
+        lines += [
+            "# HELP cbam_requests_total HTTP requests made by CBAMLibrary by response status.",
+            "# TYPE cbam_requests_total counter"
+        ]
+        for endpoint in metrics["endpoints"]:
+            for status, count in sorted(endpoint["statuses"].items()):
+                lines.append(f"cbam_requests_total{{{_labels(method=endpoint['method'], endpoint=endpoint['endpoint'], status=status)}}} {count}")
+        for name, key, description in (("cbam_request_bytes_sent_total", "bytes_sent", "Bytes sent in request bodies."),
+                                       ("cbam_response_bytes_received_total", "bytes_received", "Bytes received in response bodies.")):
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+            for endpoint in metrics["endpoints"]:
+                lines.append(f"{name}{{{_labels(method=endpoint['method'], endpoint=endpoint['endpoint'])}}} {endpoint[key]}")
+        for counter in sorted(self.counters):
+            lines += [f"# TYPE cbam_{counter}_total counter", f"cbam_{counter}_total {metrics[counter]}"]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsListener:
+    '''Robot Framework library listener that collects the request metrics of every suite separately and appends a
+    summary of each suite to a JSON lines file, by default cbam_metrics.jsonl in the output directory.'''
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self, metrics, path=None):
+        self.metrics = metrics
+        self.path = path
+        self.suites = []
+
+    def start_suite(self, name, attributes):
+        self.suites.append(self.metrics.start_scope())
+
+    def end_suite(self, name, attributes):
+        if self.suites:
+            scope = self.suites.pop()
+            self.metrics.end_scope(scope)
+        else:
+            # The suite that imported the library has started before the listener was registered
+            scope = self.metrics
+        path = self.path or self._default_path()
+        if path is None:
+            return
+        summary = {"suite": attributes["longname"], "status": attributes["status"], **scope.to_dict()}
+        with open(path, "a") as summaries:
+            summaries.write(json.dumps(summary) + "\n")
+
+    def _default_path(self):
+        try:
+            from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
+        except ImportError:
+            return None
+        try:
+            output_dir = BuiltIn().get_variable_value("${OUTPUT_DIR}")
+        except RobotNotRunningError:
+            return None
+        return f"{output_dir}/cbam_metrics.jsonl" if output_dir else None
@@ -0,0 +1,115 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class NotificationStore:
+    '''In-memory store of received VNF LCM notifications. Keeps a counter of notifications per VNF instance and
+    operation occurrence, so waiters can sleep until something happens to the resources they are interested in.'''
+
+    def __init__(self, max_notifications=10000):
+        self.condition = threading.Condition()
+        self.notifications = deque(maxlen=max_notifications)
+        self.counters = {}
+
+    def add(self, notification):
+        with self.condition:
+            self.notifications.append(notification)
+            for key in (notification.get("vnfInstanceId"), notification.get("vnfLcmOpOccId")):
+                if key is not None:
+                    self.counters[key] = self.counters.get(key, 0) + 1
+            self.condition.notify_all()
+
+    def get(self, resource_id=None):
+        with self.condition:
+            return [notification for notification in self.notifications
+                    if resource_id is None or resource_id in (notification.get("vnfInstanceId"), notification.get("vnfLcmOpOccId"))]
+
+    def waiter(self, keys):
+        return NotificationWaiter(self, keys)
+
+
+class NotificationWaiter:
+    '''Sleeps until the timeout or until a notification about any of the keys arrives after the latest mark.'''
+
+    def __init__(self, store, keys):
+        self.store = store
+        self.keys = list(keys)
+        self.marked = {}
+
+    def mark(self):
+        with self.store.condition:
+            self.marked = self._counters()
+
+    def sleep(self, timeout):
+        with self.store.condition:
+            self.store.condition.wait_for(lambda: self._counters() != self.marked, timeout)
+
+    def _counters(self):
+        return {key: self.store.counters.get(key, 0) for key in self.keys}
+
+
+class NotificationReceiver:
+    '''HTTP endpoint for SOL003 VNF LCM notifications, served from a background thread.'''
+
+    def __init__(self, store, address="0.0.0.0", port=0):
+        self.store = store
+        self.server = ThreadingHTTPServer((address, int(port)), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        store = self.store
+
+        class NotificationHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                # CBAM tests the callback URI with a GET request before creating the subscription
+                self._respond(204)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    notification = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self._respond(400)
+                    return
+                store.add(notification)
+                self._respond(204)
+
+            def _respond(self, status):
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return NotificationHandler
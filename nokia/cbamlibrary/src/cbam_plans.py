@@ -0,0 +1,223 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+class PlanTask:
+
+    def __init__(self, name, dependencies, action):
+        self.name = name
+        self.dependencies = list(dependencies)
+        self.action = action
+        self.status = "NOT RUN"
+        self.started = None
+        self.ended = None
+        self.error = None
+        self.result = None
+
+
+class LifecyclePlan:
+    '''Lifecycle plan of VNF packages and VNFs, turned into a graph of onboard, create and instantiate tasks.
+    Each package is onboarded once and shared by all VNFs using it. A VNF is instantiated after the VNFs it
+    depends on have been instantiated.'''
+
+    def __init__(self, plan):
+        self.packages = {package["name"]: package for package in plan.get("packages", [])}
+        self.vnfs = {vnf["name"]: vnf for vnf in plan.get("vnfs", [])}
+        for name, vnf in self.vnfs.items():
+            if "package" in vnf and vnf["package"] not in self.packages:
+                raise ValueError(f"VNF '{name}' uses unknown package '{vnf['package']}'")
+            if "package" not in vnf and "vnfd_id" not in vnf:
+                raise ValueError(f"VNF '{name}' needs either a package or a vnfd_id")
+            for dependency in vnf.get("depends_on", []):
+                if dependency not in self.vnfs:
+                    raise ValueError(f"VNF '{name}' depends on unknown VNF '{dependency}'")
+                if "instantiation" not in self.vnfs[dependency] or "instantiation" not in vnf:
+                    raise ValueError(f"VNF '{name}' depends on '{dependency}', both of them must be instantiated")
+
+    @classmethod
+    def load(cls, plan):
+        '''Loads a plan from a dictionary or a JSON or YAML file.'''
+        if isinstance(plan, dict):
+            return cls(plan)
+        with open(plan) as plan_file:
+            if plan.endswith((".yaml", ".yml")):
+                if yaml is None:
+                    raise ImportError("Reading YAML plans requires PyYAML, install it with 'pip install pyyaml' or use a JSON plan")
+                return cls(yaml.safe_load(plan_file))
+            return cls(json.load(plan_file))
+
+    def tasks(self, library, timeout=None):
+        tasks = {}
+        for name, package in self.packages.items():
+            if any(vnf.get("package") == name for vnf in self.vnfs.values()):
+                tasks[f"onboard {name}"] = PlanTask(f"onboard {name}", [], _onboard(library, package, timeout))
+        for name, vnf in self.vnfs.items():
+            onboarding = [f"onboard {vnf['package']}"] if "package" in vnf else []
+            tasks[f"create {name}"] = PlanTask(f"create {name}", onboarding, _create(library, vnf, tasks))
+            instantiation = [f"create {name}"] + [f"instantiate {dependency}" for dependency in vnf.get("depends_on", [])]
+            if "instantiation" in vnf:
+                tasks[f"instantiate {name}"] = PlanTask(f"instantiate {name}", instantiation, _instantiate(library, vnf, tasks, timeout))
+        _check_cycles(tasks)
+        return tasks
+
+
+class PlanRunner:
+    '''Runs the tasks of a plan concurrently as soon as their dependencies have completed, at most parallelism
+    tasks at a time. Tasks depending on a failed task are skipped, independent tasks are run to completion.'''
+
+    def __init__(self, parallelism=10):
+        self.parallelism = parallelism
+
+    def run(self, tasks):
+        started = time.monotonic()
+        pending = dict(tasks)
+        running = {}
+
+        def execute(task):
+            task.started = time.monotonic() - started
+            try:
+                task.result = task.action()
+                task.status = "PASS"
+            except Exception as error:
+                task.error = str(error)
+                task.status = "FAIL"
+            task.ended = time.monotonic() - started
+
+        with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            while pending or running:
+                for name, task in list(pending.items()):
+                    statuses = [tasks[dependency].status for dependency in task.dependencies]
+                    if any(status in ("FAIL", "SKIP") for status in statuses):
+                        task.status = "SKIP"
+                        task.error = "Dependency failed"
+                        del pending[name]
+                    elif all(status == "PASS" for status in statuses):
+                        running[executor.submit(execute, task)] = task
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+        return PlanReport(tasks, time.monotonic() - started)
+
+
+class PlanReport:
+
+    def __init__(self, tasks, duration):
+        self.tasks = tasks
+        self.duration = duration
+
+    @property
+    def failed(self):
+        return [task for task in self.tasks.values() if task.status != "PASS"]
+
+    def critical_path(self):
+        '''Returns the chain of tasks that determined the duration of the run: starting from the task that ended
+        last, each step goes to the dependency that ended last.'''
+        finished = [task for task in self.tasks.values() if task.ended is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda task: task.ended)]
+        while True:
+            dependencies = [self.tasks[name] for name in path[-1].dependencies if self.tasks[name].ended is not None]
+            if not dependencies:
+                return list(reversed(path))
+            path.append(max(dependencies, key=lambda task: task.ended))
+
+    def to_dict(self):
+        return {
+            "duration": round(self.duration, 3),
+            "critical_path": [task.name for task in self.critical_path()],
+            "tasks": [{
+                "name": task.name,
+                "status": task.status,
+                "start": _round(task.started),
+                "end": _round(task.ended),
+                "duration": _round(task.ended - task.started if task.ended is not None else None),
+                "error": task.error
+            } for task in sorted(self.tasks.values(), key=lambda task: (task.started is None, task.started or 0))]
+        }
+
+    def __str__(self):
+        critical = {task.name for task in self.critical_path()}
+        lines = [f"{'Task':<40}{'Status':>8}{'Start':>10}{'Duration':>10}"]
+        for task in self.to_dict()["tasks"]:
+            marker = " *" if task["name"] in critical else ""
+            start = "" if task["start"] is None else task["start"]
+            duration = "" if task["duration"] is None else task["duration"]
+            lines.append(f"{task['name']:<40}{task['status']:>8}{start:>10}{duration:>10}{marker}")
+        lines.append(f"Total {round(self.duration, 3)} s, critical path marked with *: " + " -> ".join(self.to_dict()["critical_path"]))
+        return "\n".join(lines)
+
+
+def _onboard(library, package, timeout):
+    def onboard():
+        onboarded = library.onboard_vnfd(package["path"])
+        # SOL005 packages get the VNFD id when the content has been processed
+        if onboarded.get("vnfdId"):
+            return onboarded["vnfdId"]
+        return library._poll_package_onboarding(onboarded["id"], library._wait_until_timeout(timeout), float(package.get("interval", 5)))["vnfdId"]
+    return onboard
+
+
+def _create(library, vnf, tasks):
+    def create():
+        vnfd_id = vnf["vnfd_id"] if "vnfd_id" in vnf else tasks[f"onboard {vnf['package']}"].result
+        return library.create_vnf(vnfd_id, vnf["name"], vnf.get("description"))["id"]
+    return create
+
+
+def _instantiate(library, vnf, tasks, timeout):
+    def instantiate():
+        vnf_id = tasks[f"create {vnf['name']}"].result
+        operation_id = library.instantiate_vnf(vnf_id, vnf["instantiation"], **vnf.get("variables", {}))
+        # Without an operation occurrence in the response, wait on the instantiation state instead
+        if operation_id is not None:
+            library.wait_until_operation_completes(operation_id, timeout, vnf.get("interval", 5))
+        else:
+            library.wait_until_vnf_is_instantiated(vnf_id, timeout, vnf.get("interval", 5))
+        return operation_id
+    return instantiate
+
+
+def _check_cycles(tasks):
+    visited, visiting = set(), []
+
+    def visit(name):
+        if name in visiting:
+            cycle = visiting[visiting.index(name):] + [name]
+            raise ValueError("Plan has a dependency cycle: " + " -> ".join(cycle))
+        if name in visited:
+            return
+        visiting.append(name)
+        for dependency in tasks[name].dependencies:
+            visit(dependency)
+        visiting.pop()
+        visited.add(name)
+
+    for name in tasks:
+        visit(name)
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
@@ -0,0 +1,142 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import re
+import threading
+from collections import OrderedDict
+
+PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class BodyTemplate:
+    '''JSON request body with {{name}} placeholders, compiled into static byte segments and variable slots so that
+    rendering only encodes the variables and joins the segments. A placeholder that is a whole JSON string, e.g.
+    "{{flavour}}", is replaced with the variable as JSON. Other placeholders, e.g. "vnf-{{index}}" or {{count}}, are
+    replaced with the text of a string variable and with other variables as JSON, escaped inside strings.
+    Placeholders without a variable are left as they are. Bodies without placeholders are not compiled, they are sent
+    as they are, also when they are not JSON. Text of files is given as UTF-8 bytes.'''
+
+    def __init__(self, text):
+        self.segments = []
+        # (name, whole string, inside a string, placeholder text)
+        self.slots = []
+        self.static = None
+        if isinstance(text, bytes):
+            if b"{{" not in text:
+                self.static = text
+                return
+            text = text.decode("utf-8")
+        if not PLACEHOLDER.search(text):
+            self.static = text.encode()
+            return
+        position = 0
+        inside = False
+        for match in PLACEHOLDER.finditer(text):
+            segment = text[position:match.start()]
+            inside, opened = _scan(segment, inside)
+            whole = inside and opened == len(segment) - 1 and text[match.end():match.end() + 1] == '"'
+            if whole:
+                # The quotes are part of the placeholder
+                segment = segment[:-1]
+                position = match.end() + 1
+                inside = False
+            else:
+                position = match.end()
+            self.segments.append(segment.encode())
+            self.slots.append((match.group(1), whole, inside, text[match.start() - whole:position]))
+        self.segments.append(text[position:].encode())
+        # Checked once with placeholder values, so that errors in the template do not surface as failed requests
+        json.loads(b"".join(segment + (b"null" if whole else b"0") for segment, (_, whole, _, _) in zip(self.segments, self.slots))
+                   + self.segments[-1])
+
+    def render(self, variables):
+        '''Returns the body as UTF-8 bytes with the placeholders replaced by the given variables.'''
+        if self.static is not None:
+            return self.static
+        parts = [self.segments[0]]
+        for (name, whole, inside, placeholder), segment in zip(self.slots, self.segments[1:]):
+            if name not in variables:
+                # E.g. a literal {{ HOME }} in a script, sent unchanged
+                parts.append(placeholder.encode())
+            else:
+                value = variables[name]
+                if whole:
+                    text = json.dumps(value)
+                else:
+                    text = value if isinstance(value, str) else json.dumps(value)
+                    if inside:
+                        # Escaped like a JSON string, without the quotes
+                        text = json.dumps(text)[1:-1]
+                parts.append(text.encode())
+            parts.append(segment)
+        return b"".join(parts)
+
+
+def _scan(text, inside):
+    '''Returns whether the end of a piece of JSON text is inside a string, given whether its start is, and the index
+    of the quote that opened the last string, or None.'''
+    escaped = False
+    opened = None
+    for index, character in enumerate(text):
+        if escaped:
+            escaped = False
+        elif character == "\\" and inside:
+            escaped = True
+        elif character == '"':
+            inside = not inside
+            opened = index if inside else opened
+    return inside, opened
+
+
+class BodyTemplateCache:
+    '''Compiled body templates of JSON files by path, modification time and size, and of JSON strings by their
+    text. A file is read again only when it changes. At most size templates are kept.'''
+
+    def __init__(self, size=128):
+        self.size = size
+        self.templates = OrderedDict()
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        stat = os.stat(path)
+        key = ("file", os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        template = self._get(key)
+        if template is None:
+            with open(path, "rb") as template_file:
+                template = self._put(key, BodyTemplate(template_file.read()))
+        return template
+
+    def text(self, text):
+        key = ("text", text)
+        return self._get(key) or self._put(key, BodyTemplate(text))
+
+    def _get(self, key):
+        with self.lock:
+            template = self.templates.get(key)
+            if template is not None:
+                self.templates.move_to_end(key)
+            return template
+
+    def _put(self, key, template):
+        with self.lock:
+            if key[0] == "file":
+                # Older versions of the same file are not needed anymore
+                for old in [old for old in self.templates if old[:2] == key[:2]]:
+                    del self.templates[old]
+            self.templates[key] = template
+            while len(self.templates) > self.size:
+                self.templates.popitem(last=False)
+        return template
@@ -23,9 +23,194 @@ is global the connection will stay alive between test cases and test suites once
 and [https://robotframework.org/robotframework/latest/RobotFrameworkUserGuide.html#initialization-files|Initialization files]
 for creating the connection so it will be available when needed.
 
+= Connection pooling =
+
+All requests, including the token requests, are made through a single persistent HTTP session. Connections to
+CBAM are kept alive and reused between keywords, so TCP and TLS handshakes are done only when the pool needs a new
+connection. Size of the pool, number of retries and keep-alive can be configured with `Connect To CBAM` and
+`Set Connection Options`.
+
+= Multiple CBAM hosts =
+
+When CBAM runs as several active nodes without a load balancer in front of them, `Connect To CBAM` can be given all
+of the nodes as a list or as a comma separated string. The nodes share the Keycloak realm, so a single access token
+is used for all of them. Each request is sent to the node with the fewest outstanding requests, which spreads the
+load evenly and steers requests away from slow nodes.
+
+A node that fails ``max_host_failures`` times in a row, with connection errors or ``5xx`` responses, is ejected for
+``host_ejection_time`` seconds, doubled for each further ejection, and the other nodes take its requests. A request
+failing with a connection error is sent to the next node if it is safe to repeat: requests that never reached the
+node are always sent again, others only if they are idempotent. Failed over requests are counted in the
+`Request metrics`, and `Get Host Statistics` shows the state of each node.
+| Connect To CBAM | host=cbam-1.example,cbam-2.example,cbam-3.example | pool_maxsize=20 |
+
+= Throttling =
+
+A shared CBAM may respond ``429 Too Many Requests`` or ``503 Service Unavailable`` when it is overloaded. The library
+then waits for the delay given in the ``Retry-After`` header, or backs off exponentially if there is none, and sends
+the request again. Requests throttled with 429 are always retried since CBAM has not processed them, after 503 only
+idempotent requests are retried.
+
+The number of concurrent requests adapts to the load of CBAM: it is halved whenever CBAM throttles and grows back
+gradually while requests succeed, up to ``max_in_flight``. For 30 seconds after a throttle it does not grow back to
+the level that was throttled, so it settles just below what CBAM accepts. Only the throttled request waits for the
+``Retry-After`` delay, other requests continue within the limit. Batch keywords therefore run as fast as CBAM allows instead
+of failing. Throttled and retried requests are counted in the `Request metrics`.
+
+= Response caching =
+
+Responses of read keywords are cached when CBAM returns an ``ETag`` or ``Last-Modified`` header with them. When
+the same resource is read again, the request is sent with ``If-None-Match`` or ``If-Modified-Since`` headers, and if
+CBAM responds ``304 Not Modified``, the cached body is returned without transferring it again. Cached responses are
+always revalidated, so keywords never return stale data. Any modifying request to a resource removes the cached
+responses of the resource and its collection. The size of the cache can be set with ``response_cache_size`` in
+`Connect To CBAM` and `Set Connection Options`, and `Get Response Cache Statistics` shows how well it works.
+
+= Request metrics =
+
+The library measures every HTTP request it makes to CBAM and Keycloak. Requests are grouped by method and endpoint,
+with resource IDs replaced by ``{id}``, e.g. ``POST /vnflcm/v1/vnf_instances/{id}/instantiate``. For each endpoint
+the library records a latency histogram, response status codes and the bytes sent and received. Retried, throttled
+and failed over requests and token refreshes are counted as well. `Get Request Metrics` returns the metrics as JSON or in the Prometheus text
+format, which can be written to the directory of the node exporter textfile collector.
+
+The library also works as a listener and writes a summary of the requests made in each suite to
+``cbam_metrics.jsonl`` in the output directory, one JSON object per line. The file can be changed with
+`Set Metrics File`.
+| ${metrics} | Get Request Metrics | prometheus | path=/var/lib/node_exporter/cbam.prom |
+
+= Sharing tokens between processes =
+
+When suites are run in parallel with [https://pabot.org|pabot], each process opens its own connection. To avoid
+logging in to CBAM separately from every process, give the same ``token_cache`` file to `Connect To CBAM` in all of
+them. Tokens are cached per host and client ID. Processes reuse a cached access token as long as it is valid, and
+the cache file is locked while the token is renewed, so only one process requests a new token when the cached one
+is about to expire. The cache file contains the tokens, so it is created readable by its owner only.
+| Connect To CBAM | token_cache=${TEMPDIR}/cbam_tokens.json |
+
 = Timeouts =
 
-TODO
+Wait Until -keywords poll CBAM until the expected state is reached or the timeout expires. If no timeout is given
+to a keyword, the default timeout of 300 seconds is used. The default can be changed with `Set Wait Until Timeout`.
+
+Timeouts are measured against a deadline, so time spent in the polling requests counts towards the timeout. The
+first poll is made immediately and the time between polls starts from 0.5 seconds, doubling after every poll up to
+the ``interval`` given to the keyword. A small random jitter is added so that parallel waits do not poll in lockstep.
+The polling can be tuned with `Set Polling Options`, and `Get Poll Statistics` shows how many polls the latest
+waits took.
+
+= LCM notifications =
+
+Instead of relying on polling alone, the library can receive VNF lifecycle management notifications from CBAM.
+`Start Notification Receiver` starts an HTTP endpoint in the background and creates a subscription for
+VnfLcmOperationOccurrenceNotifications with the given callback URI. The receiver can also be started by giving
+``notification_callback_uri`` to `Connect To CBAM`. The callback URI must be reachable from CBAM.
+
+While the receiver is running, Wait Until -keywords still poll CBAM, but the wait between polls ends as soon as a
+notification about the awaited VNF or operation arrives. Waits therefore complete right after the operation has
+finished, and polling remains as a fallback for lost notifications. Received notifications can be inspected with
+`Get Received Notifications`.
+| Connect To CBAM | notification_callback_uri=http://robot-host.example:8080/notifications |
+
+= Attribute selectors =
+
+List keywords follow the paging links (SOL013 ``Link: rel="next"`` headers) of the CBAM API and fetch the pages
+one at a time. With large inventories the size of the responses can be reduced with attribute selectors:
+``exclude_default`` leaves out the large complex attributes, such as ``instantiatedVnfInfo`` and ``extensions``, and
+``fields`` includes the listed complex attributes back. `Get VNFs With Attributes` returns only the selected
+attributes of each VNF.
+| ${VNFs} | Get VNFs | exclude_default=${True} |
+| ${VNFs} | Get VNFs | fields=instantiatedVnfInfo | exclude_default=${True} |
+
+When the selectors are not enough, `Set List Streaming` makes the library parse list responses one element at a
+time while they are read, instead of parsing the whole response into memory first. `Get VNF By Name` then stops
+reading as soon as the VNF is found, and `Get VNFs With Attributes` keeps only the selected attributes of each VNF,
+so lookups and state scans of large inventories run in constant memory. Each VNF is still parsed whole before its
+attributes are selected, so the memory used at a time depends on the size of the largest VNF; use ``exclude_default``
+to keep large attributes out of the response. Streamed responses are not stored in the response cache.
+| Set List Streaming |
+| ${VNFs} | Get VNFs With Attributes | id | instantiatedVnfInfo/vnfState |
+
+= Batch operations =
+
+Keywords `Create VNFs`, `Instantiate VNFs`, `Terminate VNFs` and `Delete VNFs` run the same lifecycle operation for
+multiple VNFs concurrently instead of one after another. The operations are run with an asyncio engine on top of
+the library connection, so they share its connection pool and tokens. The ``concurrency`` argument limits the
+number of simultaneous requests; it should not be larger than the ``pool_maxsize`` of the connection, see
+`Connection pooling`. A batch keyword waits for all of the operations to finish and fails if any of them failed,
+listing every failed VNF.
+| @{names} | Create List | vnf-1 | vnf-2 | vnf-3 |
+| ${VNFs} | Create VNFs | example-vnfd-id | ${names} |
+| ${vnf_ids} | Evaluate | [vnf["id"] for vnf in $VNFs] |
+| Instantiate VNFs | ${vnf_ids} | path/to/the/instantiation.json |
+
+= Lifecycle plans =
+
+`Run Lifecycle Plan` onboards packages, creates VNFs and instantiates them as described in a plan. The plan is a
+dictionary or a JSON or YAML file; reading YAML requires [https://pypi.org/project/PyYAML/|PyYAML]. Packages are
+listed under ``packages`` with a ``name`` and a ``path``, and each package is onboarded once no matter how many VNFs
+use it. After the upload the package is polled, every ``interval`` seconds at most, until CBAM has processed it and
+the VNFs using it can be created with its VNFD ID. VNFs are listed under ``vnfs`` with a ``name``, either a ``package`` name or a ``vnfd_id``, and optionally a
+``description``, ``instantiation`` parameters, template ``variables`` for the instantiation parameters (see
+`Passing JSON data to keywords`) and ``depends_on``, a list of VNFs that must be instantiated first.
+
+The plan is run as a graph of tasks: every task starts as soon as the tasks it depends on have passed, so
+independent VNFs are onboarded, created and instantiated concurrently. When a task fails, the tasks depending on it
+are skipped and the others are run to completion. The keyword logs a timing report of the tasks in which the
+critical path, the chain of tasks that determined the total duration, is marked.
+| packages:
+|   - name: core
+|     path: packages/core.zip
+| vnfs:
+|   - name: db
+|     package: core
+|     instantiation: path/to/db_instantiation.json
+|   - name: app
+|     package: core
+|     instantiation: path/to/app_instantiation.json
+|     depends_on: [db]
+
+= Scheduling operations =
+
+CBAM rejects a lifecycle operation on a VNF that already has an operation in progress. `Schedule Operation` queues
+operations per VNF and runs them in the order they were scheduled, starting the next operation on a VNF only after
+the previous one has finished. Operations on different VNFs run concurrently in a shared pool of workers. Running
+operations are polled together with list requests, and the polls end early on `LCM notifications`. An operation
+that fails does not stop the later operations on the same VNF.
+| FOR | ${vnf_id} | IN | @{vnf_ids} |
+| | Schedule Operation | ${vnf_id} | Execute Custom Operation On VNF | scale_out | ${scale_json} |
+| | Schedule Operation | ${vnf_id} | Execute Custom Operation On VNF | heal | ${heal_json} |
+| END |
+| Wait Until Scheduled Operations Complete |
+
+= Inventory mirror =
+
+Questions about the whole inventory, such as which VNFs use a package, can be answered from a local SQLite copy of
+the VNF instances, VNF packages and LCM operation occurrences instead of downloading the inventory every time.
+`Sync Inventory` loads the copy, and later syncs fetch only the operation occurrences that have changed since the
+previous sync and the VNFs they concern, together with the package list. The query keywords are answered locally
+from indexed tables in milliseconds.
+
+VNF creations and deletions do not have operation occurrences. The ones made with this library are applied to the
+mirror right away, but VNFs created or deleted by others are noticed only by a full sync. Giving a database file to
+`Sync Inventory` keeps the mirror between test runs.
+| Sync Inventory | ${TEMPDIR}/cbam_inventory.db |
+| ${vnfs} | Query Inventory VNFs | instantiationState=INSTANTIATED | metadata/project=Y |
+
+= Background operations =
+
+The Start -keywords `Start Instantiate VNF`, `Start Terminate VNF`, `Start Execute Custom Operation On VNF` and
+`Start Onboard VNFD` return a handle right away and run the operation, including waiting for it to complete, in the
+background. Tests can do other checks meanwhile and collect the results later with `Wait For Handles` or
+`Get Handle Result`, which fail with the errors of the background operations. Operations on the same VNF run in the
+order they were started, see `Scheduling operations`.
+| @{handles} | Create List |
+| FOR | ${vnf_id} | IN | @{vnf_ids} |
+| | ${handle} | Start Instantiate VNF | ${vnf_id} | path/to/the/instantiation.json |
+| | Append To List | ${handles} | ${handle} |
+| END |
+| Check OpenStack Resources |
+| Wait For Handles | ${handles} | timeout=900 |
 
 = Passing JSON data to keywords =
 
@@ -38,6 +223,24 @@ keyword splits multiline variables into a list) and json files.
 If there is no need for dynamic values, a separate json file is easy and clean way for providing the data:
 | Instantiate VNF | CBAM-1234abcd5678efgh91011ijkl | path/to/the/instantiation.json |
 
+== Templates ==
+JSON files and strings can contain ``{{name}}`` placeholders that are replaced with variables given to the keyword as
+named arguments. A placeholder that is a whole JSON string, e.g. ``"{{flavour}}"``, is replaced with the value as JSON,
+so it can be a string, a number, a list or a dict. Other placeholders, e.g. ``"{{site}}-oam"`` or ``{{replicas}}``,
+are replaced with the text of a string and with other values as JSON. The ID of the VNF is always available as
+``{{vnf_id}}``. A placeholder without a variable is left as it is, so bodies with literal ``{{...}}`` text, e.g. a
+script containing ``echo {{ HOME }}``, are sent unchanged. Files and strings without placeholders are sent as they
+are, and are not required to be valid JSON.
+
+Templates are validated as JSON, compiled once and cached: a file is read again only when its modification time or size changes, and
+each request only encodes the variables. This keeps instantiating hundreds of VNFs from one template cheap.
+| {
+|   "flavourId": "{{flavour}}",
+|   "extensions": {"hostname": "{{site}}-{{vnf_id}}", "replicas": {{replicas}}}
+| }
+| Instantiate VNF | ${vnf_id} | path/to/the/instantiation.json | flavour=large | site=hel | replicas=${3} |
+| Instantiate VNFs | ${vnf_ids} | path/to/the/instantiation.json | flavour=small | site=tre | replicas=${1} |
+
 == Dicts ==
 Simple requests are fairly easy to do using BuiltIn
 [https://robotframework.org/robotframework/latest/libraries/BuiltIn.html#Create%20Dictionary|Create Dictionary] keyword,
@@ -77,8 +280,10 @@ This kind of simple json object could be given as a single line string as well:
 connect_to_cbam = """Initializes connection with the CBAM REST API.
 
 Gets authentication tokens required for accessing the API and creates a library connection object
-which handles the requests. After initialization the tokens will be refreshed automatically when 
-they expire. 
+which handles the requests. After initialization the access token will be refreshed automatically in the
+background shortly before it expires, using the ``expires_in`` and ``refresh_expires_in`` values of the token
+response. If the refresh token has expired as well, a new token is requested with the client credentials.
+Threads sharing the connection share a single refresh instead of each requesting a new token.
 
 Arguments can also be provided with .env file located in the same directory, to prevent
 secrets from being added to test logs on trace level. If both .env file and keyword argument are
@@ -87,13 +292,31 @@ e.g. host and client_id as keyword arguments and use .env for the remaining clie
 it from keyword arguments.
 
 *Arguments:*\n
-``host`` CBAM host address\n
+``host`` CBAM host address. Scheme defaults to https, but it can be given explicitly, e.g. ``http://localhost:8080``.
+A list or a comma separated string of hosts spreads the requests over the nodes of CBAM, see `Multiple CBAM hosts`.\n
 ``client_id`` CBAM Client ID\n
 ``client_secret`` CBAM Client secret\n
 ``catalog_version`` Catalog API version, SOL005 by default. Supported versions are 'SOL005' and 'v18'\n
+``token_cache`` Optional path to a token cache file shared between processes, see `Sharing tokens between processes`\n
+``notification_callback_uri`` Optional callback URI for LCM notifications, see `LCM notifications`\n
+``onboarding_cache`` Optional path to an onboarding cache file, see `Set Onboarding Cache`\n
 ``kwargs`` Additional keyword arguments for [https://2.python-requests.org/en/v2.9.1|python requests],
 e.g. [https://2.python-requests.org/en/v2.9.1/user/advanced/#ssl-cert-verification|SSL Cert verification] (see examples below).
-These kwargs will be used for all requests made by the connection.
+These kwargs will be used for all requests made by the connection. Following kwargs configure the
+persistent connection pool instead, see `Connection pooling`:\n
+``pool_connections`` Number of host pools to cache, default is 10\n
+``pool_maxsize`` Maximum number of connections kept alive per host, default is 10\n
+``max_retries`` Number of retries for failed connections and idempotent requests, default is 0\n
+``retry_backoff_factor`` Backoff factor between the retries in seconds, default is 0\n
+``keep_alive`` Reuse connections between requests, default is True\n
+``token_refresh_margin`` Seconds before expiry when the access token is refreshed, default is 30\n
+``response_cache_size`` Maximum size of cached response bodies in bytes, 0 disables the cache. Default is 32 MiB.
+See `Response caching`.\n
+``max_in_flight`` Maximum number of concurrent requests, default is ``pool_maxsize``. See `Throttling`.\n
+``throttle_retries`` Number of retries for throttled requests, default is 5\n
+``throttle_backoff`` Initial backoff in seconds for throttled requests without Retry-After, default is 1\n
+``max_host_failures`` Consecutive failures after which a host is ejected, default is 3. See `Multiple CBAM hosts`.\n
+``host_ejection_time`` Seconds a failing host is ejected for at first, default is 30
 
 *.env file example:*\n
 | HOST=localhost
@@ -111,6 +334,10 @@ _Using Catalog API version 18_
 | Connect To CBAM | catalog_version=v18 |
 _Using .env file and requests configuration kwargs (Disable SSL Cert verification)_
 | Connect To CBAM | verify=${False} |
+_Using a larger connection pool for parallel test runs_
+| Connect To CBAM | pool_maxsize=32 | max_retries=3 | retry_backoff_factor=0.5 |
+_Spreading the requests over the nodes of CBAM_
+| Connect To CBAM | host=cbam-1.example,cbam-2.example | client_id=robot | client_secret=r0b07 |
 """
 
 
@@ -155,6 +382,21 @@ VNFD ID can also be taken from the return value of `Onboard VNFD` keyword.\n
 """
 
 
+create_vnfs = """Creates multiple VNFs concurrently using given VNF descriptor. Returns a list of JSON descriptions
+of the created VNFs in the same order as the names. See `Batch operations`.
+
+*Arguments:*\n
+``vnfd_id`` vnfdId of an onboarded VNF descriptor\n
+``names`` List of names for the created VNFs\n
+``description`` Optional description of the VNFs\n
+``concurrency`` Maximum number of simultaneous requests, default is 10
+
+*Example:*\n
+| @{names} | Create List | vnf-1 | vnf-2 | vnf-3 |
+| ${VNFs} | Create VNFs | example-vnfd-id | ${names} |
+"""
+
+
 delete_vnf = """Deletes VNF by id.
 
 *Arguments:*\n
@@ -164,6 +406,17 @@ delete_vnf = """Deletes VNF by id.
 | Delete VNF | CBAM-1234abcde56789fghijklmn |
 """
 
+
+delete_vnfs = """Deletes multiple VNFs concurrently. See `Batch operations`.
+
+*Arguments:*\n
+``vnf_ids`` List of IDs of the VNFs that will be deleted\n
+``concurrency`` Maximum number of simultaneous requests, default is 10
+
+*Example:*\n
+| Delete VNFs | ${vnf_ids} |
+"""
+
 delete_vnfd = """Deletes VNFD by id.
 
 *Arguments:*\n
@@ -180,14 +433,106 @@ which is printed on each request when SSL Cert verification is disabled.
 
 
 execute_custom_operation_on_vnf = """Executes a custom operation on given VNF. Custom operations are defined in the VNFD.
+Returns the ID of the started operation occurrence, see `Wait Until Operation Completes`.
 
 *Arguments:*\n
 `vnf_id` ID of the VNF\n
 `custom_operation` Name of the custom operation\n
-`body` Optional body for the request, e.g. `{"additionalParams": {"param1": "value1"}}`. See `Passing JSON data to keywords`
+`body` Optional body for the request, e.g. `{"additionalParams": {"param1": "value1"}}`. See `Passing JSON data to keywords`\n
+`variables` Values of the template placeholders of the body as named arguments
+
+*Example:*\n
+| ${operation} | Execute Custom Operation On VNF | CBAM-1234abcd5678efgh91011ijkl | health_check |
+| Wait Until Operation Completes | ${operation} |
+"""
+
+
+get_handle_result = """Waits until the background operation of a handle has finished and returns its result: the completed
+operation occurrence, or the package for `Start Onboard VNFD`. Fails with the error of the operation if it failed.
+See `Background operations`.
+
+*Arguments:*\n
+``handle`` Handle returned by a Start -keyword\n
+``timeout`` Maximum time to wait in seconds, default is 300 or the one set with `Set Wait Until Timeout`
+
+*Example:*\n
+| ${package} | Get Handle Result | ${handle} |
+"""
+
+
+get_host_statistics = """Returns the state of each CBAM host of the connection as a list of dictionaries with the ``host``,
+whether it is ``available``, the number of ``outstanding`` requests, total ``requests`` and ``failures``, the number of
+consecutive ``ejections`` and the seconds the host is still ejected for in ``ejected_for``. See `Multiple CBAM hosts`.
+
+*Example:*\n
+| ${hosts} | Get Host Statistics |
+| Log Many | @{hosts} |
+"""
+
+
+get_inventory_vnfs_using_package = """Returns the VNFs in the inventory mirror that were created from given package. See
+`Inventory mirror`.
+
+*Arguments:*\n
+``package_id`` ID of the VNF package
+
+*Example:*\n
+| ${vnfs} | Get Inventory VNFs Using Package | ${package_id} |
+"""
+
+
+get_operation = """Returns the VNF lifecycle management operation occurrence with given id as a dictionary.
+
+*Arguments:*\n
+``operation_id`` ID of the operation occurrence, returned e.g. by `Instantiate VNF`
+
+*Example:*\n
+| ${operation} | Get Operation | ${operation_id} |
+| Log | ${operation}[operationState] |
+"""
+
+
+get_poll_statistics = """Returns statistics of the latest 1000 Wait Until -keyword waits as a list of dictionaries. Each item
+contains the ``wait`` description, whether it ``succeeded``, the number of ``polls`` made and the ``duration`` of the
+wait in seconds. See `Timeouts`.
+
+*Example:*\n
+| ${statistics} | Get Poll Statistics |
+| Log List | ${statistics} |
+"""
+
+
+get_received_notifications = """Returns the LCM notifications received by the notification receiver as a list of dictionaries,
+oldest first. See `LCM notifications`.
+
+*Arguments:*\n
+``resource_id`` Optional VNF instance or operation occurrence ID, returns only the notifications about it
+
+*Example:*\n
+| ${notifications} | Get Received Notifications | CBAM-1234abcd5678efgh91011ijkl |
+"""
+
+
+get_request_metrics = """Returns the request metrics collected since the library was imported or `Reset Request Metrics`
+was called. See `Request metrics`.
+
+*Arguments:*\n
+``format`` Format of the metrics, ``json`` or ``prometheus``. Default is ``json``.\n
+``path`` Optional file where the metrics are also written
+
+*Examples:*\n
+| ${metrics} | Get Request Metrics |
+| Get Request Metrics | prometheus | path=${OUTPUT_DIR}/cbam.prom |
+"""
+
+
+get_response_cache_statistics = """Returns statistics of the response cache as a dictionary. The dictionary contains the
+number of ``hits`` answered with ``304 Not Modified``, ``misses``, ``evictions``, cached ``entries`` and the total
+``size`` of the cached bodies in bytes. Returns an empty dictionary when the cache is disabled. See `Response caching`.
 
 *Example:*\n
-| Execute Custom Operation On VNF | CBAM-1234abcd5678efgh91011ijkl | health_check |
+| ${statistics} | Get Response Cache Statistics |
+| Should Be True | ${statistics}[hits] > 0 |
 """
 
 
@@ -203,6 +548,12 @@ get_vnf = """Looks for a VNF with given id and returns it as a dictionary. Fails
 
 get_vnf_by_name = """Looks for a VNF with given name and returns it as a dictionary. Fails if no VNF is found.
 
+The VNF is looked up with a server side ``filter`` on the VNF name when CBAM supports attribute filters, otherwise
+the list of all VNFs is searched. Found VNFs are kept in a name index for 60 seconds by default, so repeated
+lookups of the same name do not make API calls. The index entry is invalidated when the VNF is created, modified,
+deleted or a lifecycle operation is started on it with this library. Use `Get VNF` for an always up-to-date VNF
+and `Set VNF Name Index TTL` to change or disable the index.
+
 *Arguments:*\n
 `vnf_name` Name of the VNF
 
@@ -212,7 +563,11 @@ get_vnf_by_name = """Looks for a VNF with given name and returns it as a diction
 """
 
 
-get_vnfs = """Returns a list of all VNFs.
+get_vnfs = """Returns a list of all VNFs. If CBAM returns the list in pages, all pages are fetched.
+
+*Arguments:*\n
+``fields`` Optional list or comma separated string of complex attributes to include, see `Attribute selectors`\n
+``exclude_default`` Leave out the complex attributes that CBAM returns by default, default is False
 
 *Example:*\n
 _Log names of all VNF instances_
@@ -223,6 +578,23 @@ _Log names of all VNF instances_
 """
 
 
+get_vnfs_with_attributes = """Returns a list of all VNFs with only the given attributes. Each VNF is returned as a dictionary
+with the attributes as keys; attributes missing from the VNF have value ``None``. Nested attributes are given as
+paths separated with ``/``.
+
+The attributes are requested with ``fields`` and ``exclude_default`` selectors to keep the responses small, see
+`Attribute selectors`. If CBAM does not support the selectors, the attributes are selected from the full VNFs.
+
+*Arguments:*\n
+``attributes`` Names of the attributes\n
+``attribute_filter`` Optional SOL013 attribute filter, e.g. ``(eq,instantiationState,INSTANTIATED)``
+
+*Examples:*\n
+| ${VNFs} | Get VNFs With Attributes | id | vnfInstanceName | instantiationState |
+| ${VNFs} | Get VNFs With Attributes | id | instantiatedVnfInfo/vnfState | attribute_filter=(eq,vnfdId,example-vnfd) |
+"""
+
+
 get_vnfd = """Looks for a VNFD with a given id and returns it as a dictionary. Fails if no VNFD is found.
 
 *Arguments:*\n
@@ -233,7 +605,11 @@ get_vnfd = """Looks for a VNFD with a given id and returns it as a dictionary. F
 """
 
 
-get_vnfds = """Returns a list of all VNFDs.
+get_vnfds = """Returns a list of all VNFDs. If CBAM returns the list in pages, all pages are fetched.
+
+*Arguments:*\n
+``fields`` Optional list or comma separated string of complex attributes to include, see `Attribute selectors`\n
+``exclude_default`` Leave out the complex attributes that CBAM returns by default, default is False
 
 *Example:*\n
 _Log names of all VNFDs_
@@ -244,14 +620,36 @@ _Log names of all VNFDs_
 """
 
 
-instantiate_vnf = """Instantiates VNF with the given parameters.
+instantiate_vnf = """Instantiates VNF with the given parameters. Returns the ID of the started operation occurrence,
+see `Wait Until Operation Completes`.
 
 *Arguments:*\n
 ``vnf_id`` ID of the VNF that will be instantiated\n
-``instantiation_json`` Instantiation data in json format, see `Passing JSON data to keywords`
+``instantiation_json`` Instantiation data in json format, see `Passing JSON data to keywords`\n
+``variables`` Values of the template placeholders as named arguments, see `Passing JSON data to keywords`
 
 *Example:*\n
-| Instantiate VNF | CBAM-1234abcd5678efgh91011ijkl | path/to/the/instantiation.json |
+| ${operation} | Instantiate VNF | CBAM-1234abcd5678efgh91011ijkl | path/to/the/instantiation.json |
+| ${operation} | Instantiate VNF | CBAM-1234abcd5678efgh91011ijkl | path/to/the/template.json | flavour=large |
+| Wait Until Operation Completes | ${operation} |
+"""
+
+
+instantiate_vnfs = """Instantiates multiple VNFs concurrently with the same parameters and by default waits until all
+of them are instantiated. Waiting is done on the operation occurrences, so a failed instantiation fails the keyword
+without waiting for the timeout. Returns the IDs of the operation occurrences. See `Batch operations`.
+
+*Arguments:*\n
+``vnf_ids`` List of IDs of the VNFs that will be instantiated\n
+``instantiation_json`` Instantiation data in json format, see `Passing JSON data to keywords`\n
+``wait_for_completion`` Wait until the VNFs are instantiated, default is True\n
+``timeout`` Timeout for each VNF, if not given the default timeout will be used. See `Timeouts`.\n
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.\n
+``concurrency`` Maximum number of simultaneous requests, default is 10\n
+``variables`` Values of the template placeholders as named arguments. Each VNF gets its own ID as ``{{vnf_id}}``.
+
+*Example:*\n
+| Instantiate VNFs | ${vnf_ids} | path/to/the/instantiation.json | concurrency=20 |
 """
 
 
@@ -259,7 +657,8 @@ modify_vnf = """Modifies existing VNF.
 
 *Arguments:*\n
 ``vnf_id`` ID of the VNF that will be modified\n
-``modifications`` Changes in json format, see `Passing JSON data to keywords`
+``modifications`` Changes in json format, see `Passing JSON data to keywords`\n
+``variables`` Values of the template placeholders as named arguments
 
 *Modifications model*:\n
 _All fields are optional_
@@ -317,8 +716,20 @@ _Multi-line string:_
 
 onboard_vnfd = """Uploads the VNF template package to the CBAM VNF catalog. Returns a JSON description of the VNFD.
 
+The package is streamed from the disk in chunks, so memory usage does not depend on the package size. Upload
+progress is logged at every 10 percent.
+
+With SOL005 catalog the package can be uploaded in parts of ``part_size`` bytes using ``Content-Range`` headers. If
+the connection drops during a part, the upload resumes from the beginning of that part instead of starting over.
+If CBAM does not accept partial uploads, the whole package is uploaded at once.
+
+When an onboarding cache is set with `Set Onboarding Cache`, a package with identical content that is still
+onboarded in the catalog is returned without uploading the package again.
+
 *Arguments:*\n
-``vnfd`` Path to the vnfd zip file
+``vnfd`` Path to the vnfd zip file\n
+``part_size`` Optional size of the uploaded parts in bytes, SOL005 catalog only\n
+``max_attempts`` Maximum number of attempts per part when the connection drops, default is 3
 
 *Example return value:*\n
 | {
@@ -336,17 +747,174 @@ onboard_vnfd = """Uploads the VNF template package to the CBAM VNF catalog. Retu
 *Example:*\n
 | ${vnfd} | Onboard VNFD | /Users/Robot/Documents/project/vnfd.zip |
 | Log | ${vnfd}[vnfdId] | # Log the VNFD ID. This could be given as an argument for `Create VNF` keyword. |
+| ${vnfd} | Onboard VNFD | /Users/Robot/Documents/project/large_cnf.zip | part_size=${67108864} |
+"""
+
+
+query_inventory = """Runs a read-only SQL query on the inventory mirror and returns the rows as a list of dictionaries. The
+database has the tables ``vnfs``, ``packages`` and ``operations``. Each table has the ``id``, a few indexed attribute
+columns and the whole resource as JSON in the ``data`` column, which can be queried with ``json_extract``. See
+`Inventory mirror`.
+
+*Arguments:*\n
+``sql`` SELECT statement, with ``?`` placeholders for the parameters\n
+``parameters`` Values of the placeholders
+
+*Example:*\n
+| ${rows} | Query Inventory | SELECT vnfdId, COUNT(*) AS vnfs FROM vnfs WHERE instantiationState = ? GROUP BY vnfdId | INSTANTIATED |
+"""
+
+
+query_inventory_operations = """Returns the LCM operation occurrences in the inventory mirror that match all given criteria.
+Works like `Query Inventory VNFs`.
+
+*Example:*\n
+| ${operations} | Query Inventory Operations | vnfInstanceId=${vnf_id} | operationState=FAILED_TEMP |
+"""
+
+
+query_inventory_packages = """Returns the VNF packages in the inventory mirror that match all given criteria. Works like
+`Query Inventory VNFs`.
+
+*Example:*\n
+| ${packages} | Query Inventory Packages | onboardingState=ONBOARDED |
+"""
+
+
+query_inventory_vnfs = """Returns the VNFs in the inventory mirror that match all given criteria as a list of
+dictionaries. Criteria are given as keyword arguments, where the name is an attribute of the VNF and nested attributes
+are given as paths, e.g. ``metadata/project``. Values are compared as strings. Without criteria, all VNFs are
+returned. See `Inventory mirror`.
+
+*Examples:*\n
+| ${vnfs} | Query Inventory VNFs | instantiationState=INSTANTIATED |
+| ${vnfs} | Query Inventory VNFs | vnfdId=${vnfd_id} | metadata/project=Y |
+"""
+
+
+reset_request_metrics = """Clears the request metrics returned by `Get Request Metrics`. Metrics of the running suites
+written by the listener are not affected. See `Request metrics`.
+
+*Example:*\n
+| Reset Request Metrics |
+"""
+
+
+run_lifecycle_plan = """Runs a lifecycle plan and returns a report of it as a dictionary. The report contains the IDs of the
+created ``vnfs`` by name, the ``duration`` of the run in seconds, the ``critical_path`` and the status and timing of
+every task. Fails after the run if any of the tasks failed. See `Lifecycle plans`.
+
+*Arguments:*\n
+``plan`` Path of a JSON or YAML plan file, or the plan as a dictionary\n
+``parallelism`` Maximum number of tasks run at the same time, default is 10\n
+``timeout`` Maximum time to wait for each instantiation, default is 300 or the one set with `Set Wait Until Timeout`
+
+*Example:*\n
+| ${report} | Run Lifecycle Plan | path/to/plan.yaml | parallelism=20 |
+| Log | ${report}[vnfs][app] |
+"""
+
+
+schedule_operation = """Schedules a lifecycle operation on a VNF and returns a handle for it. The operation is started after the
+operations scheduled earlier on the same VNF have finished. See `Scheduling operations`.
+
+*Arguments:*\n
+``vnf_id`` ID of the VNF\n
+``operation`` Name of the keyword starting the operation: `Execute Custom Operation On VNF`, `Instantiate VNF`,
+`Modify VNF` or `Terminate VNF`\n
+``args`` Arguments of the keyword after the VNF ID
+
+*Examples:*\n
+| ${handle} | Schedule Operation | ${vnf_id} | Instantiate VNF | path/to/the/instantiation.json |
+| Schedule Operation | ${vnf_id} | Terminate VNF | termination_type=FORCEFUL |
 """
 
 
 set_connection_options = """Sets the options used for all http requests made by the library. Any previously set options
-are erased and replaced with the new ones.
+are erased and replaced with the new ones. Connection pool options (``pool_connections``, ``pool_maxsize``,
+``max_retries``, ``retry_backoff_factor`` and ``keep_alive``) and ``response_cache_size`` are accepted as well, see `Connect To CBAM`.
+Changing the options closes the pooled connections and clears the response cache.
 
 *Arguments:*\n
 ``options`` Options to be set as keyword arguments
 
 *Example:*\n
 | Set Connection Options | timeout=30 | verify=${false} |
+| Set Connection Options | pool_maxsize=20 | max_retries=2 |
+"""
+
+
+set_list_streaming = """Sets whether list responses are parsed incrementally from the response stream. See `Attribute selectors`.
+
+*Arguments:*\n
+``enabled`` Whether list responses are streamed, by default ``True``\n
+``chunk_size`` Number of bytes read from the response at a time, by default 64 KiB
+
+*Examples:*\n
+| Set List Streaming |
+| Set List Streaming | enabled=${False} |
+"""
+
+
+set_metrics_file = """Sets the file where the summaries of the suites are appended. See `Request metrics`.
+
+*Arguments:*\n
+``path`` Path of the JSON lines file. If empty, ``cbam_metrics.jsonl`` in the output directory is used.
+
+*Example:*\n
+| Set Metrics File | ${OUTPUT_DIR}/metrics/cbam.jsonl |
+"""
+
+
+set_onboarding_cache = """Sets the onboarding cache file used by `Onboard VNFD`. The cache can be shared by multiple suites and
+processes.
+
+The cache maps SHA-256 digests of onboarded packages to their package IDs in the catalog. Before uploading, `Onboard
+VNFD` calculates the digest of the package and, if a package with the same content has been onboarded to the same
+CBAM, checks from the catalog that it still exists and is ONBOARDED. If it is, the existing package is returned
+immediately. Digests are cached by the path, size and modification time of the file, so an unchanged package is
+read only once.
+
+*Arguments:*\n
+``path`` Path to the cache file. Empty value or ``${None}`` disables the cache.
+
+*Example:*\n
+| Set Onboarding Cache | ${TEMPDIR}/cbam_onboarding.json |
+| ${vnfd} | Onboard VNFD | path/to/vnfd.zip | # Uploaded only if not onboarded already |
+"""
+
+
+set_operation_scheduler_options = """Sets the options of the operation scheduler. See `Scheduling operations`.
+
+*Arguments:*\n
+``workers`` Number of workers starting operations concurrently, default is 10\n
+``interval`` Maximum time between polls of the running operations in seconds, default is 5
+
+*Example:*\n
+| Set Operation Scheduler Options | workers=20 | interval=2 |
+"""
+
+
+set_polling_options = """Sets the polling schedule used by the Wait Until -keywords. See `Timeouts`.
+
+*Arguments:*\n
+``initial_interval`` Time waited after the first poll in seconds, default is 0.5\n
+``backoff_factor`` Multiplier for the time waited after each poll, default is 2\n
+``jitter`` Relative random variation of the waited time, default is 0.1
+
+*Example:*\n
+| Set Polling Options | initial_interval=2 | backoff_factor=1.5 |
+"""
+
+
+set_vnf_name_index_ttl = """Sets how long VNFs found with `Get VNF By Name` are reused without new API calls. Setting the TTL
+clears the index.
+
+*Arguments:*\n
+``ttl`` Time to live of the index entries in seconds, 0 disables the index. Default is 60.
+
+*Example:*\n
+| Set VNF Name Index TTL | 0 |
 """
 
 
@@ -357,7 +925,102 @@ set_wait_until_timeout = """Sets the default timeout for Wait Until -keywords.
 """
 
 
-terminate_vnf = """Terminates given VNF.
+start_execute_custom_operation_on_vnf = """Starts `Execute Custom Operation On VNF` in the background and returns a handle for it.
+See `Background operations`.
+
+*Example:*\n
+| ${handle} | Start Execute Custom Operation On VNF | ${vnf_id} | heal | ${heal_json} |
+"""
+
+
+start_instantiate_vnf = """Starts `Instantiate VNF` in the background and returns a handle for it. The result of the handle is
+the completed operation occurrence. See `Background operations`.
+
+*Example:*\n
+| ${handle} | Start Instantiate VNF | ${vnf_id} | path/to/the/instantiation.json |
+"""
+
+
+start_onboard_vnfd = """Starts `Onboard VNFD` in the background and returns a handle for it. The result of the handle is the
+onboarded package. See `Background operations`.
+
+*Example:*\n
+| ${handle} | Start Onboard VNFD | path/to/the/package.zip |
+"""
+
+
+start_terminate_vnf = """Starts `Terminate VNF` in the background and returns a handle for it. The result of the handle is the
+completed operation occurrence. See `Background operations`.
+
+*Example:*\n
+| ${handle} | Start Terminate VNF | ${vnf_id} | FORCEFUL |
+"""
+
+
+start_notification_receiver = """Starts the LCM notification receiver and subscribes to VNF LCM operation occurrence notifications.
+A receiver started earlier is stopped first. See `LCM notifications`.
+
+*Arguments:*\n
+``callback_uri`` URI where CBAM sends the notifications\n
+``port`` Port the receiver listens to, by default the port of the callback URI\n
+``address`` Address the receiver listens to, default is 0.0.0.0
+
+*Examples:*\n
+| Start Notification Receiver | http://robot-host.example:8080/notifications |
+| Start Notification Receiver | http://nat-gateway.example:80/notifications | port=8080 |
+"""
+
+
+stop_notification_receiver = """Deletes the LCM notification subscription and stops the notification receiver. Does nothing if the
+receiver is not running. See `LCM notifications`.
+
+*Example:*\n
+| Stop Notification Receiver |
+"""
+
+
+sync_inventory = """Syncs the inventory mirror with CBAM and returns the number of ``vnfs``, ``packages`` and
+``operations`` in it, the number of ``changed_vnfs`` and the ``duration`` of the sync in seconds. The first sync, and
+syncs with ``full`` set, load the whole inventory; later syncs fetch only the changes. See `Inventory mirror`.
+
+*Arguments:*\n
+``database`` SQLite database file of the mirror, by default the mirror is kept in memory\n
+``full`` Load the whole inventory again, e.g. to notice VNFs created or deleted by others. Default is False.
+
+*Examples:*\n
+| Sync Inventory |
+| Sync Inventory | ${TEMPDIR}/cbam_inventory.db | full=${True} |
+"""
+
+
+tear_down_vnfs = """Terminates and deletes VNFs concurrently and then deletes the packages that no VNF uses anymore. Every
+VNF goes through its own terminate, wait and delete pipeline, so slow terminations do not hold up the others. VNFs
+that are not instantiated are only deleted. VNFs and packages that are already gone are not treated as errors, so
+the keyword can be run repeatedly, e.g. in a suite teardown.
+
+Returns a report as a dictionary with the total ``duration`` and the results of the ``vnfs`` and ``packages``. Each
+result contains the ``id``, ``name`` and ``status`` (DELETED, NOT FOUND or FAILED), the ``duration`` of handling
+that item and, for VNFs, the ``terminate`` and ``delete`` step durations. Fails after all VNFs have been handled if any of them failed.
+See `Batch operations`.
+
+*Arguments:*\n
+``vnfs`` IDs or names of the VNFs, or lists of them\n
+``attribute_filter`` SOL013 attribute filter selecting more VNFs to tear down, see `Attribute selectors`\n
+``delete_packages`` Delete the packages of the deleted VNFs that have no remaining instances, default is True\n
+``termination_type`` GRACEFUL or FORCEFUL, default is GRACEFUL\n
+``graceful_termination_timeout`` Timeout for graceful termination in seconds\n
+``timeout`` Maximum time to wait for each termination, default is 300 or the one set with `Set Wait Until Timeout`\n
+``interval`` Maximum time between polls in seconds, default is 5\n
+``concurrency`` Maximum number of concurrent requests, default is 10
+
+*Examples:*\n
+| Tear Down VNFs | ${vnf_ids} |
+| Tear Down VNFs | lab-vnf-1 | lab-vnf-2 | termination_type=FORCEFUL |
+| ${report} | Tear Down VNFs | attribute_filter=(cont,vnfInstanceName,lab-) | delete_packages=${False} |
+"""
+
+
+terminate_vnf = """Terminates given VNF. Returns the ID of the started operation occurrence, see `Wait Until Operation Completes`.
 
 *Arguments:*\n
 ``vnf_id`` ID of the VNF\n
@@ -371,12 +1034,95 @@ terminate_vnf = """Terminates given VNF.
 """
 
 
+terminate_vnfs = """Terminates multiple VNFs concurrently and by default waits until all of them are terminated.
+Waiting is done on the operation occurrences like in `Instantiate VNFs`. Returns the IDs of the operation occurrences.
+See `Batch operations`.
+
+*Arguments:*\n
+``vnf_ids`` List of IDs of the VNFs\n
+``termination_type`` GRACEFUL (default) or FORCEFUL\n
+``graceful_termination_timeout`` Timeout for graceful termination in seconds\n
+``wait_for_completion`` Wait until the VNFs are terminated, default is True\n
+``timeout`` Timeout for each VNF, if not given the default timeout will be used. See `Timeouts`.\n
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.\n
+``concurrency`` Maximum number of simultaneous requests, default is 10\n
+``additional_params`` Additional parameters
+
+*Example:*\n
+| Terminate VNFs | ${vnf_ids} | termination_type=FORCEFUL |
+"""
+
+
+wait_for_handles = """Waits until the background operations of the handles have finished and returns their results as a
+list in the order of the handles. Fails if any of the operations failed or did not finish within timeout; operations
+that did not finish keep running. See `Background operations`.
+
+*Arguments:*\n
+``handles`` Handles returned by Start -keywords, or lists of them\n
+``timeout`` Maximum time to wait in seconds, default is 300 or the one set with `Set Wait Until Timeout`
+
+*Example:*\n
+| ${operations} | Wait For Handles | ${instantiations} | ${onboarding} | timeout=900 |
+"""
+
+
+wait_until_operation_completes = """Waits until a VNF lifecycle management operation occurrence is completed. Returns the operation
+occurrence as a dictionary.
+
+Operation occurrence IDs are returned by `Instantiate VNF`, `Terminate VNF` and `Execute Custom Operation On VNF`.
+Waiting on the operation is more accurate than waiting on the instantiation state of the VNF: the keyword fails
+immediately when the ``operationState`` of the operation changes to FAILED_TEMP, FAILED or ROLLED_BACK, and the error
+reported by CBAM is included in the failure message.
+
+*Arguments:*\n
+``operation_id`` ID of the operation occurrence\n
+``timeout`` Timeout, if not given the default timeout will be used. See `Timeouts`.\n
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.
+
+*Example:*\n
+| ${operation} | Instantiate VNF | CBAM-1234abcd5678efgh91011ijkl | path/to/the/instantiation.json |
+| Wait Until Operation Completes | ${operation} |
+"""
+
+
+wait_until_operations_complete = """Waits until all given VNF lifecycle management operation occurrences are completed.
+
+The state of all pending operations is fetched with one operation occurrence list request per polling round. Like
+`Wait Until Operation Completes`, failed operations are not waited for until the timeout. The keyword fails when all
+operations have finished if any of them failed. Returns a dictionary with the final ``operationState`` and the wait
+``duration`` in seconds of each operation.
+
+*Arguments:*\n
+``operation_ids`` List of IDs of the operation occurrences\n
+``timeout`` Timeout, if not given the default timeout will be used. See `Timeouts`.\n
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.
+
+*Example:*\n
+| ${outcomes} | Wait Until Operations Complete | ${operations} |
+"""
+
+
+wait_until_scheduled_operations_complete = """Waits until scheduled operations have finished and returns their operation
+occurrences as a list, in the order of the handles. Operations without an operation occurrence to wait for, e.g.
+modifications completed right away, return None. Fails if any of the operations failed or did not complete within
+timeout. See `Scheduling operations`.
+
+*Arguments:*\n
+``handles`` Handles returned by `Schedule Operation`, default is all scheduled operations\n
+``timeout`` Maximum time to wait in seconds, default is 300 or the one set with `Set Wait Until Timeout`
+
+*Examples:*\n
+| Wait Until Scheduled Operations Complete |
+| ${operations} | Wait Until Scheduled Operations Complete | ${handles} | timeout=600 |
+"""
+
+
 wait_until_vnf_is_instantiated = """Waits until VNF is instantiated. Fails if VNF is not instantiated within timeout.
 
 *Arguments:*\n
 ``vnf_id`` ID of the VNF\n
 ``timeout`` Timeout, if not given the default timeout will be used. See `Timeouts`.\n
-``interval`` Time waited between the status polling requests in seconds, default is 5.
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.
 
 *Example:*\n
 | Wait Until VNF Is Instantiated | CBAM-1234abcd5678efgh91011ijkl |
@@ -388,8 +1134,40 @@ wait_until_vnf_is_terminated = """Waits until VNF is terminated. Fails if VNF is
 *Arguments:*\n
 ``vnf_id`` ID of the VNF\n
 ``timeout`` Timeout, if not given the default timeout will be used. See `Timeouts`.\n
-``interval`` Time waited between the status polling requests in seconds, default is 5.
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.
 
 *Example:*\n
 | Wait Until VNF Is Terminated | CBAM-1234abcd5678efgh91011ijkl |
+"""
+
+
+wait_until_vnfs_are_instantiated = """Waits until all given VNFs are instantiated. Fails if any of the VNFs is not instantiated within
+timeout.
+
+Instead of polling each VNF separately, the state of all pending VNFs is fetched with one VNF instance list
+request per polling round, using a server side ``filter`` when CBAM supports it. VNFs that are instantiated are
+dropped from the polled set. Returns a dictionary with the final ``instantiationState`` and the wait ``duration``
+in seconds of each VNF.
+
+*Arguments:*\n
+``vnf_ids`` List of IDs of the VNFs\n
+``timeout`` Timeout, if not given the default timeout will be used. See `Timeouts`.\n
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.
+
+*Example:*\n
+| ${outcomes} | Wait Until VNFs Are Instantiated | ${vnf_ids} |
+| Log | ${outcomes}[CBAM-1234abcd5678efgh91011ijkl][duration] |
+"""
+
+
+wait_until_vnfs_are_terminated = """Waits until all given VNFs are terminated. Fails if any of the VNFs is not terminated within
+timeout. Works like `Wait Until VNFs Are Instantiated`.
+
+*Arguments:*\n
+``vnf_ids`` List of IDs of the VNFs\n
+``timeout`` Timeout, if not given the default timeout will be used. See `Timeouts`.\n
+``interval`` Maximum time waited between the status polling requests in seconds, default is 5. See `Timeouts`.
+
+*Example:*\n
+| Wait Until VNFs Are Terminated | ${vnf_ids} |
 """
\ No newline at end of file
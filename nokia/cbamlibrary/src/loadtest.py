@@ -0,0 +1,330 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''Load generator for capacity testing CBAM with concurrent VNF lifecycles.
+
+Workers run create, instantiate, terminate and delete cycles back to back. The number of workers follows a ramp of
+stages, given as concurrency:seconds pairs. For every LCM operation the time from submitting it to the operation
+occurrence reaching STARTING, PROCESSING and COMPLETED is measured. The ramp stops early when the error rate of the
+cycles crosses the threshold. Without --host the load is generated against a local mock CBAM:
+
+    python loadtest.py --stages 5:60,20:60,50:60 --vnfd-id example-vnfd --output results/cbam
+
+Results are printed per stage and written to <output>.json, <output>_percentiles.csv and <output>_timeseries.csv.
+'''
+
+import argparse
+import csv
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+from benchmark import percentiles
+from cbam_metrics import endpoint_template
+
+OPERATIONS = ("instantiate", "terminate")
+STATES = ("STARTING", "PROCESSING", "COMPLETED")
+
+
+class Cycle:
+
+    def __init__(self, stage, started):
+        self.stage = stage
+        self.started = started
+        self.ended = None
+        self.error = None
+        # Seconds from submitting each operation to the states of its occurrence
+        self.operations = {operation: {} for operation in OPERATIONS}
+
+
+class LoadGenerator:
+    '''Runs VNF lifecycles with the concurrency of each stage. Operation occurrences are polled every poll_interval
+    seconds, so the PROCESSING and COMPLETED times are accurate to the polling interval. STARTING is the time CBAM
+    accepted the operation, since occurrences are created in STARTING.'''
+
+    def __init__(self, library, vnfd_id, instantiation, poll_interval=0.5, operation_timeout=600,
+                 error_threshold=0.1, error_window=60, min_samples=10, sample_interval=1, prefix="loadtest"):
+        self.library = library
+        self.vnfd_id = vnfd_id
+        self.instantiation = instantiation
+        self.poll_interval = poll_interval
+        self.operation_timeout = operation_timeout
+        self.error_threshold = error_threshold
+        self.error_window = error_window
+        self.min_samples = min_samples
+        self.sample_interval = sample_interval
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.cycles = []
+        self.recent = deque()
+        self.active = 0
+        self.target = 0
+        self.stage = 0
+        self.running = False
+        self.leftovers = set()
+        self.cleanup_error = None
+        self.started = None
+        self.counter = 0
+
+    def run(self, stages):
+        '''Runs the stages, a list of (concurrency, seconds) tuples, and returns the results as a dictionary.'''
+        self.started = time.monotonic()
+        self.running = True
+        workers = [threading.Thread(target=self._work, args=(index,), daemon=True) for index in range(max(concurrency for concurrency, _ in stages))]
+        for worker in workers:
+            worker.start()
+        timeseries, stopped = [], None
+        stage_results = []
+        try:
+            for index, (concurrency, duration) in enumerate(stages):
+                self.target = concurrency
+                self.stage = index
+                stage_started = time.monotonic()
+                while time.monotonic() - stage_started < duration and stopped is None:
+                    time.sleep(self.sample_interval)
+                    timeseries.append(self._sample())
+                    error_rate = self._error_rate()
+                    if error_rate is not None and error_rate > self.error_threshold:
+                        stopped = f"error rate {error_rate:.2f} crossed the threshold {self.error_threshold} at concurrency {concurrency}"
+                if stopped is not None:
+                    break
+        finally:
+            # Running cycles are finished, so that their VNFs are cleaned up
+            self.running = False
+            for worker in workers:
+                worker.join()
+            self._clean_up()
+        for index, (concurrency, duration) in enumerate(stages):
+            cycles = [cycle for cycle in self.cycles if cycle.stage == index]
+            if cycles:
+                stage_results.append(self._stage_results(index, concurrency, duration, cycles))
+        return {
+            "duration": round(time.monotonic() - self.started, 3),
+            "stopped": stopped,
+            "stages": stage_results,
+            "timeseries": timeseries,
+            "leftover_vnfs": sorted(self.leftovers),
+            "cleanup_error": self.cleanup_error
+        }
+
+    def _work(self, index):
+        while self.running:
+            if index >= self.target:
+                time.sleep(0.1)
+                continue
+            with self.lock:
+                self.active += 1
+                self.counter += 1
+                number = self.counter
+            cycle = self._cycle(number)
+            with self.lock:
+                self.active -= 1
+                self.cycles.append(cycle)
+                self.recent.append(cycle)
+
+    def _cycle(self, number):
+        cycle = Cycle(self.stage, time.monotonic())
+        try:
+            vnf_id = self.library.create_vnf(self.vnfd_id, f"{self.prefix}-{number}")["id"]
+            with self.lock:
+                self.leftovers.add(vnf_id)
+            self._operation(cycle, "instantiate", lambda: self.library.instantiate_vnf(vnf_id, self.instantiation))
+            self._operation(cycle, "terminate", lambda: self.library.terminate_vnf(vnf_id))
+            self.library.delete_vnf(vnf_id)
+            with self.lock:
+                self.leftovers.discard(vnf_id)
+        except Exception as error:
+            cycle.error = _error_key(error)
+        cycle.ended = time.monotonic()
+        return cycle
+
+    def _operation(self, cycle, name, start):
+        times = cycle.operations[name]
+        submitted = time.monotonic()
+        operation_id = start()
+        times["STARTING"] = time.monotonic() - submitted
+        while True:
+            state = self.library.get_operation(operation_id)["operationState"]
+            elapsed = time.monotonic() - submitted
+            if state in ("PROCESSING", "COMPLETED"):
+                times.setdefault(state, elapsed)
+            if state == "COMPLETED":
+                return
+            if state in self.library.failed_operation_states:
+                raise Exception(f"{name} operation {operation_id} ended in {state}")
+            if elapsed > self.operation_timeout:
+                raise Exception(f"{name} operation {operation_id} did not complete in {self.operation_timeout} seconds")
+            time.sleep(self.poll_interval)
+
+    def _clean_up(self):
+        '''Tears down the VNFs left behind by failed cycles. VNFs that cannot be torn down are reported.'''
+        if not self.leftovers:
+            return
+        try:
+            self.library.tear_down_vnfs(*sorted(self.leftovers), delete_packages=False, timeout=self.operation_timeout, interval=self.poll_interval)
+            self.leftovers.clear()
+        except Exception as error:
+            self.cleanup_error = str(error)
+            existing = {vnf["id"] for vnf in self.library.get_vnfs_with_attributes("id")}
+            self.leftovers.intersection_update(existing)
+
+    def _error_rate(self):
+        '''Returns the error rate of the cycles that ended within the error window, None if there are too few.'''
+        with self.lock:
+            while self.recent and self.recent[0].ended < time.monotonic() - self.error_window:
+                self.recent.popleft()
+            if len(self.recent) < self.min_samples:
+                return None
+            return sum(cycle.error is not None for cycle in self.recent) / len(self.recent)
+
+    def _sample(self):
+        now = time.monotonic()
+        with self.lock:
+            ended = [cycle for cycle in self.cycles if cycle.ended > now - self.sample_interval]
+            active = self.active
+        instantiations = [cycle.operations["instantiate"]["COMPLETED"] for cycle in ended if "COMPLETED" in cycle.operations["instantiate"]]
+        return {
+            "time": round(now - self.started, 3),
+            "target_concurrency": self.target,
+            "active_cycles": active,
+            "completed_cycles": sum(cycle.error is None for cycle in ended),
+            "failed_cycles": sum(cycle.error is not None for cycle in ended),
+            "instantiate_completed_p50": percentiles(instantiations)["p50"] if instantiations else None,
+            "instantiate_completed_max": percentiles(instantiations)["max"] if instantiations else None
+        }
+
+    def _stage_results(self, index, concurrency, duration, cycles):
+        failed = [cycle for cycle in cycles if cycle.error is not None]
+        passed = [cycle for cycle in cycles if cycle.error is None]
+        latency = {}
+        for operation in OPERATIONS:
+            for state in STATES:
+                values = [cycle.operations[operation][state] for cycle in cycles if state in cycle.operations[operation]]
+                if values:
+                    latency[f"{operation} {state}"] = {**percentiles(values), "count": len(values)}
+        if passed:
+            latency["cycle"] = {**percentiles([cycle.ended - cycle.started for cycle in passed]), "count": len(passed)}
+        errors = {}
+        for cycle in failed:
+            errors[cycle.error] = errors.get(cycle.error, 0) + 1
+        return {
+            "stage": index + 1,
+            "concurrency": concurrency,
+            "duration": duration,
+            "cycles": len(cycles),
+            "failed": len(failed),
+            "error_rate": round(len(failed) / len(cycles), 4),
+            "latency": latency,
+            "errors": errors
+        }
+
+
+def _error_key(error):
+    '''Groups errors of the cycles: HTTP errors by status and endpoint, other errors by their message.'''
+    response = getattr(error, "response", None)
+    if response is not None:
+        return f"{response.status_code} {response.request.method} {endpoint_template(urlsplit(response.url).path)}"
+    return f"{type(error).__name__}: {error}"
+
+
+def parse_stages(stages):
+    '''Parses stages given as comma separated concurrency:seconds pairs, e.g. 5:60,20:60,50:60.'''
+    parsed = []
+    for stage in stages.split(","):
+        concurrency, _, duration = stage.partition(":")
+        if not duration:
+            raise argparse.ArgumentTypeError(f"Stage '{stage}' is not of the form concurrency:seconds")
+        parsed.append((int(concurrency), float(duration)))
+    return parsed
+
+
+def report(results):
+    lines = []
+    for stage in results["stages"]:
+        lines += [
+            "",
+            f"Stage {stage['stage']}: concurrency {stage['concurrency']}, {stage['cycles']} cycles, "
+            f"{stage['failed']} failed (error rate {stage['error_rate']})",
+            f"{'Latency (s)':<24}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'count':>8}"
+        ]
+        for name, latency in stage["latency"].items():
+            lines.append(f"{name:<24}{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{latency['max']:>10}{latency['count']:>8}")
+        for error, count in stage["errors"].items():
+            lines.append(f"{count:>8}  {error}")
+    lines.append("")
+    lines.append(f"Finished in {results['duration']} s" + (f", ramp stopped: {results['stopped']}" if results["stopped"] else ""))
+    if results["leftover_vnfs"]:
+        lines.append(f"{len(results['leftover_vnfs'])} VNFs left behind by failed cycles could not be torn down, see leftover_vnfs and cleanup_error in the results")
+    return "\n".join(lines)
+
+
+def write(results, output):
+    with open(f"{output}.json", "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    with open(f"{output}_percentiles.csv", "w", newline="") as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(["stage", "concurrency", "latency", "count", "p50", "p95", "p99", "max"])
+        for stage in results["stages"]:
+            for name, latency in stage["latency"].items():
+                writer.writerow([stage["stage"], stage["concurrency"], name, latency["count"], latency["p50"], latency["p95"], latency["p99"], latency["max"]])
+    with open(f"{output}_timeseries.csv", "w", newline="") as output_file:
+        if results["timeseries"]:
+            writer = csv.DictWriter(output_file, fieldnames=list(results["timeseries"][0]))
+            writer.writeheader()
+            writer.writerows(results["timeseries"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capacity test CBAM with concurrent VNF lifecycles")
+    parser.add_argument("--stages", type=parse_stages, default=parse_stages("5:30,20:30,50:30"),
+                        help="ramp as comma separated concurrency:seconds pairs, default 5:30,20:30,50:30")
+    parser.add_argument("--host", help="CBAM host or comma separated hosts, a local mock CBAM is started if not given")
+    parser.add_argument("--client-id", default="loadtest")
+    parser.add_argument("--client-secret", default="loadtest")
+    parser.add_argument("--vnfd-id", default="loadtest-vnfd", help="VNFD the VNFs are created from")
+    parser.add_argument("--instantiation", default='{"flavourId": "default"}', help="instantiation parameters as JSON or a JSON file")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between polls of an operation occurrence")
+    parser.add_argument("--operation-timeout", type=float, default=600, help="seconds an operation may take before the cycle fails")
+    parser.add_argument("--error-threshold", type=float, default=0.1, help="error rate of the cycles that stops the ramp")
+    parser.add_argument("--error-window", type=float, default=60, help="seconds of ended cycles the error rate is calculated from")
+    parser.add_argument("--min-samples", type=int, default=10, help="ended cycles needed in the window before the ramp can be stopped")
+    parser.add_argument("--sample-interval", type=float, default=1, help="seconds between the time series samples")
+    parser.add_argument("--prefix", default="loadtest", help="name prefix of the created VNFs")
+    parser.add_argument("--output", help="base path of the JSON and CSV result files")
+    parser.add_argument("--latency", type=float, default=0.005, help="response delay of the mock CBAM in seconds")
+    parser.add_argument("--processing-delay", type=float, default=2, help="operation duration of the mock CBAM in seconds")
+    args = parser.parse_args()
+    mock = None
+    if args.host is None:
+        mock = MockCBAM(latency=args.latency, processing_delay=args.processing_delay).start()
+    max_concurrency = max(concurrency for concurrency, _ in args.stages)
+    library = CBAMLibrary()
+    library.connect_to_cbam(args.host or mock.url, args.client_id, args.client_secret, pool_maxsize=max_concurrency)
+    generator = LoadGenerator(library, args.vnfd_id, args.instantiation, args.poll_interval, args.operation_timeout,
+                              args.error_threshold, args.error_window, args.min_samples, args.sample_interval, args.prefix)
+    try:
+        results = generator.run(args.stages)
+    finally:
+        if mock is not None:
+            mock.stop()
+    print(report(results))
+    if args.output:
+        write(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
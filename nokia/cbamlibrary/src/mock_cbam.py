@@ -0,0 +1,514 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''Local stand-in for CBAM, for measuring and regression testing the library without a real CBAM.
+
+Implements the Keycloak token endpoint, VNF instances, VNF LCM operation occurrences, LCM subscriptions and
+SOL005 VNF packages in memory. Lifecycle operations go through STARTING and PROCESSING to COMPLETED after the
+configured delays. Run it standalone with:
+
+    python mock_cbam.py --port 8080 --latency 0.01 --processing-delay 2
+'''
+
+import argparse
+import contextlib
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+from cbam_metrics import endpoint_template
+
+TOKEN_PATH = "/auth/realms/cbam/protocol/openid-connect/token"
+
+
+class MockCBAM:
+    '''In-memory CBAM served from background threads. Delays are in seconds. With several nodes, the same CBAM is
+    served from consecutive ports, and each node processes at most node_capacity requests at a time.'''
+
+    def __init__(self, address="127.0.0.1", port=0, latency=0, token_lifetime=300, refresh_token_lifetime=1800,
+                 starting_delay=0.1, processing_delay=1, page_size=100, max_concurrent_requests=0, nodes=1, node_capacity=0,
+                 onboarding_delay=0):
+        self.latency = float(latency)
+        self.token_lifetime = float(token_lifetime)
+        self.refresh_token_lifetime = float(refresh_token_lifetime)
+        self.starting_delay = float(starting_delay)
+        self.processing_delay = float(processing_delay)
+        self.page_size = int(page_size)
+        # Packages stay PROCESSING after the upload, like the asynchronous onboarding of SOL005
+        self.onboarding_delay = float(onboarding_delay)
+        # Requests over the limit are throttled with 429, like a shared CBAM under load
+        self.max_concurrent_requests = int(max_concurrent_requests)
+        self.in_flight = 0
+        self.lock = threading.RLock()
+        self.vnfs = {}
+        self.operations = {}
+        self.packages = {}
+        self.subscriptions = {}
+        self.tokens = {}
+        self.calls = {}
+        self.scheduler = Scheduler()
+        self.servers = [MockServer((address, int(port) + node if int(port) else 0), self._handler(), int(node_capacity)) for node in range(int(nodes))]
+        self.threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in self.servers]
+
+    @property
+    def url(self):
+        return self.urls[0]
+
+    @property
+    def urls(self):
+        return [f"http://{server.server_address[0]}:{server.server_address[1]}" for server in self.servers]
+
+    def start(self):
+        self.scheduler.start()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        for node in range(len(self.servers)):
+            self.stop_node(node)
+        self.scheduler.stop()
+
+    def stop_node(self, node):
+        '''Stops serving from one node, e.g. to test failover. Connections to it are refused afterwards.'''
+        server = self.servers[node]
+        if not server.stopped:
+            server.stopped = True
+            server.shutdown()
+            server.server_close()
+
+    def start_node(self, node):
+        '''Serves from a stopped node again on the same port, e.g. to test that a recovered node is used again.'''
+        server = self.servers[node]
+        if server.stopped:
+            self.servers[node] = MockServer(server.server_address, self._handler(), server.capacity_limit)
+            self.threads[node] = threading.Thread(target=self.servers[node].serve_forever, daemon=True)
+            self.threads[node].start()
+
+    def call_counts(self):
+        with self.lock:
+            return dict(self.calls)
+
+    def handle(self, method, path, headers, body):
+        '''Returns status, headers and JSON encoded body of the response to a request. Absolute URLs in the headers
+        start with {base_url}, which is replaced with the address the request was sent to.'''
+        # Resources are encoded while holding the lock, operations change state in the background
+        with self.lock:
+            status, headers, content = self._route(method, path, headers, body)
+            return status, headers, json.dumps(content).encode() if content is not None else b""
+
+    def _route(self, method, path, headers, body):
+        url = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        segments = url.path.strip("/").split("/")
+        key = f"{method} {endpoint_template(url.path)}"
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if url.path == TOKEN_PATH and method == "POST":
+            return self._token(dict(parse_qs(body.decode())))
+        if not self._authorized(headers.get("Authorization", "")):
+            return 401, {}, {"detail": "Invalid or expired access token"}
+        if segments[:3] == ["vnflcm", "v1", "vnf_instances"]:
+            return self._vnf_instances(method, segments[3:], query, body)
+        if segments[:3] == ["vnflcm", "v1", "vnf_lcm_op_occs"]:
+            return self._operations(method, segments[3:], query)
+        if segments[:3] == ["vnflcm", "v1", "subscriptions"]:
+            return self._subscriptions(method, segments[3:], body)
+        if segments[:3] == ["vnfpkgm", "v1", "vnf_packages"]:
+            return self._packages(method, segments[3:], query, headers, body)
+        return 404, {}, {"detail": f"{url.path} not found"}
+
+    def _token(self, form):
+        grant_type = form.get("grant_type", [None])[0]
+        if grant_type == "refresh_token":
+            refresh_token = self.tokens.pop(form.get("refresh_token", [None])[0], None)
+            if refresh_token is None or refresh_token["expires"] < time.time():
+                return 400, {}, {"error": "invalid_grant"}
+        elif grant_type != "client_credentials":
+            return 400, {}, {"error": "unsupported_grant_type"}
+        access_token, refresh_token = uuid.uuid4().hex, uuid.uuid4().hex
+        self.tokens[access_token] = {"expires": time.time() + self.token_lifetime}
+        self.tokens[refresh_token] = {"expires": time.time() + self.refresh_token_lifetime}
+        return 200, {}, {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer",
+                         "expires_in": self.token_lifetime, "refresh_expires_in": self.refresh_token_lifetime}
+
+    def _authorized(self, authorization):
+        token = self.tokens.get(authorization[len("Bearer "):])
+        return token is not None and token["expires"] >= time.time()
+
+    def _vnf_instances(self, method, segments, query, body):
+        if not segments:
+            if method == "GET":
+                return self._page(list(self.vnfs.values()), query, "/vnflcm/v1/vnf_instances")
+            if method == "POST":
+                request = json.loads(body)
+                vnf = {
+                    "id": f"CBAM-{uuid.uuid4().hex}",
+                    "vnfdId": request["vnfdId"],
+                    "vnfInstanceName": request.get("vnfInstanceName"),
+                    "vnfInstanceDescription": request.get("vnfInstanceDescription"),
+                    "instantiationState": "NOT_INSTANTIATED"
+                }
+                self.vnfs[vnf["id"]] = vnf
+                return 201, {"Location": f"{{base_url}}/vnflcm/v1/vnf_instances/{vnf['id']}"}, vnf
+            return 405, {}, None
+        vnf = self.vnfs.get(segments[0])
+        if vnf is None:
+            return 404, {}, {"detail": f"VNF {segments[0]} not found"}
+        if len(segments) == 1:
+            if method == "GET":
+                return 200, {}, vnf
+            if method == "PATCH":
+                vnf.update(json.loads(body or "{}"))
+                return 202, {}, None
+            if method == "DELETE":
+                if vnf["instantiationState"] != "NOT_INSTANTIATED":
+                    return 409, {}, {"detail": f"VNF {vnf['id']} is instantiated"}
+                del self.vnfs[vnf["id"]]
+                return 204, {}, None
+            return 405, {}, None
+        if method != "POST":
+            return 405, {}, None
+        operation = {"instantiate": "INSTANTIATE", "terminate": "TERMINATE", "custom": "CUSTOM"}.get(segments[1])
+        if operation is None:
+            return 404, {}, {"detail": f"Unknown operation {segments[1]}"}
+        if any(occurrence["vnfInstanceId"] == vnf["id"] and occurrence["operationState"] in ("STARTING", "PROCESSING")
+               for occurrence in self.operations.values()):
+            return 409, {}, {"detail": f"VNF {vnf['id']} has an operation in progress"}
+        occurrence = {
+            "id": uuid.uuid4().hex,
+            "vnfInstanceId": vnf["id"],
+            "operation": operation,
+            "operationState": "STARTING",
+            "startTime": _timestamp(time.time()),
+            "stateEnteredTime": _timestamp(time.time())
+        }
+        self.operations[occurrence["id"]] = occurrence
+        self._notify(occurrence)
+        self.scheduler.schedule(self.starting_delay, self._transition, occurrence, "PROCESSING")
+        self.scheduler.schedule(self.starting_delay + self.processing_delay, self._transition, occurrence, "COMPLETED")
+        return 202, {"Location": f"{{base_url}}/vnflcm/v1/vnf_lcm_op_occs/{occurrence['id']}"}, None
+
+    def _transition(self, occurrence, state):
+        with self.lock:
+            occurrence["operationState"] = state
+            occurrence["stateEnteredTime"] = _timestamp(time.time())
+            vnf = self.vnfs.get(occurrence["vnfInstanceId"])
+            if state == "COMPLETED" and vnf is not None and occurrence["operation"] in ("INSTANTIATE", "TERMINATE"):
+                vnf["instantiationState"] = "INSTANTIATED" if occurrence["operation"] == "INSTANTIATE" else "NOT_INSTANTIATED"
+            self._notify(occurrence)
+
+    def _operations(self, method, segments, query):
+        if method != "GET":
+            return 405, {}, None
+        if not segments:
+            return self._page(list(self.operations.values()), query, "/vnflcm/v1/vnf_lcm_op_occs")
+        occurrence = self.operations.get(segments[0])
+        if occurrence is None:
+            return 404, {}, {"detail": f"Operation occurrence {segments[0]} not found"}
+        return 200, {}, occurrence
+
+    def _subscriptions(self, method, segments, body):
+        if method == "POST" and not segments:
+            subscription = {"id": uuid.uuid4().hex, **json.loads(body)}
+            self.subscriptions[subscription["id"]] = subscription
+            return 201, {}, subscription
+        if method == "DELETE" and segments:
+            return (204, {}, None) if self.subscriptions.pop(segments[0], None) else (404, {}, None)
+        return 405, {}, None
+
+    def _notify(self, occurrence):
+        notification = {
+            "notificationType": "VnfLcmOperationOccurrenceNotification",
+            "vnfInstanceId": occurrence["vnfInstanceId"],
+            "vnfLcmOpOccId": occurrence["id"],
+            "operation": occurrence["operation"],
+            "operationState": occurrence["operationState"]
+        }
+        for subscription in self.subscriptions.values():
+            # Sent from the scheduler thread, so slow receivers do not block the API
+            self.scheduler.schedule(0, _post_notification, subscription["callbackUri"], notification)
+
+    def _packages(self, method, segments, query, headers, body):
+        if not segments:
+            if method == "GET":
+                return self._page([_package_info(package) for package in self.packages.values()], query, "/vnfpkgm/v1/vnf_packages")
+            if method == "POST":
+                package = {"id": uuid.uuid4().hex, "onboardingState": "CREATED", "content": b""}
+                self.packages[package["id"]] = package
+                return 201, {}, _package_info(package)
+            return 405, {}, None
+        package = self.packages.get(segments[0])
+        if package is None:
+            return 404, {}, {"detail": f"VNF package {segments[0]} not found"}
+        if len(segments) == 1:
+            if method == "GET":
+                return 200, {}, _package_info(package)
+            if method == "DELETE":
+                del self.packages[package["id"]]
+                return 204, {}, None
+            return 405, {}, None
+        if segments[1] != "package_content" or method != "PUT":
+            return 405, {}, None
+        content_range = headers.get("Content-Range")
+        if content_range is None:
+            package["content"] = body
+        else:
+            start, total = content_range.split()[1].split("-")[0], content_range.split("/")[-1]
+            package["content"] = package["content"][:int(start)] + body
+            if len(package["content"]) < int(total):
+                return 202, {}, None
+        if self.onboarding_delay:
+            package["onboardingState"] = "PROCESSING"
+            self.scheduler.schedule(self.onboarding_delay, self._onboarded, package)
+        else:
+            self._onboarded(package)
+        return 202, {}, None
+
+    def _onboarded(self, package):
+        with self.lock:
+            package["onboardingState"] = "ONBOARDED"
+            package["vnfdId"] = package["id"]
+            package["checksum"] = {"algorithm": "SHA-256", "hash": hashlib.sha256(package["content"]).hexdigest()}
+
+    def _page(self, resources, query, path):
+        '''Returns a filtered page of resources with a SOL013 Link header to the next page.'''
+        if "filter" in query:
+            try:
+                expressions = _parse_filter(query["filter"])
+            except ValueError as error:
+                return 400, {}, {"detail": str(error)}
+            resources = [resource for resource in resources if all(_matches(resource, *expression) for expression in expressions)]
+        start = int(query.get("nextpage_opaque_marker", 0))
+        headers = {}
+        if start + self.page_size < len(resources):
+            next_query = {**query, "nextpage_opaque_marker": start + self.page_size}
+            headers["Link"] = f'<{{base_url}}{path}?{urlencode(next_query)}>; rel="next"'
+        return 200, headers, resources[start:start + self.page_size]
+
+    def _handler(self):
+        mock = self
+
+        class MockHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one segment, otherwise Nagle's algorithm and delayed ACKs slow down every
+            # response on keep-alive connections
+            wbufsize = 65536
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+            def _handle(self, method):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.server.stopped:
+                    # Kept-alive connections to a stopped node are dropped without a response
+                    self.close_connection = True
+                    return
+                with mock.lock:
+                    # Keycloak is a separate service, token requests are not throttled
+                    throttled = (mock.max_concurrent_requests and mock.in_flight >= mock.max_concurrent_requests
+                                 and urlsplit(self.path).path != TOKEN_PATH)
+                    mock.in_flight += 0 if throttled else 1
+                if throttled:
+                    self._respond(429, {"Retry-After": "1"}, json.dumps({"detail": "Too many requests"}).encode())
+                    return
+                try:
+                    with self.server.capacity:
+                        if mock.latency:
+                            time.sleep(mock.latency)
+                        status, headers, content = mock.handle(method, self.path, self.headers, body)
+                finally:
+                    with mock.lock:
+                        mock.in_flight -= 1
+                if method == "GET" and status == 200:
+                    headers["ETag"] = '"' + hashlib.md5(content).hexdigest() + '"'
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        status, content = 304, b""
+                self._respond(status, headers, content)
+
+            def _respond(self, status, headers, content):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value.replace("{base_url}", f"http://{self.headers['Host']}"))
+                if content:
+                    self.send_header("Content-Type", "application/json")
+                if self.headers.get("Connection", "").lower() == "close":
+                    # Tells the client not to reuse the connection, otherwise its next request fails on the closed socket
+                    self.send_header("Connection", "close")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MockHandler
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes concurrent clients wait for SYN retransmissions when opening connections
+    request_queue_size = 128
+
+    def __init__(self, address, handler, capacity=0):
+        super().__init__(address, handler)
+        self.capacity_limit = capacity
+        # Requests over the capacity of the node wait for their turn, like on a node with a fixed number of workers
+        self.capacity = threading.BoundedSemaphore(capacity) if capacity else contextlib.nullcontext()
+        self.stopped = False
+
+
+class Scheduler:
+    '''Runs delayed calls in order from a single background thread.'''
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.calls = []
+        self.sequence = itertools.count()
+        self.running = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def schedule(self, delay, function, *args):
+        with self.condition:
+            heapq.heappush(self.calls, (time.monotonic() + delay, next(self.sequence), function, args))
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and (not self.calls or self.calls[0][0] > time.monotonic()):
+                    self.condition.wait(self.calls[0][0] - time.monotonic() if self.calls else None)
+                if not self.running:
+                    return
+                _, _, function, args = heapq.heappop(self.calls)
+            function(*args)
+
+
+def _parse_filter(expression):
+    '''Parses an SOL013 attribute filter, e.g. (eq,vnfInstanceName,example);(in,id,a,b), to a list of
+    (operator, attribute, values) tuples.'''
+    expressions = []
+    for part in _split(expression, ";"):
+        if not (part.startswith("(") and part.endswith(")")):
+            raise ValueError(f"Invalid attribute filter '{expression}'")
+        operator, attribute, *values = _split(part[1:-1], ",")
+        if operator not in ("eq", "neq", "in", "nin", "gt", "gte", "lt", "lte", "cont") or not values:
+            raise ValueError(f"Invalid attribute filter '{expression}'")
+        expressions.append((operator, attribute, values))
+    return expressions
+
+
+def _split(text, separator):
+    '''Splits the text on the separator outside quoted values and unquotes the values.'''
+    parts, part, quoted, index = [], "", False, 0
+    while index < len(text):
+        character = text[index]
+        if character == "'" and quoted and text[index + 1:index + 2] == "'":
+            part += "'"
+            index += 1
+        elif character == "'" and (quoted or part == ""):
+            quoted = not quoted
+        elif character == separator and not quoted:
+            parts.append(part)
+            part = ""
+        else:
+            part += character
+        index += 1
+    return parts + [part]
+
+
+def _matches(resource, operator, attribute, values):
+    value = resource
+    for key in attribute.split("/"):
+        value = value.get(key) if isinstance(value, dict) else None
+    value = "" if value is None else str(value)
+    if operator in ("eq", "in"):
+        return value in values
+    if operator in ("neq", "nin"):
+        return value not in values
+    if operator in ("gt", "gte", "lt", "lte"):
+        # Timestamps in ISO 8601 compare correctly as strings
+        return {"gt": value > values[0], "gte": value >= values[0], "lt": value < values[0], "lte": value <= values[0]}[operator]
+    return any(candidate in value for candidate in values)
+
+
+def _package_info(package):
+    return {key: value for key, value in package.items() if key != "content"}
+
+
+def _post_notification(callback_uri, notification):
+    request = urllib.request.Request(callback_uri, data=json.dumps(notification).encode(), headers={"Content-Type": "application/json"})
+    try:
+        urllib.request.urlopen(request, timeout=5).close()
+    except OSError:
+        pass
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for CBAM")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0, help="delay of every response in seconds")
+    parser.add_argument("--token-lifetime", type=float, default=300, help="access token lifetime in seconds")
+    parser.add_argument("--refresh-token-lifetime", type=float, default=1800, help="refresh token lifetime in seconds")
+    parser.add_argument("--starting-delay", type=float, default=0.1, help="seconds operations stay STARTING")
+    parser.add_argument("--processing-delay", type=float, default=1, help="seconds operations stay PROCESSING")
+    parser.add_argument("--page-size", type=int, default=100, help="maximum number of resources in a list response")
+    parser.add_argument("--max-concurrent-requests", type=int, default=0, help="requests over this are throttled with 429, 0 for no limit")
+    parser.add_argument("--nodes", type=int, default=1, help="number of nodes serving the CBAM from consecutive ports")
+    parser.add_argument("--node-capacity", type=int, default=0, help="requests processed by a node at a time, 0 for no limit")
+    parser.add_argument("--onboarding-delay", type=float, default=0, help="seconds packages stay PROCESSING after the upload")
+    args = parser.parse_args()
+    mock = MockCBAM(args.address, args.port, args.latency, args.token_lifetime, args.refresh_token_lifetime,
+                    args.starting_delay, args.processing_delay, args.page_size, args.max_concurrent_requests,
+                    args.nodes, args.node_capacity, args.onboarding_delay).start()
+    print("Mock CBAM listening on " + ", ".join(mock.urls))
+    try:
+        mock.threads[0].join()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+INSTANTIATION = {"flavourId": "default"}
+
+
+@pytest.fixture(scope="module")
+def mock():
+    mock = MockCBAM(starting_delay=0.01, processing_delay=0.05).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def library(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07")
+    library.set_polling_options(initial_interval=0.02)
+    yield library
+    library.connection.close()
+
+
+def test_lifecycle_of_vnfs_in_batches(library, mock):
+    names = [f"batch-{index}" for index in range(5)]
+    vnfs = library.create_vnfs("example-vnfd", names, description="batch")
+    assert [vnf["vnfInstanceName"] for vnf in vnfs] == names
+    vnf_ids = [vnf["id"] for vnf in vnfs]
+
+    operation_ids = library.instantiate_vnfs(vnf_ids, INSTANTIATION, interval=0.1)
+    assert len(set(operation_ids)) == len(vnf_ids)
+    assert {mock.vnfs[vnf_id]["instantiationState"] for vnf_id in vnf_ids} == {"INSTANTIATED"}
+
+    library.terminate_vnfs(vnf_ids, interval=0.1)
+    assert {mock.vnfs[vnf_id]["instantiationState"] for vnf_id in vnf_ids} == {"NOT_INSTANTIATED"}
+
+    library.delete_vnfs(vnf_ids)
+    assert not set(vnf_ids) & set(mock.vnfs)
+
+
+def test_concurrency_limits_requests_in_flight(library):
+    vnfs = library.create_vnfs("example-vnfd", [f"limited-{index}" for index in range(6)], concurrency=2)
+    assert len({vnf["id"] for vnf in vnfs}) == 6
+    library.delete_vnfs([vnf["id"] for vnf in vnfs], concurrency="2")
+
+
+def test_failing_item_does_not_stop_the_others(library, mock):
+    vnf_ids = [vnf["id"] for vnf in library.create_vnfs("example-vnfd", ["ok-1", "ok-2"])]
+    with pytest.raises(Exception) as error:
+        library.instantiate_vnfs(vnf_ids[:1] + ["CBAM-missing"] + vnf_ids[1:], INSTANTIATION, interval=0.1)
+    assert "1/3 operations failed" in str(error.value)
+    assert "CBAM-missing" in str(error.value)
+    assert {mock.vnfs[vnf_id]["instantiationState"] for vnf_id in vnf_ids} == {"INSTANTIATED"}
+
+    # Instantiated VNFs cannot be deleted, the terminated one is deleted anyway
+    library.terminate_vnfs(vnf_ids[:1], interval=0.1)
+    with pytest.raises(Exception) as error:
+        library.delete_vnfs(vnf_ids)
+    assert "1/2 operations failed" in str(error.value)
+    assert vnf_ids[1] in str(error.value)
+    assert vnf_ids[0] not in mock.vnfs and vnf_ids[1] in mock.vnfs
+
+
+def test_terminate_without_waiting(library, mock):
+    vnf_ids = [vnf["id"] for vnf in library.create_vnfs("example-vnfd", ["nowait"])]
+    library.instantiate_vnfs(vnf_ids, INSTANTIATION, interval=0.1)
+    operation_ids = library.terminate_vnfs(vnf_ids, wait_for_completion=False)
+    assert mock.operations[operation_ids[0]]["operation"] == "TERMINATE"
+    library.wait_until_operations_complete(operation_ids, interval=0.1)
+    library.delete_vnfs(vnf_ids)
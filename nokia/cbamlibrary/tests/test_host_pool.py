@@ -0,0 +1,83 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import json
+import time
+import pytest
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+
+@pytest.fixture
+def mock():
+    mock = MockCBAM(nodes=3).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def library(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(",".join(mock.urls), "robot", "r0b07", response_cache_size=0, max_host_failures=2, host_ejection_time=0.5)
+    yield library
+    library.connection.close()
+
+
+def _statistics(library):
+    return {host["host"]: host for host in library.get_host_statistics()}
+
+
+def test_requests_are_spread_over_the_hosts(library, mock):
+    vnf_id = library.create_vnf("example-vnfd", "balanced")["id"]
+    for _ in range(30):
+        library.get_vnf(vnf_id)
+    # Idle hosts take turns, token and creation requests included
+    requests = [host["requests"] for host in _statistics(library).values()]
+    assert sum(requests) == 32 and max(requests) - min(requests) <= 1
+
+
+def test_failing_host_is_ejected_and_readmitted(library, mock):
+    vnf_id = library.create_vnf("example-vnfd", "failover")["id"]
+    failing = mock.urls[1]
+    mock.stop_node(1)
+    for _ in range(10):
+        assert library.get_vnf(vnf_id)["id"] == vnf_id
+    statistics = _statistics(library)[failing]
+    assert not statistics["available"]
+    assert statistics["ejections"] == 1
+    assert statistics["failures"] == 2
+    assert json.loads(library.get_request_metrics())["failovers"] == 2
+    # No requests go to the ejected host
+    requests = statistics["requests"]
+    for _ in range(10):
+        library.get_vnf(vnf_id)
+    assert _statistics(library)[failing]["requests"] == requests
+
+    mock.start_node(1)
+    time.sleep(0.6)
+    assert _statistics(library)[failing]["available"]
+    for _ in range(10):
+        library.get_vnf(vnf_id)
+    statistics = _statistics(library)[failing]
+    assert statistics["requests"] > requests
+    # A success resets the ejection backoff
+    assert statistics["ejections"] == 0
+
+
+def test_request_fails_when_every_host_fails(library, mock):
+    for node in range(3):
+        mock.stop_node(node)
+    with pytest.raises(Exception):
+        library.get_vnfs()
@@ -0,0 +1,79 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+from cbam_json_stream import iterate_json_array
+
+ELEMENTS = [
+    {"id": "CBAM-1", "vnfInstanceName": "quoted \"name\" \\ with escapes", "extensions": {"brackets": "}]{[", "list": [1, [2, {}]]}},
+    {"id": "CBAM-2", "vnfInstanceName": "äöü € 𝄞", "instantiatedVnfInfo": None},
+    "string with \\\" at the end\\",
+    -12.5e3, 0, True, False, None, [], {}, [[["nested"]]]
+]
+
+
+def _chunks(data, size):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_elements_split_at_any_chunk_boundary(size):
+    data = json.dumps(ELEMENTS, ensure_ascii=False).encode()
+    assert list(iterate_json_array(_chunks(data, size))) == ELEMENTS
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "\n[\n]\n"])
+def test_empty_arrays(text):
+    assert list(iterate_json_array([text.encode()])) == []
+
+
+def test_whitespace_between_elements():
+    assert list(iterate_json_array([b' [ 1 ,\n"a" ,\t{"b": 2} ] '])) == [1, "a", {"b": 2}]
+
+
+def test_transform_is_applied_to_each_element():
+    data = json.dumps(ELEMENTS[:2]).encode()
+    assert list(iterate_json_array(_chunks(data, 5), lambda vnf: vnf["id"])) == ["CBAM-1", "CBAM-2"]
+
+
+def test_reading_stops_when_iteration_stops():
+    read = []
+
+    def chunks():
+        for chunk in (b'[{"id": 1},', b' {"id": 2},', b' {"id": 3}]'):
+            read.append(chunk)
+            yield chunk
+
+    elements = iterate_json_array(chunks())
+    assert next(elements) == {"id": 1}
+    assert len(read) == 1
+
+
+def test_large_element():
+    element = {"extensions": {f"key{index}": "v" * 50 for index in range(20000)}}
+    data = json.dumps([element, element]).encode()
+    assert list(iterate_json_array(_chunks(data, 4096))) == [element, element]
+
+
+@pytest.mark.parametrize("text, message", [
+    ('{"id": 1}', "Expected a JSON array"),
+    ("", "Unexpected end"),
+    ("[1, 2", "Unexpected end"),
+    ('[{"id": 1}', "Unexpected end"),
+    ('["unterminated', "Unexpected end"),
+])
+def test_invalid_arrays(text, message):
+    with pytest.raises(ValueError, match=message):
+        list(iterate_json_array([text.encode()]))
@@ -0,0 +1,69 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import socket
+import time
+import pytest
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+
+@pytest.fixture
+def mock():
+    mock = MockCBAM(starting_delay=0.05, processing_delay=0.3).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def library(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    library.start_notification_receiver(f"http://127.0.0.1:{port}/notifications", address="127.0.0.1")
+    yield library
+    library.stop_notification_receiver()
+    library.connection.close()
+
+
+def _instantiate(library):
+    vnf = library.create_vnf("example-vnfd", "notified")
+    return vnf["id"], library.instantiate_vnf(vnf["id"], {"flavourId": "default"})
+
+
+def test_wait_ends_on_notification(library):
+    # Without notifications the first poll after the instantiation would be five seconds later
+    library.set_polling_options(initial_interval=5)
+    vnf_id, operation_id = _instantiate(library)
+    started = time.monotonic()
+    library.wait_until_operation_completes(operation_id, interval=5)
+    assert time.monotonic() - started < 2
+    states = [notification["operationState"] for notification in library.get_received_notifications(operation_id)]
+    assert states[-1] == "COMPLETED"
+    assert library.get_vnf(vnf_id)["instantiationState"] == "INSTANTIATED"
+
+
+def test_wait_falls_back_to_polling_without_notifications(library, mock):
+    # Subscription is lost on the CBAM side, so nothing is sent to the receiver
+    mock.subscriptions.clear()
+    library.set_polling_options(initial_interval=1)
+    vnf_id, operation_id = _instantiate(library)
+    started = time.monotonic()
+    library.wait_until_operation_completes(operation_id, interval=1)
+    assert time.monotonic() - started >= 0.9
+    assert library.get_received_notifications() == []
+    assert library.get_vnf(vnf_id)["instantiationState"] == "INSTANTIATED"
@@ -0,0 +1,96 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import time
+import pytest
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+INSTANTIATION = {"flavourId": "default"}
+
+
+@pytest.fixture
+def mock():
+    mock = MockCBAM(starting_delay=0.05, processing_delay=0.3).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def library(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07")
+    library.set_polling_options(initial_interval=0.05)
+    library.set_operation_scheduler_options(workers=10, interval=0.1)
+    yield library
+    library.connection.close()
+
+
+def test_operations_on_one_vnf_run_in_fifo_order(library, mock):
+    vnf_id = library.create_vnf("example-vnfd", "fifo")["id"]
+    handles = [
+        library.schedule_operation(vnf_id, "Instantiate VNF", INSTANTIATION),
+        library.schedule_operation(vnf_id, "Execute Custom Operation On VNF", "first"),
+        library.schedule_operation(vnf_id, "Execute Custom Operation On VNF", "second"),
+        library.schedule_operation(vnf_id, "Terminate VNF")
+    ]
+    # CBAM rejects an operation on a VNF with an operation in progress, so all passing means they ran one at a time
+    results = library.wait_for_handles(handles)
+    assert [operation["operation"] for operation in results] == ["INSTANTIATE", "CUSTOM", "CUSTOM", "TERMINATE"]
+    started = list(mock.operations)
+    assert [started.index(operation["id"]) for operation in results] == sorted(started.index(operation["id"]) for operation in results)
+    assert mock.vnfs[vnf_id]["instantiationState"] == "NOT_INSTANTIATED"
+
+
+def test_operations_on_different_vnfs_run_concurrently(library, mock):
+    vnf_ids = [vnf["id"] for vnf in library.create_vnfs("example-vnfd", [f"parallel-{index}" for index in range(6)])]
+    started = time.monotonic()
+    handles = [library.start_instantiate_vnf(vnf_id, INSTANTIATION) for vnf_id in vnf_ids]
+    library.wait_until_scheduled_operations_complete(handles)
+    # One after another the instantiations would take at least 6 * 0.35 seconds
+    assert time.monotonic() - started < 1.5
+    assert {mock.vnfs[vnf_id]["instantiationState"] for vnf_id in vnf_ids} == {"INSTANTIATED"}
+
+
+def test_failures_are_raised_from_the_handles(library, mock):
+    transition = mock._transition
+
+    def fail_custom_operations(occurrence, state):
+        transition(occurrence, "FAILED_TEMP" if state == "COMPLETED" and occurrence["operation"] == "CUSTOM" else state)
+
+    mock._transition = fail_custom_operations
+    vnf_id = library.create_vnf("example-vnfd", "failing")["id"]
+    failing = library.start_execute_custom_operation_on_vnf(vnf_id, "broken")
+    # A failed operation does not stop the operations queued after it
+    queued = library.start_instantiate_vnf(vnf_id, INSTANTIATION)
+    missing = library.start_instantiate_vnf("CBAM-missing", INSTANTIATION)
+    with pytest.raises(Exception, match="FAILED_TEMP"):
+        library.get_handle_result(failing)
+    with pytest.raises(Exception, match="404"):
+        library.get_handle_result(missing)
+    assert library.get_handle_result(queued)["operationState"] == "COMPLETED"
+    with pytest.raises(ValueError, match="Unknown scheduled operation"):
+        library.get_handle_result(failing)
+
+
+def test_wait_for_handles_reports_every_failure(library):
+    vnf_id = library.create_vnf("example-vnfd", "partly")["id"]
+    handles = [library.start_instantiate_vnf(vnf_id, INSTANTIATION),
+               library.start_instantiate_vnf("CBAM-missing-1", INSTANTIATION),
+               library.start_instantiate_vnf("CBAM-missing-2", INSTANTIATION)]
+    with pytest.raises(Exception) as error:
+        library.wait_for_handles(handles)
+    assert "2/3 operations failed" in str(error.value)
+    assert handles[1] in str(error.value) and handles[2] in str(error.value)
@@ -0,0 +1,88 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import pytest
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+
+@pytest.fixture(scope="module")
+def mock():
+    mock = MockCBAM().start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def library(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07")
+    yield library
+    library.connection.close()
+
+
+def test_unchanged_resource_is_revalidated_with_etag(library, mock):
+    vnf = library.create_vnf("example-vnfd", "cached")
+    calls = mock.call_counts().get("GET /vnflcm/v1/vnf_instances/{id}", 0)
+    first = library.get_vnf(vnf["id"])
+    second = library.get_vnf(vnf["id"])
+    assert first == second == vnf
+    statistics = library.get_response_cache_statistics()
+    assert (statistics["hits"], statistics["misses"], statistics["entries"]) == (1, 1, 1)
+    # The cached body was revalidated, not served without asking CBAM
+    assert mock.call_counts()["GET /vnflcm/v1/vnf_instances/{id}"] == calls + 2
+
+
+def test_changed_resource_is_fetched_again(library, mock):
+    vnf = library.create_vnf("example-vnfd", "changed")
+    library.get_vnf(vnf["id"])
+    # Changed behind the library's back, the ETag no longer matches
+    mock.vnfs[vnf["id"]]["vnfInstanceDescription"] = "changed elsewhere"
+    assert library.get_vnf(vnf["id"])["vnfInstanceDescription"] == "changed elsewhere"
+    assert library.get_response_cache_statistics()["hits"] == 0
+
+
+def test_writes_invalidate_the_resource_and_its_collection(library):
+    vnf = library.create_vnf("example-vnfd", "modified")
+    library.get_vnf(vnf["id"])
+    library.get_vnfs()
+    assert library.get_response_cache_statistics()["entries"] == 2
+    library.modify_vnf(vnf["id"], {"vnfInstanceDescription": "modified"})
+    assert library.get_response_cache_statistics()["entries"] == 0
+    assert library.get_vnf(vnf["id"])["vnfInstanceDescription"] == "modified"
+    library.get_vnfs()
+    created = library.create_vnf("example-vnfd", "another")
+    # Writes to a collection invalidate it together with its members
+    assert library.get_response_cache_statistics()["entries"] == 0
+    assert created["id"] in [item["id"] for item in library.get_vnfs()]
+
+
+def test_cache_is_bounded_by_size(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07", response_cache_size=400)
+    vnf_ids = [library.create_vnf("example-vnfd", f"evicted-{index}")["id"] for index in range(3)]
+    for vnf_id in vnf_ids:
+        library.get_vnf(vnf_id)
+    statistics = library.get_response_cache_statistics()
+    assert statistics["size"] <= 400
+    assert statistics["evictions"] >= 1
+    library.connection.close()
+
+
+def test_disabled_cache(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07", response_cache_size=0)
+    assert library.get_response_cache_statistics() == {}
+    library.connection.close()
@@ -0,0 +1,82 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+import pytest
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+INSTANTIATION = {"flavourId": "default"}
+
+
+@pytest.fixture
+def mock():
+    mock = MockCBAM(starting_delay=0.01, processing_delay=0.3).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def library(mock):
+    library = CBAMLibrary()
+    library.connect_to_cbam(mock.url, "robot", "r0b07")
+    library.set_polling_options(initial_interval=0.02)
+    yield library
+    library.connection.close()
+
+
+def _add_package(mock, package_id):
+    mock.packages[package_id] = {"id": package_id, "vnfdId": package_id, "onboardingState": "ONBOARDED", "content": b""}
+
+
+def test_tear_down_report(library, mock):
+    _add_package(mock, "teardown-vnfd")
+    _add_package(mock, "other-vnfd")
+    instantiated = library.create_vnf("teardown-vnfd", "instantiated")["id"]
+    library.instantiate_vnfs([instantiated], INSTANTIATION, interval=0.02)
+    created = library.create_vnf("teardown-vnfd", "created")["id"]
+
+    report = library.tear_down_vnfs(instantiated, "created", "missing", interval=0.02)
+
+    results = {result["id"]: result for result in report["vnfs"]}
+    assert {result["status"] for result in results.values()} == {"DELETED", "NOT FOUND"}
+    assert results["missing"] == {"id": "missing", "name": None, "status": "NOT FOUND", "duration": 0}
+    assert results[instantiated]["name"] == "instantiated"
+    assert {"terminate", "delete"} <= set(results[instantiated])
+    assert "terminate" not in results[created] and "delete" in results[created]
+    assert [package["id"] for package in report["packages"]] == ["teardown-vnfd"]
+    assert not mock.vnfs and set(mock.packages) == {"other-vnfd"}
+
+
+def test_durations_are_measured_per_item(library, mock):
+    slow = library.create_vnf("example-vnfd", "slow")["id"]
+    library.instantiate_vnfs([slow], INSTANTIATION, interval=0.02)
+    fast = library.create_vnf("example-vnfd", "fast")["id"]
+    # Finding the VNFs takes time too, but it is not part of the duration of any item
+    mock.latency = 0.1
+
+    report = library.tear_down_vnfs(slow, fast, delete_packages=False, interval=0.02)
+
+    results = {result["id"]: result for result in report["vnfs"]}
+    assert results[slow]["duration"] == pytest.approx(results[slow]["terminate"] + results[slow]["delete"], abs=0.05)
+    assert results[fast]["duration"] == pytest.approx(results[fast]["delete"], abs=0.05)
+    assert report["duration"] - results[slow]["duration"] >= 0.1
+
+
+def test_repeated_tear_down_finds_nothing(library):
+    vnf_id = library.create_vnf("example-vnfd", "twice")["id"]
+    library.tear_down_vnfs(vnf_id, delete_packages=False)
+    report = library.tear_down_vnfs(vnf_id, delete_packages=False)
+    assert [result["status"] for result in report["vnfs"]] == ["NOT FOUND"]
@@ -0,0 +1,105 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import pytest
+from CBAMLibrary import CBAMLibrary
+from cbam_templates import BodyTemplate, BodyTemplateCache
+
+
+def render(text, **variables):
+    return json.loads(BodyTemplate(text).render(variables))
+
+
+def test_body_without_placeholders_is_sent_as_it_is():
+    text = '{"flavourId": "default",  "extensions": {}}'
+    assert BodyTemplate(text).render({"vnf_id": "CBAM-1"}) == text.encode()
+
+
+@pytest.mark.parametrize("text", ["", "not json", '{"flavourId": "default",}', "{{ not a placeholder }}"])
+def test_body_without_placeholders_is_not_validated(text):
+    assert BodyTemplate(text).render({}) == text.encode()
+
+
+def test_file_without_placeholders_is_sent_as_it_is(tmp_path):
+    path = tmp_path / "instantiation.json"
+    content = '{"description": "caf\xe9"}'.encode("latin-1")
+    path.write_bytes(content)
+    assert BodyTemplateCache().file(str(path)).render({"vnf_id": "CBAM-1"}) == content
+
+
+@pytest.mark.parametrize("value", ["large", 3, 2.5, True, None, [1, "a"], {"k": "v"}])
+def test_whole_string_placeholder_is_replaced_with_json(value):
+    assert render('{"value": "{{value}}"}', value=value) == {"value": value}
+
+
+@pytest.mark.parametrize("value", [3, True, None, [1, "a"], {"k": "v"}])
+def test_bare_placeholder_is_replaced_with_json(value):
+    assert render('{"value": {{ value }}}', value=value) == {"value": value}
+
+
+def test_bare_placeholder_is_replaced_with_text_of_string():
+    assert render('{"replicas": {{replicas}}}', replicas="3") == {"replicas": 3}
+
+
+def test_placeholder_inside_string_is_escaped():
+    assert render('{"hostname": "{{site}}-{{vnf_id}}"}', site='he"l\\', vnf_id="CBAM-1") == {"hostname": 'he"l\\-CBAM-1'}
+    assert render('{"config": "cfg={{config}}"}', config={"k": "v"}) == {"config": 'cfg={"k": "v"}'}
+
+
+def test_placeholder_after_escaped_quote_is_inside_string():
+    assert render('{"script": "echo \\"{{name}}\\""}', name="vnf") == {"script": 'echo "vnf"'}
+    assert render('{"script": "q\\"{{name}}"}', name='a"b') == {"script": 'q"a"b'}
+
+
+def test_placeholder_without_variable_is_left_as_it_is():
+    text = '{"script": "echo {{ HOME }}", "id": "{{vnf_id}}", "other": "{{other}}"}'
+    assert render(text, vnf_id="CBAM-1") == {"script": "echo {{ HOME }}", "id": "CBAM-1", "other": "{{other}}"}
+
+
+def test_invalid_template_fails_when_compiled():
+    with pytest.raises(ValueError):
+        BodyTemplate('{"flavourId": "{{flavour}}",}')
+
+
+def test_file_is_compiled_again_when_it_changes(tmp_path):
+    path = tmp_path / "instantiation.json"
+    path.write_text('{"flavourId": "{{flavour}}"}')
+    cache = BodyTemplateCache()
+    template = cache.file(str(path))
+    assert cache.file(str(path)) is template
+    path.write_text('{"flavourId": "{{flavour}}", "level": 1}')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000000000))
+    assert json.loads(cache.file(str(path)).render({"flavour": "small"})) == {"flavourId": "small", "level": 1}
+    assert len(cache.templates) == 1
+
+
+def test_cache_keeps_at_most_size_templates():
+    cache = BodyTemplateCache(size=2)
+    first = cache.text('{"a": 1}')
+    cache.text('{"b": 2}')
+    cache.text('{"c": 3}')
+    assert cache.text('{"a": 1}') is not first
+    assert len(cache.templates) == 2
+
+
+def test_library_sends_bodies_without_placeholders_unchanged(tmp_path):
+    library = CBAMLibrary()
+    path = tmp_path / "operation.json"
+    path.write_bytes(b"")
+    assert library._parse_json_body("", vnf_id="CBAM-1") == b""
+    assert library._parse_json_body(str(path), vnf_id="CBAM-1") == b""
+    assert library._parse_json_body(['{"a":', ' 1}'], vnf_id="CBAM-1") == b'{"a":\n 1}'
+    assert library._parse_json_body('{"id": "{{vnf_id}}"}', vnf_id="CBAM-1") == b'{"id": "CBAM-1"}'
@@ -0,0 +1,73 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM
+
+
+def _get_vnfs(library, vnf_id, count, threads):
+    errors = []
+
+    def get(_):
+        try:
+            library.get_vnf(vnf_id)
+        except Exception as error:
+            errors.append(error)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(get, range(count)))
+    return time.monotonic() - started, errors
+
+
+def _connect(mock):
+    library = CBAMLibrary()
+    # Cached responses would not reach the throttling mock
+    library.connect_to_cbam(mock.url, "robot", "r0b07", response_cache_size=0)
+    return library
+
+
+def test_token_expiring_while_throttled_is_refreshed():
+    mock = MockCBAM(latency=0.02, token_lifetime=1, max_concurrent_requests=3).start()
+    try:
+        library = _connect(mock)
+        vnf = library.create_vnf("example-vnfd", "throttled")
+        duration, errors = _get_vnfs(library, vnf["id"], 300, 30)
+        library.connection.close()
+    finally:
+        mock.stop()
+    # Several token lifetimes pass while requests wait for slots and back off
+    assert duration > 2
+    assert errors == []
+
+
+def test_throughput_stays_near_the_capacity_of_the_server():
+    latency, capacity, count = 0.01, 3, 300
+    mock = MockCBAM(latency=latency, max_concurrent_requests=capacity).start()
+    try:
+        library = _connect(mock)
+        vnf = library.create_vnf("example-vnfd", "capped")
+        duration, errors = _get_vnfs(library, vnf["id"], count, 30)
+        metrics = json.loads(library.get_request_metrics())
+        library.connection.close()
+    finally:
+        mock.stop()
+    assert errors == []
+    # At most a few requests wait for the one second Retry-After of the mock, the rest run at the capacity
+    assert duration < 3 * count * latency / capacity + 1
+    assert metrics["throttled"] < 20
@@ -0,0 +1,75 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import json
+import os
+import subprocess
+import sys
+from mock_cbam import MockCBAM, TOKEN_PATH
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+# Connects like a pabot worker and prints the access token it got
+WORKER = """
+import sys
+from CBAMLibrary import CBAMLibrary
+library = CBAMLibrary()
+library.connect_to_cbam(sys.argv[1], "robot", "r0b07", token_cache=sys.argv[2])
+library.get_vnfs()
+print(library.connection.access_token)
+library.connection.close()
+"""
+
+
+def _run_workers(url, cache, count):
+    environment = {**os.environ, "PYTHONPATH": os.pathsep.join([SRC, os.environ.get("PYTHONPATH", "")])}
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER, url, cache], stdout=subprocess.PIPE, env=environment, universal_newlines=True)
+               for _ in range(count)]
+    tokens = [worker.communicate(timeout=60)[0].strip() for worker in workers]
+    assert [worker.returncode for worker in workers] == [0] * count
+    return tokens
+
+
+def test_processes_share_one_token(tmp_path):
+    mock = MockCBAM(token_lifetime=300).start()
+    cache = str(tmp_path / "tokens.json")
+    try:
+        tokens = _run_workers(mock.url, cache, 6)
+        assert len(set(tokens)) == 1
+        assert mock.call_counts()[f"POST {TOKEN_PATH}"] == 1
+        with open(cache) as cache_file:
+            entries = json.load(cache_file)
+        assert [entry["access_token"] for entry in entries.values()] == tokens[:1]
+        if os.name == "posix":
+            assert os.stat(cache).st_mode & 0o077 == 0
+    finally:
+        mock.stop()
+
+
+def test_expired_cached_token_is_renewed_once(tmp_path):
+    mock = MockCBAM(token_lifetime=300).start()
+    cache = str(tmp_path / "tokens.json")
+    try:
+        first = _run_workers(mock.url, cache, 1)[0]
+        with open(cache) as cache_file:
+            entries = json.load(cache_file)
+        for entry in entries.values():
+            entry["issued_at"] -= 600
+        with open(cache, "w") as cache_file:
+            json.dump(entries, cache_file)
+        tokens = _run_workers(mock.url, cache, 4)
+        assert len(set(tokens)) == 1 and tokens[0] != first
+        assert mock.call_counts()[f"POST {TOKEN_PATH}"] == 2
+    finally:
+        mock.stop()
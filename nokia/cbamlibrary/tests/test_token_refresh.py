@@ -0,0 +1,76 @@
+# Copyright 2020 Eficode Oy
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from CBAMLibrary import CBAMLibrary
+from mock_cbam import MockCBAM, TOKEN_PATH
+
+
+def _token_requests(mock):
+    return mock.call_counts().get(f"POST {TOKEN_PATH}", 0)
+
+
+def test_concurrent_requests_share_one_refresh():
+    mock = MockCBAM(token_lifetime=300).start()
+    try:
+        library = CBAMLibrary()
+        library.connect_to_cbam(mock.url, "robot", "r0b07", response_cache_size=0)
+        vnf_id = library.create_vnf("example-vnfd", "refreshed")["id"]
+        before = _token_requests(mock)
+        # Token is seen as expired by every thread at once
+        library.connection.access_token_expires = time.time() - 1
+        barrier = threading.Barrier(20)
+
+        def get(_):
+            barrier.wait()
+            return library.get_vnf(vnf_id)["id"]
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            assert set(executor.map(get, range(20))) == {vnf_id}
+        assert _token_requests(mock) == before + 1
+        library.connection.close()
+    finally:
+        mock.stop()
+
+
+def test_token_is_refreshed_in_background_before_it_expires():
+    mock = MockCBAM(token_lifetime=1).start()
+    try:
+        library = CBAMLibrary()
+        library.connect_to_cbam(mock.url, "robot", "r0b07")
+        token = library.connection.access_token
+        # Short-lived tokens are refreshed halfway through their lifetime without any requests
+        time.sleep(0.8)
+        assert library.connection.access_token != token
+        assert _token_requests(mock) == 2
+        library.get_vnfs()
+        assert _token_requests(mock) == 2
+        library.connection.close()
+    finally:
+        mock.stop()
+
+
+def test_closed_connection_stops_refreshing():
+    mock = MockCBAM(token_lifetime=0.4).start()
+    try:
+        library = CBAMLibrary()
+        library.connect_to_cbam(mock.url, "robot", "r0b07")
+        library.connection.close()
+        time.sleep(0.6)
+        assert _token_requests(mock) == 1
+    finally:
+        mock.stop()